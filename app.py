@@ -1,17 +1,14 @@
-from multiprocessing import Manager
-from fastapi import FastAPI, Request, Response, Depends, HTTPException, Form, status, Cookie
+from fastapi import FastAPI, Request, Response, Depends, HTTPException, Form, status
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.engine import URL
+from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional, List, Union
+import asyncio
 import uuid
 import os
 import sys
-import boto3
 import base64
 import json
 import bedrock_models
@@ -24,19 +21,38 @@ import bleach
 from pygments import highlight
 from pygments.formatters import HtmlFormatter
 from pygments.lexers import get_lexer_by_name
-from functools import wraps
+from functools import partial, wraps
 import requests
 import traceback
 
-from models import Base, Tool, Agent, Workflow, WorkflowNode, WorkflowEdge, AgentTool, User
-from models import get_password_hash, verify_password
-from workflow_runner import WorkflowRunner
+from models import Tool, Agent, Workflow, WorkflowNode, WorkflowEdge, AgentTool, User
+from models import get_password_hash, verify_password, ensure_schema
+from workflow_runner import WorkflowRunner, MODEL_PROVIDER
+from graph_executor import EXECUTION_MODES, DEFAULT_EXECUTION_MODE
+from session_pool import get_session_pool, SessionCapacityError
+from session_channel import CANCEL_TIMEOUT, AsyncSessionChannel, ChannelClosed
+from stream_encoder import encode_event
+from session_directory import DatabaseSessionDirectory, LocalSessionDirectory
+from collections import OrderedDict
+from nav_catalog import NavCatalog
+from principal_cache import Principal, PrincipalCache
+from mcp_catalog import configure_mcp_catalog
+from conversation_store import configure_conversation_store, HISTORY_PAGE_SIZE
+from aws_clients import get_client
+from starlette.concurrency import run_in_threadpool
+from startup import StartupError, StartupPipeline
+
+# STS credential check at startup: 'background' reports missing credentials without delaying
+# startup, 'strict' refuses to start without them, 'off' skips the check
+AWS_CREDENTIAL_CHECK = os.environ.get('AWS_CREDENTIAL_CHECK', 'background').lower()
+# Give the existing default admin a new random password at startup, as every boot used to
+ADMIN_PASSWORD_RESET = os.environ.get('ADMIN_PASSWORD_RESET', 'false').lower() == 'true'
 
 # Check AWS credentials before app starts
 def check_aws_credentials():
     try:
         # Attempt to get caller identity which will fail if credentials are missing or invalid
-        sts = boto3.client('sts')
+        sts = get_client('sts')
         identity = sts.get_caller_identity()
         if identity:
             return True
@@ -44,32 +60,6 @@ def check_aws_credentials():
         print(f"AWS credential check failed: {str(e)}", file=sys.stderr)
         return False
 
-# Generate DSQL auth token for PostgreSQL connections
-def generate_dsql_token(cluster_endpoint, region='us-east-1'):
-    """Generate authentication token for DSQL PostgreSQL connections"""
-    client = boto3.client("dsql", region_name=region)
-    # Use admin token for full access
-    token = client.generate_db_connect_admin_auth_token(cluster_endpoint, region)
-    return token
-
-# Configure database URI based on environment
-def get_database_uri():
-    """Get database URI with appropriate authentication"""
-    # Default to SQLite if no environment variable is set
-    db_uri = os.environ.get('SQLALCHEMY_DATABASE_URI')
-    if not db_uri:
-        # Use SQLite database
-        db_uri = 'sqlite:///instance/strands.db'
-    else:
-        token = generate_dsql_token(db_uri)
-        db_uri = URL.create("postgresql+pg8000", username="admin", password=token, 
-        host=db_uri, database="postgres")
-    print("DBURI", db_uri)
-    return db_uri
-
-# Verify AWS credentials are available
-if not check_aws_credentials():
-    sys.exit("ERROR: Valid AWS credentials are required to run this application.")
 builtin_tools = [
         #{"name": "file_read", "description": "Reading configuration files, parsing code files, loading datasets"},
         #{"name": "file_write", "description": "Writing results to files, creating new files, saving output data"},
@@ -102,29 +92,16 @@ builtin_tools = [
         #{"name": "batch", "description": "Call multiple other tools in parallel"}
     ]
 # Database setup
-DATABASE_URL = get_database_uri()
-engine = create_engine(DATABASE_URL)
-
-# Configure SQLAlchemy to handle PostgreSQL's limitation with DDL statements in transactions
-# and disable connection pooling to prevent SSL SYSCALL errors
-if 'postgresql' in str(DATABASE_URL):
-    engine = create_engine(
-        DATABASE_URL,
-        isolation_level='AUTOCOMMIT',  # This prevents DDL statements from being wrapped in transactions
-        poolclass=None,  # Disable connection pooling
-        pool_pre_ping=True,  # Test connections before using them
-        pool_recycle=3600  # Recycle connections after an hour as backup
-    )
+from database import engine, SessionLocal, configure_session_worker
 
-    @event.listens_for(engine, "do_connect")
-    def provide_token(dialect, conn_rec, cargs, cparams):
-        if os.environ.get('SQLALCHEMY_DATABASE_URI'):
-            cparams['password'] = generate_dsql_token(os.environ.get('SQLALCHEMY_DATABASE_URI'))
+# Workflows and agents listed in the chat navigation
+nav_catalog = NavCatalog(SessionLocal)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# MCP tool schemas, also configured in each session worker (see configure_session_worker)
+mcp_catalog = configure_mcp_catalog(SessionLocal)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Conversation history, written by the session workers
+conversation_store = configure_conversation_store(SessionLocal)
 
 # Authentication configuration
 COGNITO_ENABLED = os.environ.get('COGNITO_ENABLED', 'false').lower() == 'true'
@@ -141,40 +118,79 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
 
-sync_manager = Manager()
-_synced_workflow_queues = sync_manager.dict()
-
-def init_workflow_queues(workflow_id, session_id):
-    _synced_workflow_queues[session_id] = sync_manager.dict()
-    _synced_workflow_queues[session_id]['input'] = sync_manager.Queue()
-    _synced_workflow_queues[session_id]['output'] = sync_manager.Queue()
-    _synced_workflow_queues[workflow_id] = session_id
-    return _synced_workflow_queues[session_id]
-    
-def get_workflow_queues( session_id):
-    return _synced_workflow_queues.get(session_id)
+# Conversation routing shared by every web worker (and node) using the same database.
+# SESSION_DIRECTORY=local keeps it in-process for single-worker setups.
+if os.environ.get('SESSION_DIRECTORY', 'database') == 'local':
+    session_directory = LocalSessionDirectory()
+else:
+    session_directory = DatabaseSessionDirectory(SessionLocal)
+
+# Cache owner addresses to skip the directory lookup on every message. A resumed
+# conversation gets a new owner: the entry is evicted when connecting to the old one
+# fails or its session hangs up, and the next lookup finds the new owner
+_ROUTE_CACHE_SIZE = 10000
+_route_cache = OrderedDict()
+
+async def register_session(workflow_id, session_id, address):
+    await run_in_threadpool(session_directory.register, session_id, workflow_id, address)
+    _route_cache[session_id] = address
+
+def forget_session(session_id, owner=None):
+    """Drop the route of a session; with ``owner``, only if it still leads there."""
+    if owner is None or _route_cache.get(session_id) == owner:
+        _route_cache.pop(session_id, None)
+    session_directory.remove(session_id, owner)
+
+async def _lookup_owner(session_id):
+    address = _route_cache.get(session_id)
+    if address is None:
+        session = await run_in_threadpool(session_directory.lookup, session_id)
+        if not session:
+            return None
+        address = session['owner']
+        _route_cache[session_id] = address
+        if len(_route_cache) > _ROUTE_CACHE_SIZE:
+            _route_cache.popitem(last=False)
+    return address
+
+async def open_session_channel(session_id, connect_timeout=1.0):
+    """Open a channel to the worker hosting a session, or return None if the session is gone."""
+    if not session_id:
+        return None
+    address = await _lookup_owner(session_id)
+    if not address:
+        return None
+    try:
+        return await AsyncSessionChannel.open(address, session_id, connect_timeout=connect_timeout)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # The worker hosting the session has exited
+        await run_in_threadpool(forget_session, session_id, address)
+        return None
 
-def get_all_session_for_workflow( workflow_id):
-    return [k for k, v in _synced_workflow_queues.items() if v == workflow_id]
+def get_all_session_for_workflow(workflow_id):
+    return session_directory.sessions_for_workflow(workflow_id)
 
-def clear_all_workflow_sessions(id_to_clear):
+async def terminate_session(session_id):
+    channel = None
+    try:
+        channel = await open_session_channel(session_id)
+        if channel:
+            async with channel:
+                await channel.put("_Q_E_E_TERMINATE")
+    except (ChannelClosed, OSError) as e:
+        print(f"Session {session_id} already gone: {str(e)}")
+    if channel:
+        await run_in_threadpool(forget_session, session_id, channel.address)
+
+async def clear_all_workflow_sessions(id_to_clear):
     # Check if the ID is a session ID (conversation ID)
-    if id_to_clear in _synced_workflow_queues and isinstance(_synced_workflow_queues[id_to_clear], dict):
+    if await _lookup_owner(id_to_clear):
         # It's a session ID, terminate and remove it
-        _synced_workflow_queues[id_to_clear]['input'].put("_Q_E_E_TERMINATE")
-        _synced_workflow_queues.pop(id_to_clear, None)
+        await terminate_session(id_to_clear)
     else:
-        # Assume it's a workflow ID, get all sessions for this workflow
-        sessions = get_all_session_for_workflow(id_to_clear) 
-        # Send "_Q_E_E_TERMINATE" to all input queues
-        for session in sessions:
-            print(            session)
-            print (session in _synced_workflow_queues,_synced_workflow_queues)
-            _synced_workflow_queues[session]['input'].put("_Q_E_E_TERMINATE")
-            _synced_workflow_queues.pop(session, None)
-        # Also remove the workflow_id -> session_id mapping
-        if id_to_clear in _synced_workflow_queues:
-            _synced_workflow_queues.pop(id_to_clear, None)
+        # Assume it's a workflow ID, terminate all sessions for this workflow
+        for session in await run_in_threadpool(get_all_session_for_workflow, id_to_clear):
+            await terminate_session(session)
 
 
 # FastAPI app
@@ -238,6 +254,7 @@ def get_db():
 
 # Create default admin user if running locally
 def create_default_admin():
+    """Create the local admin user if missing; returns a note for the startup report."""
     import secrets
     import string
     
@@ -257,13 +274,16 @@ def create_default_admin():
                 db.commit()
                 print("Created default admin user for local development")
                 print(f"Admin Password: {random_password}")
-            else:
+                return "created"
+            elif ADMIN_PASSWORD_RESET:
                 alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
                 random_password = ''.join(secrets.choice(alphabet) for _ in range(16))
                 admin.set_password(random_password)
                 db.commit()
                 print(f"Admin Password: {random_password}")
-
+                return "password reset"
+            return "skipped: admin exists"
+        return "skipped: Cognito"
     finally:
         db.close()
 
@@ -278,31 +298,46 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Get current user from token
-async def get_current_user(token: str = Cookie(None), db: Session = Depends(get_db)):
-    # Instead of raising an exception, redirect to login page
-    login_redirect = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
-    
+# Authenticated principals by token hash, so hot endpoints skip the user lookup
+principal_cache = PrincipalCache()
+
+async def resolve_principal(token):
+    """Return the Principal of a session token, or None if it is not valid."""
     if not token:
-        return login_redirect
-    
+        return None
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    # Cache misses query the database, keep them off the event loop
+    return await run_in_threadpool(load_principal, token)
+
+def load_principal(token):
+    """Decode a session token and load its Principal from the database, or None if it is not valid."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return login_redirect
-    except JWTError:
-        return login_redirect
+        user_id = uuid.UUID(payload.get("sub"))
+    except (JWTError, ValueError, TypeError, AttributeError):
+        return None
     
+    db = SessionLocal()
     try:
-        user_id = uuid.UUID(user_id)
         user = db.query(User).get(user_id)
         if user is None:
-            return login_redirect
-    except (ValueError, TypeError):
-        return login_redirect
+            return None
+        principal = Principal.from_user(user)
+    finally:
+        db.close()
     
-    return user
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+# Get current user resolved by auth_middleware
+async def get_current_user(request: Request):
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        # Instead of raising an exception, redirect to login page
+        return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+    return principal
 
 # Login required dependency
 async def login_required(user = Depends(get_current_user)):
@@ -424,97 +459,40 @@ async def no_cache_middleware(request: Request, call_next):
     
     return response
 
-# Authentication middleware to redirect unauthenticated users to login page
+# Authentication middleware: resolves the principal once per request for the
+# dependencies and templates, and redirects unauthenticated users to login page
 @app.middleware("http")
 async def auth_middleware(request: Request, call_next):
-    # Skip auth check for login page, static files, and API endpoints
-    if request.url.path == "/login" or request.url.path.startswith("/static"):
-        return await call_next(request)
+    request.state.principal = None
+    request.state.user_profile = None
     
-    # Check if user is authenticated
-    token = request.cookies.get("token")
-    is_authenticated = False
+    # Skip auth for static files
+    if request.url.path.startswith("/static"):
+        return await call_next(request)
     
-    if token:
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            user_id = payload.get("sub")
-            if user_id:
-                is_authenticated = True
-                #print current user
-                
-        except JWTError:
-            pass
+    principal = await resolve_principal(request.cookies.get("token"))
+    if principal is not None:
+        request.state.principal = principal
+        # The default admin always gets the admin menus
+        if principal.username == 'admin@example.com':
+            request.state.user_profile = 'admin'
+        else:
+            request.state.user_profile = principal.profile_type or 'user'
     
     # If not authenticated and trying to access a protected page, redirect to login
-    if not is_authenticated and request.url.path == "/":
+    if principal is None and request.url.path == "/":
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
     
     # Continue with the request
     return await call_next(request)
 
-# Template context processor
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    # Add common template variables
-    request.state.user_profile = None
-    
-    # Get user profile from session if available
-    token = request.cookies.get("token")
-    print("DEBUG: Token present:", bool(token))
-    
-    if token:
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            user_id = payload.get("sub")
-            profile_type = payload.get("profile_type")
-            print("DEBUG: USER_ID", user_id, "PROFILE_TYPE", profile_type)
-            
-            # Always set user_profile if we have a valid token
-            if user_id:
-                # If username is admin@example.com, always set profile to admin
-                db = SessionLocal()
-                try:
-                    user = db.query(User).get(uuid.UUID(user_id))
-                    print("DEBUG: User found:", bool(user), "Username:", user.username if user else None)
-                    if user and user.username == 'admin@example.com':
-                        request.state.user_profile = 'admin'
-                    else:
-                        request.state.user_profile = profile_type or 'user'
-                    print("DEBUG: Setting user_profile to:", request.state.user_profile)
-                finally:
-                    db.close()
-        except JWTError as e:
-            print("DEBUG: JWT Error:", str(e))
-            pass
-    
-    # Get workflows for navigation
-    db = SessionLocal()
-    try:
-        workflows = db.query(Workflow).all()
-        agents = db.query(Agent).all()
-        
-        # Prepare items for the dropdown with type information
-        items = []
-        for workflow in workflows:
-            items.append({
-                'id': workflow.id,
-                'name': workflow.name,
-                'type': 'workflow'
-            })
-        for agent in agents:
-            items.append({
-                'id': agent.id,
-                'name': agent.name,
-                'type': 'agent'
-            })
-        
-        request.state.workflows = items
-    finally:
-        db.close()
-    
-    response = await call_next(request)
-    return response
+@app.on_event("startup")
+async def start_session_pool():
+    # Pre-start the session workers so the first activation does not pay for process spawn,
+    # and keep their directory entries alive for the other web workers
+    get_session_pool(heartbeat=session_directory.heartbeat, on_session_end=forget_session)
+    if bedrock_models.BEDROCK_MODELS_WARM:
+        bedrock_models.get_model_catalog().warm()
 
 # Routes
 @app.get("/favicon.ico")
@@ -537,7 +515,7 @@ async def login(
     if COGNITO_ENABLED:
         # Use Cognito for authentication
         try:
-            client = boto3.client('cognito-idp', region_name=COGNITO_REGION)
+            client = get_client('cognito-idp', region_name=COGNITO_REGION)
             response = client.initiate_auth(
                 ClientId=COGNITO_CLIENT_ID,
                 AuthFlow='USER_PASSWORD_AUTH',
@@ -599,7 +577,8 @@ async def logout():
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request, user: User = Depends(login_required)):
-    return templates.TemplateResponse("chat.html", {"request": request, "workflows": request.state.workflows})
+    # Navigation items are only needed by the chat page, not by every request
+    return templates.TemplateResponse("chat.html", {"request": request, "workflows": nav_catalog.items()})
 
 @app.get("/workflows", response_class=HTMLResponse)
 async def list_workflows(request: Request, user: User = Depends(configurer_required), db: Session = Depends(get_db)):
@@ -617,6 +596,7 @@ async def get_workflow(workflow_id: uuid.UUID, user: User = Depends(login_requir
         "name": workflow.name,
         "description": workflow.description,
         "model_id": workflow.model_id,
+        "execution_mode": workflow.execution_mode or DEFAULT_EXECUTION_MODE,
         "lastEdited": getattr(workflow, 'last_edited', None)
     }
 
@@ -631,6 +611,7 @@ async def delete_workflow(workflow_id: uuid.UUID, user: User = Depends(login_req
     
     db.delete(workflow)
     db.commit()
+    nav_catalog.invalidate()
     return {"success": True}
 
 @app.put("/api/workflow/{workflow_id}")
@@ -647,6 +628,10 @@ async def update_workflow(
     workflow.name = data.get('name', workflow.name)
     workflow.description = data.get('description', workflow.description)
     workflow.model_id = data.get('model_id', workflow.model_id)
+    execution_mode = data.get('execution_mode', workflow.execution_mode or DEFAULT_EXECUTION_MODE)
+    if execution_mode not in EXECUTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown execution mode: {execution_mode}")
+    workflow.execution_mode = execution_mode
     workflow.last_edited = datetime.utcnow()  # Add timestamp for edit
     
     # Generate workflow graph icon if requested
@@ -660,6 +645,7 @@ async def update_workflow(
             print(f"Error generating workflow icon: {str(e)}")
     
     db.commit()
+    nav_catalog.invalidate()
     
     # Clear any active sessions using this workflow
     WorkflowRunner.clear_workflow_sessions(workflow_id)
@@ -683,6 +669,7 @@ async def new_workflow(
     db.add(workflow)
     db.commit()
     db.refresh(workflow)
+    nav_catalog.invalidate()
     
     return RedirectResponse(url=f"/workflow/{workflow.id}", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -725,6 +712,85 @@ async def edit_workflow(
     
     return RedirectResponse(url=f"/workflow/{workflow.id}", status_code=status.HTTP_303_SEE_OTHER)
 
+async def start_session(workflow_id, item_type, session_id, db):
+    """Start a session on the worker pool and wait until it is ready; returns its name."""
+    try:
+        if item_type == 'agent':
+            # Use the agent as the orchestrator
+            name, address = await run_in_threadpool(WorkflowRunner.create_threaded_agent, workflow_id, db, session_id)
+        else:
+            # Use the workflow as before; compiling it queries the database
+            name, address = await run_in_threadpool(WorkflowRunner.create_threaded_workflow, workflow_id, db,
+                                                    session_id)
+    except SessionCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    await register_session(workflow_id, session_id, address)
+
+    # Wait for the worker to report the session as started
+    deadline = asyncio.get_running_loop().time() + 30.0
+    while True:
+        channel = await open_session_channel(session_id, connect_timeout=30.0)
+        if not channel:
+            raise HTTPException(status_code=503, detail="No session worker available")
+        try:
+            async with channel:
+                await channel.get()
+            return name
+        except ChannelClosed:
+            # A worker that hosted the conversation before hangs up until the resumed session reaches it
+            if asyncio.get_running_loop().time() >= deadline:
+                raise HTTPException(status_code=503, detail="Session did not start")
+            await asyncio.sleep(0.05)
+
+# Seconds without session output after which a streaming request checks for a client disconnect
+DISCONNECT_CHECK_INTERVAL = 1.0
+
+# Conversations being resumed by this web worker: conversation ID -> future of the resume
+_resuming = {}
+
+async def _resume(conversation_id, conversation):
+    # Another web worker may have resumed it already
+    channel = await open_session_channel(conversation_id)
+    if channel:
+        await channel.close()
+        return
+    db = SessionLocal()
+    try:
+        await start_session(uuid.UUID(conversation['workflow_id']), conversation['item_type'], conversation_id, db)
+    finally:
+        db.close()
+
+def _resumed(conversation_id, future):
+    _resuming.pop(conversation_id, None)
+    if not future.cancelled():
+        # Retrieved here too in case every waiting request left
+        future.exception()
+
+async def resume_session(conversation_id):
+    """
+    Start a new session for a stored conversation whose session ended, e.g. reaped while idle.
+
+    The session picks up the conversation's stored history. Concurrent requests
+    for the conversation share one resume. Returns a channel to the session, or
+    None if the conversation is unknown or its workflow or agent is gone.
+
+    Raises:
+        HTTPException: If the session could not be started
+    """
+    conversation = await run_in_threadpool(conversation_store.get, conversation_id)
+    if not conversation:
+        return None
+    resuming = _resuming.get(conversation_id)
+    if resuming is None:
+        resuming = _resuming[conversation_id] = asyncio.ensure_future(_resume(conversation_id, conversation))
+        resuming.add_done_callback(partial(_resumed, conversation_id))
+    try:
+        # A request that leaves does not cancel the resume the others wait for
+        await asyncio.shield(resuming)
+    except ValueError:
+        return None
+    return await open_session_channel(conversation_id)
+
 @app.post("/api/workflow/activate/{workflow_id}")
 async def activate_workflow(
     workflow_id: uuid.UUID, 
@@ -733,19 +799,10 @@ async def activate_workflow(
     db: Session = Depends(get_db)
 ):
     item_type = data.get('type', 'workflow')
+    session_id = str(uuid.uuid4())
     
-    if item_type == 'agent':
-        # Use the agent as the orchestrator
-        session_id = str(uuid.uuid4())
-        qs = init_workflow_queues(workflow_id, session_id)
-        name = WorkflowRunner.create_threaded_agent(workflow_id, db, qs['input'], qs['output'])
-        qs['output'].get()
-    else:
-        # Use the workflow as before
-        session_id = str(uuid.uuid4())
-        qs = init_workflow_queues(workflow_id, session_id)
-        name =WorkflowRunner.create_threaded_workflow(workflow_id, db, qs['input'], qs['output'])
-        qs['output'].get()
+    name = await start_session(workflow_id, item_type, session_id, db)
+    await run_in_threadpool(conversation_store.create, session_id, workflow_id, item_type)
     
     return {
         "success": True,
@@ -761,68 +818,114 @@ async def reset_workflow(data: Dict[str, Any] = {}, user: User = Depends(login_r
     if conversation_id:
         # If conversation_id is provided, clear that specific session
         # This will properly terminate the thread using the conversation ID
-        clear_all_workflow_sessions(conversation_id)
+        await clear_all_workflow_sessions(conversation_id)
     else:
         # For backward compatibility, clear active workflow
         WorkflowRunner.clear_active_workflow()
     return {"success": True}
 
+@app.post("/api/chat/cancel")
+async def cancel_message(data: Dict[str, Any], user: User = Depends(login_required)):
+    """Stop the answer in progress in a conversation, and any message queued behind it."""
+    conversation_id = data.get('conversation_id')
+    channel = await open_session_channel(conversation_id)
+    if not channel:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"success": False, "error": "Conversation not found"}
+        )
+    try:
+        async with channel:
+            await channel.put("_Q_E_E_CANCEL")
+            # The session replies once it is idle again, or when it gives up waiting
+            reply = await channel.get(timeout=CANCEL_TIMEOUT + 5)
+    except ChannelClosed:
+        # The session ended meanwhile, which also stops its answer
+        reply = "_Q_E_E_CANCELLED"
+    except asyncio.TimeoutError:
+        reply = "_Q_E_E_BUSY"
+    # Not idle after the timeout: a tool that cannot be interrupted is still running,
+    # the answer stops when it returns
+    return {"success": True, "idle": reply == "_Q_E_E_CANCELLED"}
+
 @app.post("/api/chat/message")
 async def send_message(
+    request: Request,
     data: Dict[str, Any], 
-    user: User = Depends(login_required),
-    db: Session = Depends(get_db)
+    user: User = Depends(login_required)
 ):
     message = data.get('message', '').strip()
     conversation_id = data.get('conversation_id')
-    
-    #get input channel for conversation id
-    qs = get_workflow_queues(conversation_id)
-
-
 
     if not message:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"success": False, "error": "Message cannot be empty"}
         )
-    def _event_generator(message=message):
-        qs['input'].put(message)
-        while True:
-            answer = qs['output'].get()
-            if answer == "_Q_E_E_ANSWERED":
-                break
-            elif answer.startswith("_Q_E_E_HISTORY"):
-                # Requeue history messages and sleep
-                qs['output'].put(answer)
-                import time
-                time.sleep(0.2)
-                continue
-            yield answer    
-    try:
-        return StreamingResponse(
-            _event_generator(),
-            media_type="text/plain"
+
+    #get channel for conversation id, resuming the conversation if its session ended
+    channel = await open_session_channel(conversation_id) or await resume_session(conversation_id)
+    if not channel:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"success": False, "error": "Conversation not found"}
         )
-    except ValueError as e:
-        if "workflow edited" in str(e).lower():
-            return {
-                "success": False,
-                "workflowEdited": True,
-                "error": str(e)
-            }
-        else:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={"success": False, "error": str(e)}
-            )
+
+    async def _event_generator(message=message, channel=channel):
+        # Replies come back on this request's own connection as Server-Sent Events frames
+        for attempt in range(2):
+            answered = False
+            async with channel:
+                try:
+                    await channel.put(message)
+                    while True:
+                        try:
+                            answer = await channel.get(timeout=DISCONNECT_CHECK_INTERVAL)
+                        except asyncio.TimeoutError:
+                            # Nothing to stream for a while, e.g. during a tool call: if the client
+                            # left, closing the channel makes the worker cancel the answer
+                            if await request.is_disconnected():
+                                return
+                            continue
+                        if answer == "_Q_E_E_ANSWERED":
+                            return
+                        answered = True
+                        yield answer
+                except ChannelClosed:
+                    # The session ended while answering
+                    if answered or channel.received or attempt:
+                        return
+            # The session ended before taking the message, e.g. reaped while this worker
+            # still routed to it. Its owner drops the route, and the conversation may
+            # already be resumed elsewhere: look it up again, resuming it if needed
+            if _route_cache.get(conversation_id) == channel.address:
+                _route_cache.pop(conversation_id)
+            try:
+                channel = await resume_session(conversation_id)
+            except HTTPException as e:
+                # Streaming has started, the status code can no longer change
+                yield encode_event({'error': e.detail})
+                return
+            if not channel:
+                return
+    return StreamingResponse(
+        _event_generator(),
+        media_type="text/event-stream",
+        headers={"X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/chat/history")
 async def retrieve_conversation_history(
     data: Dict[str, Any], 
     user: User = Depends(login_required)
 ):
-    """Retrieve the full conversation history from the processing thread."""
+    """
+    Retrieve a page of the conversation history from the conversation store.
+
+    ``after_seq`` is the ``next_seq`` of the previous page (0 or absent for the
+    first one) and ``limit`` the page size; ``has_more`` tells whether another
+    page follows. The session worker is not involved.
+    """
     conversation_id = data.get('conversation_id')
     
     if not conversation_id:
@@ -830,34 +933,38 @@ async def retrieve_conversation_history(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"success": False, "error": "Conversation ID is required"}
         )
+    try:
+        after_seq = int(data.get('after_seq') or 0)
+        limit = int(data.get('limit') or HISTORY_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "error": "after_seq and limit must be integers"}
+        )
     
-    qs = get_workflow_queues(conversation_id)
-    if not qs:
+    # Conversations outlive their sessions: the next message resumes an ended one
+    if not await run_in_threadpool(conversation_store.get, conversation_id):
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={"success": False, "error": "Conversation not found"}
         )
     
-    # Send retrieve message to processing thread
-    qs['input'].put("_Q_E_E_RETRIEVE")
-    
-    # Wait for history response
-    while True:
-        response = qs['output'].get()
-        if response.startswith("_Q_E_E_HISTORY"):
-            # Extract JSON from the response
-            history_json = response[len("_Q_E_E_HISTORY"):]
-            try:
-                history = json.loads(history_json)
-                return {"success": True, "history": history}
-            except json.JSONDecodeError:
-                return JSONResponse(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    content={"success": False, "error": "Failed to parse history"}
-                )
-        elif response == "_Q_E_E_ANSWERED":
-            # No history available
-            return {"success": True, "history": []}
+    page = await run_in_threadpool(conversation_store.history, conversation_id, after_seq, limit)
+    return {"success": True, **page}
+
+@app.get("/api/sessions/stats")
+async def session_stats(user: User = Depends(admin_required)):
+    """
+    Session and worker counts of this web worker's session pool.
+
+    ``max_sessions`` and ``max_total_rss_mb`` are this web worker's share of the
+    node's caps: ``SESSION_MAX_SESSIONS`` and ``SESSION_MAX_TOTAL_RSS_MB``
+    divided by ``WEB_CONCURRENCY``, rounded up.
+    """
+    # Anonymous callers get the login redirect, not the worker PIDs and addresses
+    if isinstance(user, RedirectResponse):
+        return user
+    return get_session_pool().stats()
 
 @app.get("/agents", response_class=HTMLResponse)
 async def list_agents(request: Request, user: User = Depends(configurer_required), db: Session = Depends(get_db)):
@@ -866,6 +973,9 @@ async def list_agents(request: Request, user: User = Depends(configurer_required
 
 @app.delete("/api/agent/{agent_id}")
 async def delete_agent(agent_id: uuid.UUID, user: User = Depends(login_required), db: Session = Depends(get_db)):
+    # Workflows running this agent have to be recompiled
+    WorkflowRunner.mark_workflows_edited(db, agent_id=agent_id)
+    
     # First delete all agent_tool associations for this agent
     db.query(AgentTool).filter_by(agent_id=agent_id).delete()
     
@@ -876,6 +986,7 @@ async def delete_agent(agent_id: uuid.UUID, user: User = Depends(login_required)
     
     db.delete(agent)
     db.commit()
+    nav_catalog.invalidate()
     return {"success": True}
 
 @app.get("/agent/new", response_class=HTMLResponse)
@@ -896,6 +1007,7 @@ async def new_agent(
     db.add(agent)
     db.commit()
     db.refresh(agent)
+    nav_catalog.invalidate()
     
     return RedirectResponse(url=f"/agent/{agent.id}", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -946,8 +1058,10 @@ async def update_agent(
     agent.description = data.get('description', agent.description)
     agent.prompt = data.get('prompt', agent.prompt)
     agent.model_id = data.get('model_id', agent.model_id)
+    WorkflowRunner.mark_workflows_edited(db, agent_id=agent_id)
     
     db.commit()
+    nav_catalog.invalidate()
     return {"success": True}
     agent = Agent(name=name, description=description, prompt=prompt)
     db.add(agent)
@@ -969,6 +1083,9 @@ async def list_tools(request: Request, user: User = Depends(configurer_required)
 
 @app.delete("/api/tool/{tool_id}")
 async def delete_tool(tool_id: uuid.UUID, user: User = Depends(login_required), db: Session = Depends(get_db)):
+    # Workflows using this tool have to be recompiled
+    WorkflowRunner.mark_workflows_edited(db, tool_id=tool_id)
+    
     # First delete all agent_tool associations for this tool
     db.query(AgentTool).filter_by(tool_id=tool_id).delete()
     
@@ -1048,6 +1165,7 @@ async def update_tool(
             tool.agent_id = uuid.UUID(agent_id)
     else:
         tool.agent_id = None  # Clear agent_id if not an agent tool
+    WorkflowRunner.mark_workflows_edited(db, tool_id=tool_id)
     
     db.commit()
     return {"success": True}
@@ -1107,6 +1225,7 @@ async def add_tool_to_agent(
             config=config
         )
         db.add(agent_tool)
+        WorkflowRunner.mark_workflows_edited(db, agent_id=agent_id)
         db.commit()
         
         # Get the tool name for the response
@@ -1142,6 +1261,7 @@ async def remove_tool_from_agent(
         raise HTTPException(status_code=404, detail="Tool not found for this agent")
     
     db.delete(agent_tool)
+    WorkflowRunner.mark_workflows_edited(db, agent_id=agent_id)
     db.commit()
     return {"success": True}
 
@@ -1164,6 +1284,7 @@ async def add_node(
         position_y=data['position_y']
     )
     db.add(node)
+    WorkflowRunner.mark_workflows_edited(db, workflow_ids=[workflow_id])
     db.commit()
     db.refresh(node)
     
@@ -1182,6 +1303,7 @@ async def add_edge(
         target_node_id=uuid.UUID(data['target_node_id'])
     )
     db.add(edge)
+    WorkflowRunner.mark_workflows_edited(db, workflow_ids=[workflow_id])
     db.commit()
     db.refresh(edge)
     
@@ -1205,6 +1327,7 @@ async def delete_node(
     ).delete()
     
     db.delete(node)
+    WorkflowRunner.mark_workflows_edited(db, workflow_ids=[workflow_id])
     db.commit()
     return {"success": True}
 
@@ -1220,6 +1343,7 @@ async def delete_edge(
         raise HTTPException(status_code=404, detail="Edge not found")
     
     db.delete(edge)
+    WorkflowRunner.mark_workflows_edited(db, workflow_ids=[workflow_id])
     db.commit()
     return {"success": True}
 
@@ -1235,8 +1359,6 @@ async def discover_mcp_tools(
             from mcp_helpers import parse_config
             config = parse_config(config)
         
-        from strands.tools.mcp import MCPClient
-        from mcp import stdio_client, StdioServerParameters
         from mcp_helpers import locate_config
         
         command, args, env, _ = locate_config(config)
@@ -1244,21 +1366,11 @@ async def discover_mcp_tools(
         if not command:
             return {"success": False, "error": "No command specified in configuration"}
         
-        # Create MCP client and use as context manager
-        mcp_client = MCPClient(lambda: stdio_client(
-            StdioServerParameters(
-                command=command,
-                args=args,
-                env=env
-            )
-        ))
-        
-        # Get tools from the MCP server using context manager
-        with mcp_client:
-            tools = mcp_client.list_tools_sync()
+        # Answer from the tool catalog; the server is only started on a miss or explicit refresh
+        specs = await run_in_threadpool(mcp_catalog.get, command, args, env, bool(data.get('refresh')))
         
         # Extract tool names
-        tool_names = [getattr(tool, 'name', getattr(tool, 'tool_name', str(tool))) for tool in tools] if tools else []
+        tool_names = [spec['name'] for spec in specs]
         
         return {"success": True, "tools": tool_names}
         
@@ -1319,6 +1431,9 @@ async def update_user_profile(
         # Update is_admin for backward compatibility
         user.is_admin = (profile_type == 'admin')
         db.commit()
+        # Apply the new privileges to the user's open sessions right away on this web
+        # worker; the other workers' caches pick them up within PRINCIPAL_CACHE_TTL
+        principal_cache.invalidate_user(user_id)
         return {"success": True}
     
     return JSONResponse(
@@ -1388,4 +1503,23 @@ async def reset_user_password(
     
     return {"success": True}
 
-create_default_admin()
+def migrate_schema():
+    """Create tables, and the columns added to existing ones, unless the schema is current."""
+    return "migrated" if ensure_schema(engine) else "skipped: schema current"
+
+def verify_aws_credentials():
+    if not check_aws_credentials():
+        if AWS_CREDENTIAL_CHECK == 'strict':
+            raise StartupError("Valid AWS credentials are required to run this application.")
+        print("WARNING: No valid AWS credentials found; Bedrock and AWS tools will fail", file=sys.stderr)
+
+startup = StartupPipeline()
+# Agents on the fake model provider do not need AWS credentials
+if MODEL_PROVIDER != 'fake' and AWS_CREDENTIAL_CHECK != 'off':
+    startup.phase('aws_credentials', verify_aws_credentials, wait=AWS_CREDENTIAL_CHECK == 'strict')
+startup.phase('schema', migrate_schema)
+startup.phase('admin', create_default_admin, after=('schema',))
+try:
+    startup.run()
+except StartupError as e:
+    sys.exit(f"ERROR: {e}")
@@ -0,0 +1,94 @@
+"""
+Process-wide registry of boto3 clients.
+
+``boto3.client(...)`` builds a new session and loads the service JSON models
+on every call, which costs tens of milliseconds and several MB; the credential
+check, DSQL token signing, Cognito login and Bedrock model discovery all paid
+for it per call. The registry builds one client per ``(service, region)`` on
+first use and shares it: boto3 clients are thread safe, sessions are not, so
+construction is serialized on the registry's own session. Clients are not
+inherited across ``fork`` (gunicorn web workers): a child process
+builds its own on first use.
+"""
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import boto3
+
+
+class ClientRegistry:
+    """Lazily built boto3 clients keyed by service and region."""
+
+    def __init__(self, session_factory: Callable[[], Any] = boto3.session.Session):
+        """
+        Args:
+            session_factory: Returns the boto3 session clients are built from
+        """
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._session = None
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        self.constructions: Counter = Counter()
+        self.hits = 0
+
+    def client(self, service: str, region_name: Optional[str] = None):
+        """
+        Return the shared client of a service.
+
+        Args:
+            service: Service name, as for ``boto3.client``
+            region_name: Region, or None for the session's default region
+        """
+        self._check_fork()
+        key = (service, region_name)
+        client = self._clients.get(key)
+        if client is not None:
+            self.hits += 1
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                if self._session is None:
+                    self._session = self.session_factory()
+                client = self._session.client(service, region_name=region_name)
+                self._clients[key] = client
+                self.constructions[key] += 1
+            else:
+                self.hits += 1
+            return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Return construction counts per ``service/region`` and the number of reuses."""
+        return {'constructed': {f"{service}/{region or 'default'}": count
+                                for (service, region), count in self.constructions.items()},
+                'hits': self.hits}
+
+    def clear(self):
+        """Drop every client, e.g. after the credentials changed."""
+        with self._lock:
+            self._session = None
+            self._clients = {}
+
+    def _check_fork(self):
+        # The lock may have been held by another thread at fork time, replace it with the rest
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._session = None
+            self._clients = {}
+
+
+_registry = ClientRegistry()
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry."""
+    return _registry
+
+
+def get_client(service: str, region_name: Optional[str] = None):
+    """Return the shared boto3 client of a service (see ``ClientRegistry.client``)."""
+    return _registry.client(service, region_name)
@@ -1,5 +1,12 @@
-import boto3
-from typing import List, Dict, Any, Tuple, Optional
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Tuple, Optional, Callable
+
+from aws_clients import get_client
 
 def get_model_display_name(model_id: str) -> str:
     """
@@ -85,6 +92,252 @@ def get_model_display_name(model_id: str) -> str:
     # If no specific pattern matches, return the model ID
     return model_id
 
+# Model catalog freshness: served from cache for BEDROCK_MODELS_TTL seconds, then
+# served stale for up to BEDROCK_MODELS_STALE_TTL more while it is refetched
+BEDROCK_MODELS_TTL = float(os.environ.get('BEDROCK_MODELS_TTL', '3600'))
+BEDROCK_MODELS_STALE_TTL = float(os.environ.get('BEDROCK_MODELS_STALE_TTL', str(24 * 3600)))
+# Fetch the catalog in the background when the web app starts
+BEDROCK_MODELS_WARM = os.environ.get('BEDROCK_MODELS_WARM', 'false').lower() == 'true'
+# Local snapshot of the catalog shared by every process of the host (empty to disable)
+BEDROCK_MODELS_SNAPSHOT = os.environ.get(
+    'BEDROCK_MODELS_SNAPSHOT', os.path.join(tempfile.gettempdir(), 'strands-ui-bedrock-models.json'))
+# Longest an agent construction waits for a cold catalog before using the base model ID
+BEDROCK_PROFILE_RESOLVE_TIMEOUT = float(os.environ.get('BEDROCK_PROFILE_RESOLVE_TIMEOUT', '2'))
+
+
+class ModelCatalog:
+    """
+    Cached snapshot of the Bedrock foundation models and inference profiles.
+
+    Fetches every page of ``list_foundation_models`` and ``list_inference_profiles``.
+    Fresh snapshots are served from memory; stale ones are served while a single
+    background fetch refreshes them, and concurrent callers without a usable
+    snapshot wait on the same fetch.
+
+    Every fetch is also written to ``snapshot_path``. A process whose snapshot is
+    missing or stale reads that file first, so the web workers and session
+    workers of a host share one fetch, and a restart does not start cold.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any] = lambda: get_client('bedrock'),
+                 ttl: float = BEDROCK_MODELS_TTL, stale_ttl: float = BEDROCK_MODELS_STALE_TTL,
+                 snapshot_path: Optional[str] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            client_factory: Returns a Bedrock control-plane client
+            ttl: Seconds a snapshot is served without refetching
+            stale_ttl: Seconds past ``ttl`` a snapshot is still served while it is refreshed
+            snapshot_path: File the catalog is persisted to and restored from, if any
+            clock: Monotonic time source
+        """
+        self.client_factory = client_factory
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.snapshot_path = snapshot_path
+        self._clock = clock
+        self._snapshot_version = None
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._fetched_at = -float('inf')
+        self._inflight: Optional[Future] = None
+        self.fetches = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the current catalog.
+
+        Returns:
+            Dict with ``models`` (foundation model summaries) and ``profiles``
+            (base model ID -> cross-region inference profile ID); empty if the
+            catalog could not be fetched
+        """
+        snapshot = self.peek()
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+        try:
+            return self._start_fetch().result()
+        except Exception as e:
+            print(f"Error listing Bedrock models: {str(e)}")
+            return snapshot or {'models': [], 'profiles': {}}
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the catalog without waiting for Bedrock.
+
+        A stale catalog is returned and refreshed in the background; None is
+        returned when there is no usable catalog.
+        """
+        snapshot, age = self._current()
+        if age >= self.ttl and self.restore():
+            snapshot, age = self._current()
+        if snapshot is not None and age < self.ttl:
+            return snapshot
+        if snapshot is not None and age < self.ttl + self.stale_ttl:
+            # Stale-while-revalidate: answer now, refresh in the background
+            self._start_fetch()
+            return snapshot
+        return None
+
+    def resolve_profile(self, model_id: str, timeout: float = BEDROCK_PROFILE_RESOLVE_TIMEOUT) -> str:
+        """
+        Return the cross-region inference profile of a model, or the model ID itself.
+
+        Never calls Bedrock in the caller's thread: without a usable catalog it
+        waits up to ``timeout`` seconds for the shared fetch, then falls back.
+        """
+        snapshot = self.peek()
+        if snapshot is None:
+            try:
+                snapshot = self._start_fetch().result(timeout=timeout)
+            except Exception as e:
+                print(f"Bedrock inference profiles unavailable, using model ID {model_id}: {str(e) or type(e).__name__}")
+                return model_id
+        return snapshot['profiles'].get(model_id, model_id)
+
+    def restore(self) -> bool:
+        """
+        Load the snapshot file if another process (or a previous run) wrote a newer one.
+
+        Returns:
+            True if a snapshot was loaded
+        """
+        if not self.snapshot_path:
+            return False
+        try:
+            # Snapshots are replaced, not rewritten: a new inode is a new snapshot
+            stat = os.stat(self.snapshot_path)
+            version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if version == self._snapshot_version:
+                return False
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+            snapshot = {'models': data['models'], 'profiles': data['profiles']}
+            age = max(0.0, time.time() - data['fetched_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self._snapshot_version = version
+            if self._snapshot is not None and self._clock() - self._fetched_at <= age:
+                return False
+            self._snapshot = snapshot
+            self._fetched_at = self._clock() - age
+        return True
+
+    def warm(self) -> Future:
+        """Start fetching the catalog in the background, e.g. at application startup."""
+        return self._start_fetch()
+
+    def invalidate(self):
+        """Mark the snapshot as expired so the next call refetches it."""
+        with self._lock:
+            self._fetched_at = -float('inf')
+
+    def _current(self) -> Tuple[Optional[Dict[str, Any]], float]:
+        with self._lock:
+            return self._snapshot, self._clock() - self._fetched_at
+
+    def _start_fetch(self) -> Future:
+        # Single flight: every caller shares the fetch in progress
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight
+            future = self._inflight = Future()
+        threading.Thread(target=self._fetch_into, args=(future,), name='bedrock-model-catalog',
+                         daemon=True).start()
+        return future
+
+    def _fetch_into(self, future: Future):
+        try:
+            snapshot = self._fetch()
+        except Exception as e:
+            with self._lock:
+                self._inflight = None
+            if self._snapshot is not None:
+                print(f"Error refreshing Bedrock models, serving the cached list: {str(e)}")
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._snapshot = snapshot
+            self._fetched_at = self._clock()
+            self._inflight = None
+        self._persist(snapshot)
+        future.set_result(snapshot)
+
+    def _persist(self, snapshot: Dict[str, Any]):
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(dict(snapshot, fetched_at=time.time()), f)
+            # Atomic, so readers in other processes never see a partial file
+            os.replace(tmp_path, self.snapshot_path)
+            stat = os.stat(self.snapshot_path)
+            self._snapshot_version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            print(f"Could not write Bedrock model snapshot {self.snapshot_path}: {str(e)}")
+
+    def _fetch(self) -> Dict[str, Any]:
+        self.fetches += 1
+        client = self.client_factory()
+        models = _paginate(client.list_foundation_models, 'modelSummaries')
+        profiles = {}
+        for profile in _paginate(client.list_inference_profiles, 'inferenceProfileSummaries'):
+            # Get the inference profile ID
+            profile_id = profile.get('inferenceProfileId', '')
+            
+            # Extract model IDs from the associated models
+            for model in profile.get('models', []):
+                # Extract the model ID from the ARN (part after 'foundation-model/')
+                model_arn = model.get('modelArn', '')
+                if model_arn and 'foundation-model/' in model_arn:
+                    base_model_id = model_arn.split('foundation-model/')[1]
+                    if base_model_id and profile_id:
+                        profiles[base_model_id] = profile_id
+        return {'models': models, 'profiles': profiles}
+
+
+def _paginate(operation: Callable[..., Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    """Call a Bedrock list operation until ``nextToken`` runs out and concatenate ``key``."""
+    items = []
+    kwargs = {}
+    while True:
+        response = operation(**kwargs)
+        items.extend(response.get(key, []))
+        next_token = response.get('nextToken')
+        if not next_token:
+            return items
+        kwargs = {'nextToken': next_token}
+
+
+_model_catalog: Optional[ModelCatalog] = None
+_model_catalog_lock = threading.Lock()
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Return the process-wide Bedrock model catalog."""
+    global _model_catalog
+    with _model_catalog_lock:
+        if _model_catalog is None:
+            _model_catalog = ModelCatalog(snapshot_path=BEDROCK_MODELS_SNAPSHOT or None)
+        return _model_catalog
+
+
+def _reset_after_fork():
+    # The thread of a fetch in flight when the process forked does not exist in the
+    # child, so its future would never resolve: the child fetches on its own
+    global _model_catalog_lock
+    _model_catalog_lock = threading.Lock()
+    if _model_catalog is not None:
+        _model_catalog._lock = threading.Lock()
+        _model_catalog._inflight = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
 def list_bedrock_models(filter_text_modality=True, filter_on_demand=True, filter_cross_region=True) -> List[Dict[str, Any]]:
     """
     List available Bedrock foundation models with optional filtering.
@@ -97,68 +350,36 @@ def list_bedrock_models(filter_text_modality=True, filter_on_demand=True, filter
     Returns:
         List of model information dictionaries
     """
-    try:
-        # Create a Bedrock client
-        bedrock_client = boto3.client('bedrock')
+    snapshot = get_model_catalog().snapshot()
+    cross_region_profiles = snapshot['profiles']
+    
+    # Apply filters if requested
+    filtered_models = []
+    for model in snapshot['models']:
+        # Check if model has text output modality
+        has_text_modality = not filter_text_modality or 'TEXT' in model.get('outputModalities', [])
         
-        # List foundation models
-        response = bedrock_client.list_foundation_models()
-        models = response.get('modelSummaries', [])
+        # Check if model has on-demand inference
+        has_on_demand = not filter_on_demand or 'ON_DEMAND' in model.get('inferenceTypesSupported', [])
         
-        # Get cross-region profiles if needed
-        cross_region_profiles = {}
-        if filter_cross_region:
-            cross_region_profiles = get_cross_region_inference_profiles()
+        # Get the model ID
+        model_id = model.get('modelId', '')
         
-        # Apply filters if requested
-        filtered_models = []
-        for model in models:
-            # Check if model has text output modality
-            has_text_modality = False
-            if not filter_text_modality:
-                has_text_modality = True
-            else:
-                output_modalities = model.get('outputModalities', [])
-                if 'TEXT' in output_modalities:
-                    has_text_modality = True
-            
-            # Check if model has on-demand inference
-            has_on_demand = False
-            if not filter_on_demand:
-                has_on_demand = True
-            else:
-                inference_types = model.get('inferenceTypesSupported', [])
-                if 'ON_DEMAND' in inference_types:
-                    has_on_demand = True
-            
-            # Get the model ID
-            model_id = model.get('modelId', '')
-            
-            # Check if model has a cross-region profile
-            has_cross_region = False
-            if not filter_cross_region:
-                has_cross_region = True
-            else:
-                if model_id in cross_region_profiles:
-                    has_cross_region = True
-            
-            
-            # Add model to filtered list if it meets all criteria
-            if has_text_modality and has_on_demand and has_cross_region:
-                filtered_models.append({
-                    'modelId': model_id,
-                    'modelName': model.get('modelName'),
-                    'provider': model.get('providerName'),
-                    'outputModalities': model.get('outputModalities', []),
-                    'inferenceTypes': model.get('inferenceTypesSupported', []),
-                    'crossRegionProfile': cross_region_profiles.get(model_id, '')
-                })
+        # Check if model has a cross-region profile
+        has_cross_region = not filter_cross_region or model_id in cross_region_profiles
         
-        return filtered_models
+        # Add model to filtered list if it meets all criteria
+        if has_text_modality and has_on_demand and has_cross_region:
+            filtered_models.append({
+                'modelId': model_id,
+                'modelName': model.get('modelName'),
+                'provider': model.get('providerName'),
+                'outputModalities': model.get('outputModalities', []),
+                'inferenceTypes': model.get('inferenceTypesSupported', []),
+                'crossRegionProfile': cross_region_profiles.get(model_id, '')
+            })
     
-    except Exception as e:
-        print(f"Error listing Bedrock models: {str(e)}")
-        return []
+    return filtered_models
 
 def get_cross_region_inference_profiles() -> Dict[str, str]:
     """
@@ -167,44 +388,7 @@ def get_cross_region_inference_profiles() -> Dict[str, str]:
     Returns:
         Dictionary mapping base model IDs to their cross-region profile IDs
     """
-    try:
-        # Create a Bedrock client
-        bedrock_client = boto3.client('bedrock')
-        
-        # Call the list_inference_profiles API
-        response = bedrock_client.list_inference_profiles()
-        
-        profiles = response.get('inferenceProfileSummaries', [])
-        
-        # Create a mapping of base model IDs to cross-region profile IDs
-        model_to_profile_map = {}
-        
-        for profile in profiles:
-            # Get the inference profile ID
-            profile_id = profile.get('inferenceProfileId', '')
-            
-            # Extract model IDs from the associated models
-            associated_models = profile.get('models', [])
-            
-            for model in associated_models:
-                # Extract the model ID from the ARN
-                model_arn = model.get('modelArn', '')
-                
-                if model_arn and 'foundation-model/' in model_arn:
-                    # Extract the model ID from the ARN (part after 'foundation-model/')
-                    base_model_id = model_arn.split('foundation-model/')[1]
-                    
-                    # Add to the mapping
-                    if base_model_id and profile_id:
-                        model_to_profile_map[base_model_id] = profile_id
-                
-        return model_to_profile_map
-    
-    except Exception as e:
-        print(f"Error listing inference profiles: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {}
+    return dict(get_model_catalog().snapshot()['profiles'])
 
 def get_model_with_cross_region_profile(model_id: str) -> str:
     """
@@ -216,11 +400,8 @@ def get_model_with_cross_region_profile(model_id: str) -> str:
     Returns:
         Either the cross-region profile ID if available, or the original model ID
     """
-    # Get the mapping of model IDs to cross-region profiles
-    profile_map = get_cross_region_inference_profiles()
-    
-    # Return the cross-region profile if available, otherwise return the original model ID
-    return profile_map.get(model_id, model_id)
+    # Resolved from the shared catalog: agent construction never lists profiles itself
+    return get_model_catalog().resolve_profile(model_id)
 
 def get_default_model_id() -> str:
     """
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Measure the boto3 client cost on the Cognito login and Bedrock model-list paths.
+
+Each operation is run ``--iterations`` times in two configurations:
+
+- before: ``boto3.client(...)`` per call, as app.py and bedrock_models.py did
+- after:  the shared client from ``aws_clients.ClientRegistry``
+
+AWS is not contacted: responses come from ``botocore.stub.Stubber``, so the
+numbers isolate client construction (service model loading, endpoint
+resolution) from network latency, which both configurations pay equally.
+
+Usage: python benchmarks/bench_aws_clients.py [--iterations 200] [--region us-east-1]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3  # noqa: E402
+from botocore.stub import Stubber  # noqa: E402
+
+from aws_clients import ClientRegistry  # noqa: E402
+from session_pool import get_rss_mb  # noqa: E402
+
+# Requests are stubbed, but clients still need credentials to be built
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+
+def stub(client, method, response):
+    """Queue a canned response for the next ``method`` call on ``client``."""
+    # Kept on the client, so per-call clients are freed with their stubber
+    stubber = getattr(client, '_bench_stubber', None)
+    if stubber is None:
+        stubber = client._bench_stubber = Stubber(client)
+        stubber.activate()
+    stubber.add_response(method, response)
+    return client
+
+
+def cognito_login(get_client, region):
+    client = get_client('cognito-idp', region)
+    stub(client, 'initiate_auth', {'AuthenticationResult': {'AccessToken': 'token'}})
+    client.initiate_auth(ClientId='client', AuthFlow='USER_PASSWORD_AUTH',
+                         AuthParameters={'USERNAME': 'user', 'PASSWORD': 'password'})
+
+
+def list_models(get_client, region):
+    client = get_client('bedrock', region)
+    stub(client, 'list_foundation_models', {'modelSummaries': []})
+    stub(client, 'list_inference_profiles', {'inferenceProfileSummaries': []})
+    client.list_foundation_models()
+    client.list_inference_profiles()
+
+
+def measure(operation, get_client, region, iterations):
+    durations = []
+    rss_before = get_rss_mb()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        operation(get_client, region)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return statistics.median(durations), durations[int(len(durations) * 0.99) - 1], get_rss_mb() - rss_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    registry = ClientRegistry()
+    configurations = {
+        'before': lambda service, region: boto3.client(service, region_name=region),
+        'after': registry.client,
+    }
+    print(f"{args.iterations} iterations per operation")
+    print(f"{'operation':<14} {'config':<7} {'p50 ms':>8} {'p99 ms':>8} {'RSS +MB':>8}")
+    for name, operation in (('cognito login', cognito_login), ('model list', list_models)):
+        for config, get_client in configurations.items():
+            p50, p99, rss = measure(operation, get_client, args.region, args.iterations)
+            print(f"{name:<14} {config:<7} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {rss:>8.1f}")
+    print(f"clients built by the registry: {registry.stats()['constructed']}")
+
+
+if __name__ == '__main__':
+    main()
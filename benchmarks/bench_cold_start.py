@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Measure the cold start of the web app: the time to ``import app`` in a fresh interpreter.
+
+The repository (``--repo``, this one by default) is copied to a temporary
+directory so every measurement starts without ``instance/strands.db``. The
+first boot creates the database; the following ``--runs`` boots find it in
+place, as a restarted gunicorn worker or a redeployed instance does.
+
+Reported: the import time of the first boot and the p50/max of the restarts,
+and the startup phase timings the app prints, if any.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5] [--repo PATH] [--provider fake]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import app
+print(json.dumps({'seconds': time.perf_counter() - started}))
+"""
+
+
+def boot(directory, env):
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=directory, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"import app failed:\n{result.stdout}\n{result.stderr}")
+    lines = result.stdout.strip().splitlines()
+    phases = [line for line in lines if line.startswith('Startup')]
+    return json.loads(lines[-1])['seconds'], phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Boots with an existing database')
+    parser.add_argument('--repo', default=ROOT, help='Checkout of the app to measure')
+    parser.add_argument('--provider', default='fake',
+                        help="MODEL_PROVIDER of the app; 'bedrock' needs AWS credentials")
+    args = parser.parse_args()
+
+    env = dict(os.environ, MODEL_PROVIDER=args.provider)
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copytree(args.repo, directory, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns('.git', 'instance', '__pycache__', 'node_modules'))
+        os.makedirs(os.path.join(directory, 'instance'))
+
+        first, phases = boot(directory, env)
+        print(f"first boot: {first * 1000:.0f} ms")
+        for line in phases:
+            print(f"  {line}")
+        restarts = []
+        for _ in range(args.runs):
+            seconds, phases = boot(directory, env)
+            restarts.append(seconds)
+        print(f"restart:    p50 {statistics.median(restarts) * 1000:.0f} ms, "
+              f"max {max(restarts) * 1000:.0f} ms ({args.runs} runs)")
+        for line in phases:
+            print(f"  {line}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Count model invocations and latency per message for each workflow execution mode.
+
+Builds a linear workflow (input -> ``--agents`` agents -> output) whose agents
+run on ``fake_model.FakeModel``, so no AWS call is made. Each model response
+waits ``--latency-ms`` before its first event, which stands in for a model
+round trip. Modes compared:
+
+- orchestrator: an orchestrator agent (its model calls every agent tool in
+                turn) routes the message, as ``_create_orchestrator`` does
+- pipeline:     ``PipelineExecutor``, each agent answers the next one
+- dag:          ``DagExecutor`` on the same chain
+
+Usage: python benchmarks/bench_execution_modes.py [--agents 3] [--messages 5] [--latency-ms 50]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_model import FakeModel  # noqa: E402
+from workflow_runner import WorkflowRunner  # noqa: E402
+
+
+def chain_context(agents, mode):
+    input_id, output_id = uuid.uuid4(), uuid.uuid4()
+    nodes = {input_id: {'id': input_id, 'type': 'input'}, output_id: {'id': output_id, 'type': 'output'}}
+    edges = []
+    previous = input_id
+    for i in range(agents):
+        node_id = uuid.uuid4()
+        nodes[node_id] = {'id': node_id, 'type': 'agent',
+                          'reference': {'id': uuid.uuid4(), 'name': f'Agent {i}', 'description': f'Step {i}',
+                                        'prompt': 'You are a step of a pipeline.', 'tools': []}}
+        edges.append({'source': previous, 'target': node_id})
+        previous = node_id
+    edges.append({'source': previous, 'target': output_id})
+    return {'id': uuid.uuid4(), 'name': 'Benchmark chain', 'description': 'Linear workflow',
+            'model_id': None, 'execution_mode': mode, 'nodes': nodes, 'edges': edges}
+
+
+def ignore_events(**event):
+    pass
+
+
+def build(context, latency):
+    """Create the session's runner the way _run_session does, on fake models."""
+    agents = WorkflowRunner.create_nodes(context)
+    for i, agent in enumerate(agents):
+        agent.model = FakeModel(f'agent-{i}', first_token_latency=latency)
+        agent.callback_handler = ignore_events
+    context['agents'] = agents
+    if context['execution_mode'] != 'orchestrator':
+        runner = WorkflowRunner._create_graph_executor(context)
+    else:
+        runner = WorkflowRunner._create_orchestrator(context)
+        runner.model = FakeModel('orchestrator', first_token_latency=latency, tool_calls='each')
+    runner.callback_handler = ignore_events
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--agents', type=int, default=3)
+    parser.add_argument('--messages', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    print(f"chain of {args.agents} agents, {args.messages} messages, {args.latency_ms}ms per model call")
+    print(f"{'mode':<13} {'model calls/msg':>16} {'ms/msg':>8}")
+    for mode in ('orchestrator', 'pipeline', 'dag'):
+        runner = build(chain_context(args.agents, mode), args.latency_ms / 1000)
+        FakeModel.reset_invocations()
+        started = time.perf_counter()
+        for i in range(args.messages):
+            runner(f'message {i}')
+        elapsed = time.perf_counter() - started
+        calls = FakeModel.reset_invocations()
+        print(f"{mode:<13} {calls / args.messages:>16.1f} {elapsed / args.messages * 1000:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
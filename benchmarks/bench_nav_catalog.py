@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Load test of the navigation dropdown with a large workflow catalog.
+
+Seeds a SQLite database with ``--workflows`` workflows (each with a graph icon
+the size the editor produces) and ``--agents`` agents, then measures requests
+per second through a FastAPI app in two configurations:
+
+- before: every request loads all Workflow and Agent rows in middleware,
+  as ``add_process_time_header`` used to
+- after: only the chat page asks ``NavCatalog`` for the items
+
+Each configuration is hit on an API route and on the chat page route.
+
+Usage: python benchmarks/bench_nav_catalog.py [--workflows 1000] [--requests 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from models import Agent, Base, Workflow  # noqa: E402
+from nav_catalog import NavCatalog  # noqa: E402
+
+ICON = 'data:image/png;base64,' + 'iVBORw0KGgo' * 2500  # ~27KB, like a canvas snapshot
+
+
+def seed(session_factory, workflows, agents):
+    db = session_factory()
+    db.add_all(Workflow(name=f'Workflow {i}', description='Benchmark workflow', graph_icon=ICON)
+               for i in range(workflows))
+    db.add_all(Agent(name=f'Agent {i}', description='Benchmark agent', prompt='You are helpful.')
+               for i in range(agents))
+    db.commit()
+    db.close()
+
+
+def build_app(session_factory, mode):
+    app = FastAPI()
+    catalog = NavCatalog(session_factory)
+
+    if mode == 'before':
+        @app.middleware("http")
+        async def load_navigation(request: Request, call_next):
+            db = session_factory()
+            try:
+                items = [{'id': w.id, 'name': w.name, 'type': 'workflow'} for w in db.query(Workflow).all()]
+                items += [{'id': a.id, 'name': a.name, 'type': 'agent'} for a in db.query(Agent).all()]
+                request.state.workflows = items
+            finally:
+                db.close()
+            return await call_next(request)
+
+    @app.get("/")
+    async def index(request: Request):
+        items = request.state.workflows if mode == 'before' else catalog.items()
+        return {'items': len(items)}
+
+    @app.post("/api/chat/history")
+    async def history():
+        return {'success': True, 'history': []}
+
+    return app
+
+
+def measure(client, method, path, count):
+    for _ in range(min(20, count)):
+        client.request(method, path)
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.request(method, path)
+        assert response.status_code == 200
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workflows', type=int, default=1000)
+    parser.add_argument('--agents', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f'sqlite:///{tmp}/bench.db')
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        seed(session_factory, args.workflows, args.agents)
+
+        print(f"{args.workflows} workflows, {args.agents} agents, {args.requests} requests per route")
+        print(f"{'mode':<8} {'route':<22} {'req/s':>10}")
+        for mode in ('before', 'after'):
+            client = TestClient(build_app(session_factory, mode))
+            for method, path in (('POST', '/api/chat/history'), ('GET', '/')):
+                rate = measure(client, method, path, args.requests)
+                print(f"{mode:<8} {method + ' ' + path:<22} {rate:>10.0f}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare streamed-delta throughput and latency of the session transports.
+
+Runs a producer process that emits N token deltas framed exactly like
+``top_level_callback_handler`` and a consumer in this process, once over
+``multiprocessing.Manager`` queues (the previous transport) and once over
+``session_channel`` Unix sockets. Throughput is measured with the producer
+emitting as fast as it can; per-delta latency is measured with the producer
+paced at ``--rate`` deltas per second, like a model streaming tokens.
+Throughput counts events, not frames.
+
+Usage: python benchmarks/bench_session_channel.py [--deltas 20000] [--rate 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from multiprocessing import Manager, Process
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_channel import ChannelServer, SessionChannel, bind_listener  # noqa: E402
+
+
+def _delta(i):
+    event = {"delta": {"text": f"tok{i} "}, "sent": time.perf_counter()}
+    return "data: " + json.dumps(event, default=str) + "\nend"
+
+
+def _produce(put, count, rate):
+    interval = 1.0 / rate if rate else 0
+    next_at = time.perf_counter()
+    for i in range(count):
+        if interval:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        put(_delta(i))
+    put("_Q_E_E_ANSWERED")
+
+
+def _manager_producer(input_queue, output_queue, count, rate):
+    input_queue.get()
+    _produce(output_queue.put, count, rate)
+
+
+def _channel_producer(listener, address, count, rate):
+    server = ChannelServer(listener, address)
+    server.start()
+    channel = server.open("bench")
+    channel.get()
+    _produce(channel.put, count, rate)
+    time.sleep(0.5)
+    server.close()
+
+
+def _consume(get):
+    latencies = []
+    start = time.perf_counter()
+    while True:
+        frame = get()
+        if frame == "_Q_E_E_ANSWERED":
+            break
+        # A reader that falls behind gets several events coalesced into one frame
+        for part in frame.split("\nend")[:-1]:
+            event = json.loads(part[len("data: "):])
+            latencies.append(time.perf_counter() - event["sent"])
+    return time.perf_counter() - start, latencies
+
+
+def _percentile(latencies, fraction):
+    return sorted(latencies)[int(len(latencies) * fraction)] * 1e6
+
+
+def bench_manager(count, rate):
+    manager = Manager()
+    input_queue, output_queue = manager.Queue(), manager.Queue()
+    producer = Process(target=_manager_producer, args=(input_queue, output_queue, count, rate))
+    producer.start()
+    input_queue.put("go")
+    result = _consume(output_queue.get)
+    producer.join()
+    manager.shutdown()
+    return result
+
+
+def bench_channel(count, rate):
+    listener, address = bind_listener(uuid.uuid4().hex[:8], 0)
+    producer = Process(target=_channel_producer, args=(listener, address, count, rate))
+    producer.start()
+    listener.close()
+    with SessionChannel(address, "bench") as channel:
+        channel.put("go")
+        result = _consume(channel.get)
+    producer.join()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deltas", type=int, default=20000)
+    parser.add_argument("--rate", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'transport':<16} {'tokens/s':>12} {'p50 latency':>14} {'p99 latency':>14}")
+    for name, bench in (("Manager queue", bench_manager), ("SessionChannel", bench_channel)):
+        elapsed, latencies = bench(args.deltas, 0)
+        _, paced = bench(min(args.deltas, args.rate * 5), args.rate)
+        print(f"{name:<16} {len(latencies) / elapsed:>12,.0f} "
+              f"{_percentile(paced, 0.5):>11,.1f} us {_percentile(paced, 0.99):>11,.1f} us")
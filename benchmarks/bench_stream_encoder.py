@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of streaming token deltas from a session to the web process.
+
+Streams ``--tokens`` text deltas, paced at ``--rate`` tokens per second like
+a model, through a ``ServerSessionChannel`` to a reader on the other end of
+a socket pair. It runs once framing every delta on its own with ``json``
+(the previous callback handlers), and once through ``StreamEncoder``.
+Reported per 1,000 tokens:
+- JSON encodes
+- worker socket writes
+- frames read by the web process, each one a read and an HTTP chunk
+- CPU time of the process
+
+Usage: python benchmarks/bench_stream_encoder.py [--tokens 2000] [--rate 500]
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_channel import ServerSessionChannel, recv_frame  # noqa: E402
+from stream_encoder import StreamEncoder  # noqa: E402
+
+
+class CountingSocket:
+    """Socket wrapper that counts the writes of the session's writer thread."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.writes = 0
+
+    def sendall(self, data):
+        self.writes += 1
+        self.sock.sendall(data)
+
+    def shutdown(self, how):
+        self.sock.shutdown(how)
+
+
+def _read(sock, counts):
+    reader = sock.makefile('rb')
+    while True:
+        frame = recv_frame(reader)
+        if frame is None or frame == b'_Q_E_E_ANSWERED':
+            return
+        if not frame.startswith(b'_Q_E_E_'):
+            counts['frames'] += 1
+
+
+def run(tokens, rate, batched):
+    worker_end, web_end = socket.socketpair()
+    conn = CountingSocket(worker_end)
+    channel = ServerSessionChannel('bench')
+    channel._attach(conn)
+    channel._receive(conn, 'question')
+    channel.get()
+    counts = {'frames': 0}
+    reader = threading.Thread(target=_read, args=(web_end, counts))
+    reader.start()
+
+    if batched:
+        encoder = StreamEncoder(channel.put)
+        send = encoder.send
+    else:
+        encoder = None
+
+        def send(event):
+            channel.put("data: " + json.dumps(event, default=str) + "\n\n")
+
+    interval = 1.0 / rate
+    cpu = time.process_time()
+    next_at = time.perf_counter()
+    for i in range(tokens):
+        next_at += interval
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        send({'delta': {'text': f'tok{i} '}})
+    if encoder is not None:
+        encoder.flush()
+    channel.put('_Q_E_E_ANSWERED')
+    reader.join()
+    cpu = time.process_time() - cpu
+    channel.close()
+    worker_end.close()
+    web_end.close()
+    encodes = encoder.frames if encoder is not None else tokens
+    scale = 1000.0 / tokens
+    return encodes * scale, conn.writes * scale, counts['frames'] * scale, cpu * 1000 * scale
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"per 1,000 tokens at {args.rate} tokens/s")
+    print(f"{'framing':<16} {'encodes':>9} {'writes':>9} {'web frames':>11} {'CPU':>10}")
+    for name, batched in (("per delta", False), ("StreamEncoder", True)):
+        encodes, writes, frames, cpu = run(args.tokens, args.rate, batched)
+        print(f"{name:<16} {encodes:>9,.0f} {writes:>9,.0f} {frames:>11,.0f} {cpu:>7,.1f} ms")
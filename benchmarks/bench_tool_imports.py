@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Measure import time and session-worker memory with eager vs lazy builtin tools.
+
+Each configuration runs in a fresh interpreter:
+
+- eager: ``import workflow_runner`` followed by importing every module of
+         ``BUILTIN_TOOL_MODULES``, as the module-level ``from strands_tools import (...)`` did
+- lazy:  ``import workflow_runner``, then the tools a typical session references
+         (``--tools``) are resolved through ``builtin_tool_registry``
+
+Reported: the cumulative import time of the process under ``python -X importtime``,
+the wall time of the imports and the resident memory once the session's tools are loaded.
+
+Usage: python benchmarks/bench_tool_imports.py [--tools http_request,current_time] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+import workflow_runner
+from tool_registry import BUILTIN_TOOL_MODULES, builtin_tool_registry
+if {eager}:
+    for module in BUILTIN_TOOL_MODULES.values():
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass
+tools = [builtin_tool_registry.get(name) for name in {tools!r}]
+elapsed = time.perf_counter() - started
+from session_pool import get_rss_mb
+loaded = sorted(m for m in sys.modules if m.startswith('strands_tools.'))
+print(json.dumps({{'seconds': elapsed, 'rss_mb': get_rss_mb(), 'modules': len(sys.modules),
+                  'tool_modules': len(loaded)}}))
+"""
+
+
+def run(eager, tools):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD.format(eager=eager, tools=tools)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    import_us = sum(int(line.split('|')[0].split(':')[1]) for line in result.stderr.splitlines()
+                    if line.startswith('import time:') and 'self [us]' not in line)
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    stats['import_ms'] = import_us / 1000
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tools', default='http_request,current_time')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    tools = [name for name in args.tools.split(',') if name]
+
+    print(f"session tools: {', '.join(tools)}; median of {args.runs} runs")
+    print(f"{'mode':<6} {'importtime ms':>14} {'wall s':>7} {'RSS MB':>7} {'modules':>8} {'tool modules':>13}")
+    for mode in ('eager', 'lazy'):
+        runs = [run(mode == 'eager', tools) for _ in range(args.runs)]
+        median = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        print(f"{mode:<6} {median['import_ms']:>14.0f} {median['seconds']:>7.2f} {median['rss_mb']:>7.1f} "
+              f"{median['modules']:>8.0f} {median['tool_modules']:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Offline load test of the chat pipeline through the real FastAPI app.
+
+Serves ``app.app`` with uvicorn on a local port, with every agent running on
+the fake model provider (``MODEL_PROVIDER=fake``, shaped by the ``FAKE_MODEL_*``
+variables of ``fake_model``), so neither Bedrock nor MCP is needed. Then:
+
+1. activates ``--sessions`` chat sessions of a test agent, ``--concurrency`` at a time
+2. streams ``--messages`` messages per session through ``/api/chat/message``,
+   all sessions concurrently
+3. resets the sessions and deletes the test agent
+
+Reported: sessions activated per second, time to first token (p50/p95),
+tokens per second (per stream and overall, counting the words of the streamed
+text, one per fake model token), and the resident memory of the session
+workers divided by the number of sessions.
+
+Usage: python benchmarks/load_test.py [--sessions 20] [--messages 3] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The app reads these at import time
+os.environ.setdefault('MODEL_PROVIDER', 'fake')
+os.chdir(ROOT)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def start_server(app):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f'http://127.0.0.1:{port}'
+
+
+async def activate(client, agent_id, semaphore):
+    async with semaphore:
+        response = await client.post(f'/api/workflow/activate/{agent_id}', json={'type': 'agent'})
+        response.raise_for_status()
+        return response.json()['workflow']['id']
+
+
+async def stream_message(client, session_id, message):
+    """Send one message and return (time to first token, tokens, stream duration)."""
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+    async with client.stream('POST', '/api/chat/message',
+                             json={'conversation_id': session_id, 'message': message}) as response:
+        response.raise_for_status()
+        buffer = ''
+        async for chunk in response.aiter_text():
+            buffer += chunk
+            *events, buffer = buffer.split('\n\n')
+            for event in events:
+                data = ''.join(line[5:].strip() for line in event.split('\n') if line.startswith('data:'))
+                if not data:
+                    continue
+                try:
+                    payload = json.loads(data)
+                except ValueError:
+                    continue
+                if isinstance(payload, dict) and 'text' in payload.get('delta', {}):
+                    # Events carry several batched deltas; every fake model token is one word
+                    tokens += len(payload['delta']['text'].split())
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+    return first_token, tokens, time.perf_counter() - started
+
+
+async def run_session(client, session_id, messages):
+    return [await stream_message(client, session_id, f'Message {i}') for i in range(messages)]
+
+
+async def run(base_url, token, agent_id, args, pool):
+    limits = httpx.Limits(max_connections=args.sessions + args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies={'token': token}, timeout=300, limits=limits) as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        started = time.perf_counter()
+        session_ids = await asyncio.gather(*(activate(client, agent_id, semaphore) for _ in range(args.sessions)))
+        activation = time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(run_session(client, session_id, args.messages)
+                                         for session_id in session_ids))
+        streaming = time.perf_counter() - started
+        worker_rss = sum(rss_mb(worker['pid']) for worker in pool.stats()['workers'])
+
+        for session_id in session_ids:
+            await client.post('/api/workflow/reset', json={'conversation_id': session_id})
+
+    streams = [stream for session in results for stream in session]
+    first_tokens = [first for first, _, _ in streams if first is not None]
+    total_tokens = sum(tokens for _, tokens, _ in streams)
+    print(f"sessions: {args.sessions} activated in {activation:.2f}s "
+          f"({args.sessions / activation:.1f} sessions/s)")
+    print(f"messages: {len(streams)} streams in {streaming:.2f}s, "
+          f"{len(streams) - len(first_tokens)} without tokens")
+    print(f"time to first token: p50 {statistics.median(first_tokens or [0]) * 1000:.0f} ms, "
+          f"p95 {percentile(first_tokens, 0.95) * 1000:.0f} ms")
+    print(f"tokens/s: {total_tokens / streaming:.0f} overall, "
+          f"{statistics.median(tokens / duration for _, tokens, duration in streams):.0f} per stream (p50)")
+    print(f"session workers: {len(pool.stats()['workers'])}, {worker_rss:.0f} MB RSS, "
+          f"{worker_rss / args.sessions:.1f} MB per session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=3, help='Messages per session')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent activations')
+    args = parser.parse_args()
+
+    import app as strands_app
+    from session_pool import get_session_pool
+
+    print(f"model provider: {os.environ['MODEL_PROVIDER']}, "
+          f"first token {os.environ.get('FAKE_MODEL_FIRST_TOKEN_MS', 'default')} ms, "
+          f"{os.environ.get('FAKE_MODEL_TOKENS', 'default')} tokens "
+          f"every {os.environ.get('FAKE_MODEL_TOKEN_MS', 'default')} ms")
+    db = strands_app.SessionLocal()
+    agent = strands_app.Agent(name='Load test agent', description='Created by benchmarks/load_test.py',
+                              prompt='You are a load test agent.')
+    db.add(agent)
+    db.commit()
+    agent_id = agent.id
+    user = db.query(strands_app.User).filter_by(profile_type='admin').first()
+    token = strands_app.create_access_token({"sub": str(user.id), "username": user.username,
+                                             "profile_type": user.profile_type})
+    db.close()
+
+    server, thread, base_url = start_server(strands_app.app)
+    try:
+        asyncio.run(run(base_url, token, agent_id, args, get_session_pool()))
+    finally:
+        server.should_exit = True
+        thread.join(10)
+        db = strands_app.SessionLocal()
+        db.query(strands_app.Agent).filter_by(id=agent_id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
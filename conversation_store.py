@@ -0,0 +1,132 @@
+"""
+Persistent, append-only conversation history.
+
+History used to live only in the session's ``workflow_context`` inside the
+worker process: reading it meant a round trip through the session that waited
+behind any answer in progress, and it was lost with the worker. Session workers
+now append every message to the store as the turn completes, and history reads
+go straight to the database, a page at a time, without involving the worker.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+
+from models import Conversation, ConversationTurn
+
+# Messages returned by one history read, by default and at most
+HISTORY_PAGE_SIZE = int(os.environ.get('CONVERSATION_HISTORY_PAGE_SIZE', '100'))
+HISTORY_MAX_PAGE_SIZE = 1000
+
+
+class ConversationStore:
+    """Conversations and their messages in the application database."""
+
+    def __init__(self, session_factory):
+        """
+        Args:
+            session_factory: SQLAlchemy session factory, e.g. ``SessionLocal``
+        """
+        self.session_factory = session_factory
+
+    def create(self, conversation_id: str, workflow_id: Any, item_type: str = 'workflow'):
+        """Record a new conversation with the workflow or agent it runs."""
+        db = self.session_factory()
+        try:
+            db.merge(Conversation(id=conversation_id, workflow_id=str(workflow_id), item_type=item_type,
+                                  created_at=datetime.utcnow()))
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            Dict with ``workflow_id`` and ``item_type``, or None for an unknown conversation
+        """
+        db = self.session_factory()
+        try:
+            conversation = db.query(Conversation).get(conversation_id)
+            if conversation is None:
+                return None
+            return {'workflow_id': conversation.workflow_id, 'item_type': conversation.item_type}
+        finally:
+            db.close()
+
+    def append(self, conversation_id: str, role: str, content: str) -> int:
+        """
+        Append a message to a conversation.
+
+        Only the session hosting the conversation appends to it, so the next
+        sequence number is read and used in the same transaction.
+
+        Returns:
+            The sequence number of the message
+        """
+        db = self.session_factory()
+        try:
+            last = db.query(func.max(ConversationTurn.seq)) \
+                .filter(ConversationTurn.conversation_id == conversation_id).scalar()
+            seq = (last or 0) + 1
+            db.add(ConversationTurn(conversation_id=conversation_id, seq=seq, role=role, content=content,
+                                    created_at=datetime.utcnow()))
+            db.commit()
+            return seq
+        finally:
+            db.close()
+
+    def history(self, conversation_id: str, after_seq: int = 0,
+                limit: int = HISTORY_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Read a page of a conversation's messages in order.
+
+        Args:
+            conversation_id: Conversation to read
+            after_seq: Only return messages after this sequence number, 0 for the first page
+            limit: Maximum number of messages, capped at ``HISTORY_MAX_PAGE_SIZE``
+
+        Returns:
+            Dict with ``history`` (dicts with ``seq``, ``role``, ``content`` and
+            ``timestamp``), ``next_seq`` to pass as ``after_seq`` for the next
+            page, and ``has_more``
+        """
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        db = self.session_factory()
+        try:
+            rows = db.query(ConversationTurn.seq, ConversationTurn.role, ConversationTurn.content,
+                            ConversationTurn.created_at) \
+                .filter(ConversationTurn.conversation_id == conversation_id, ConversationTurn.seq > after_seq) \
+                .order_by(ConversationTurn.seq).limit(limit + 1).all()
+        finally:
+            db.close()
+        turns = [{'seq': row.seq, 'role': row.role, 'content': row.content,
+                  'timestamp': row.created_at.isoformat() + 'Z'} for row in rows[:limit]]
+        return {'history': turns, 'next_seq': turns[-1]['seq'] if turns else after_seq,
+                'has_more': len(rows) > limit}
+
+    def recent(self, conversation_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Return the last ``limit`` messages of a conversation, oldest first, to resume it."""
+        db = self.session_factory()
+        try:
+            rows = db.query(ConversationTurn.seq, ConversationTurn.role, ConversationTurn.content) \
+                .filter(ConversationTurn.conversation_id == conversation_id) \
+                .order_by(ConversationTurn.seq.desc()).limit(limit).all()
+        finally:
+            db.close()
+        return [{'seq': row.seq, 'role': row.role, 'content': row.content} for row in reversed(rows)]
+
+
+_store: Optional[ConversationStore] = None
+
+
+def configure_conversation_store(session_factory) -> ConversationStore:
+    """Create the process-wide store (in the web process and in each session worker)."""
+    global _store
+    _store = ConversationStore(session_factory)
+    return _store
+
+
+def get_conversation_store() -> Optional[ConversationStore]:
+    """Return the process-wide store, or None if the application did not configure one."""
+    return _store
@@ -0,0 +1,83 @@
+"""Database engine and session factory shared by the web app and the session workers.
+
+Session workers are started from a fork server that preloads this module, so they open
+their own connections instead of inheriting the web process's pool, threads and locks.
+"""
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from aws_clients import get_client
+from dsql_auth import DsqlTokenCache, DSQL_TOKEN_LIFETIME
+from mcp_catalog import configure_mcp_catalog
+from conversation_store import configure_conversation_store
+
+# Generate DSQL auth token for PostgreSQL connections
+def generate_dsql_token(cluster_endpoint, region='us-east-1', expires_in=DSQL_TOKEN_LIFETIME):
+    """Generate authentication token for DSQL PostgreSQL connections"""
+    client = get_client("dsql", region_name=region)
+    # Use admin token for full access
+    token = client.generate_db_connect_admin_auth_token(cluster_endpoint, region, ExpiresIn=expires_in)
+    return token
+
+# DSQL tokens are cached and refreshed in the background instead of signed per connection
+dsql_tokens = DsqlTokenCache(lambda: generate_dsql_token(os.environ.get('SQLALCHEMY_DATABASE_URI')))
+
+# Configure database URI based on environment
+def get_database_uri():
+    """Get database URI with appropriate authentication"""
+    # Default to SQLite if no environment variable is set
+    db_uri = os.environ.get('SQLALCHEMY_DATABASE_URI')
+    if not db_uri:
+        # Use SQLite database
+        db_uri = 'sqlite:///instance/strands.db'
+    else:
+        # The token is added when a connection is opened (see provide_token), not signed at import
+        db_uri = URL.create("postgresql+pg8000", username="admin", host=db_uri, database="postgres")
+    print("DBURI", db_uri)
+    return db_uri
+
+# Database setup
+DATABASE_URL = get_database_uri()
+engine = create_engine(DATABASE_URL)
+
+# Connection pool sizing for PostgreSQL (DSQL)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '30'))
+# DSQL closes connections after one hour; recycle well before that
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '3000'))
+
+# Configure SQLAlchemy to handle PostgreSQL's limitation with DDL statements in transactions
+if 'postgresql' in str(DATABASE_URL):
+    engine = create_engine(
+        DATABASE_URL,
+        isolation_level='AUTOCOMMIT',  # This prevents DDL statements from being wrapped in transactions
+        poolclass=QueuePool,  # Bounded pool: connections and their TLS sessions are reused
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,  # Test connections before using them, drops ones closed by DSQL
+        pool_recycle=DB_POOL_RECYCLE
+    )
+
+    @event.listens_for(engine, "do_connect")
+    def provide_token(dialect, conn_rec, cargs, cparams):
+        if os.environ.get('SQLALCHEMY_DATABASE_URI'):
+            # The token only authenticates new connections, so a cached one is enough
+            cparams['password'] = dsql_tokens.get()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Web workers forked by gunicorn --preload reach the database through this engine
+# too: drop the pooled connections they inherit instead of sharing their sockets
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+
+def configure_session_worker():
+    """Point the catalogs a session worker reads and writes at this database."""
+    configure_mcp_catalog(SessionLocal)
+    configure_conversation_store(SessionLocal)
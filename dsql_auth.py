@@ -0,0 +1,101 @@
+"""
+Cached authentication tokens for Aurora DSQL connections.
+
+DSQL authenticates each new connection with a short-lived signed token.
+Generating one per connection put a boto3 client construction and a signing
+step on every checkout that needed a new connection. ``DsqlTokenCache`` keeps
+the current token and a background thread replaces it ahead of expiry, so the
+connection pool never signs synchronously after the first token.
+"""
+import os
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+# Lifetime requested for generated tokens, and how long before expiry they are replaced
+DSQL_TOKEN_LIFETIME = int(os.environ.get('DSQL_TOKEN_LIFETIME', '900'))
+DSQL_TOKEN_REFRESH_MARGIN = int(os.environ.get('DSQL_TOKEN_REFRESH_MARGIN', '180'))
+# Delay before retrying a failed background refresh
+RETRY_INTERVAL = 10.0
+
+
+class DsqlTokenCache:
+    """Current DSQL token, refreshed ahead of expiry by a background thread."""
+
+    def __init__(self, provider: Callable[[], str], lifetime: float = DSQL_TOKEN_LIFETIME,
+                 refresh_margin: float = DSQL_TOKEN_REFRESH_MARGIN,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            provider: Returns a new token valid for ``lifetime`` seconds
+            lifetime: Validity of a token in seconds
+            refresh_margin: Seconds before expiry at which the token is replaced
+            clock: Monotonic time source
+        """
+        self.provider = provider
+        self.lifetime = lifetime
+        self.refresh_margin = min(refresh_margin, lifetime / 2)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresher_pid = None
+        self._stop = threading.Event()
+        self.refreshes = 0
+
+    def get(self) -> str:
+        """Return a valid token, generating one only if none is cached."""
+        token = self._current()
+        if token is None:
+            # Connections opened concurrently wait for a single signing
+            with self._refresh_lock:
+                token = self._current() or self.refresh()
+        self._ensure_refresher()
+        return token
+
+    def _current(self) -> Optional[str]:
+        with self._lock:
+            return self._token if self._clock() < self._expires_at else None
+
+    def refresh(self) -> str:
+        """Generate a new token and cache it."""
+        issued_at = self._clock()
+        token = self.provider()
+        with self._lock:
+            self._token = token
+            self._expires_at = issued_at + self.lifetime
+            self.refreshes += 1
+        return token
+
+    def stop(self):
+        """Stop the background refresh."""
+        self._stop.set()
+
+    def _ensure_refresher(self):
+        # Threads do not survive fork, so each process (e.g. gunicorn worker) starts its own
+        pid = os.getpid()
+        if self._refresher_pid == pid:
+            return
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher_pid = pid
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, args=(self._stop,), name='dsql-token-refresh',
+                             daemon=True).start()
+
+    def _run(self, stop: threading.Event):
+        delay = self._refresh_delay()
+        while not stop.wait(delay):
+            try:
+                self.refresh()
+                delay = self._refresh_delay()
+            except Exception:
+                traceback.print_exc()
+                delay = RETRY_INTERVAL
+
+    def _refresh_delay(self) -> float:
+        with self._lock:
+            return max(0.0, self._expires_at - self.refresh_margin - self._clock())
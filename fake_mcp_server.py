@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Minimal MCP server over stdio, for tests.
+
+Speaks newline-delimited JSON-RPC directly so it does not depend on the MCP
+server SDK. Tools:
+
+- ``echo(text)``: returns ``text``
+- ``pid()``: returns the server process ID, to tell server instances apart
+- ``crash()``: exits the process without answering
+
+Usage: python fake_mcp_server.py [--tools echo,pid,crash] [--startup-delay SECONDS]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+TOOLS = {
+    'echo': {
+        'description': 'Return the given text',
+        'inputSchema': {'type': 'object', 'properties': {'text': {'type': 'string'}}, 'required': ['text']}
+    },
+    'pid': {
+        'description': 'Return the process ID of this server',
+        'inputSchema': {'type': 'object', 'properties': {}}
+    },
+    'crash': {
+        'description': 'Exit the server process',
+        'inputSchema': {'type': 'object', 'properties': {}}
+    }
+}
+
+
+def _reply(message_id, result=None, error=None):
+    response = {'jsonrpc': '2.0', 'id': message_id}
+    if error is not None:
+        response['error'] = error
+    else:
+        response['result'] = result
+    sys.stdout.write(json.dumps(response) + '\n')
+    sys.stdout.flush()
+
+
+def _call_tool(name, arguments):
+    if name == 'echo':
+        text = arguments.get('text', '')
+    elif name == 'pid':
+        text = str(os.getpid())
+    elif name == 'crash':
+        os._exit(1)
+    else:
+        return {'content': [{'type': 'text', 'text': f'Unknown tool {name}'}], 'isError': True}
+    return {'content': [{'type': 'text', 'text': text}], 'isError': False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake MCP server over stdio')
+    parser.add_argument('--tools', default=','.join(TOOLS))
+    parser.add_argument('--startup-delay', type=float, default=0.0)
+    args = parser.parse_args()
+    enabled = [name for name in args.tools.split(',') if name in TOOLS]
+    if args.startup_delay:
+        time.sleep(args.startup_delay)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        method = message.get('method')
+        message_id = message.get('id')
+        if message_id is None:
+            # Notifications (initialized, cancelled, ...) need no answer
+            continue
+        if method == 'initialize':
+            _reply(message_id, {
+                'protocolVersion': message.get('params', {}).get('protocolVersion', '2025-06-18'),
+                'capabilities': {'tools': {'listChanged': False}},
+                'serverInfo': {'name': 'fake-mcp-server', 'version': '1.0.0'}
+            })
+        elif method == 'ping':
+            _reply(message_id, {})
+        elif method == 'tools/list':
+            _reply(message_id, {'tools': [dict(name=name, **TOOLS[name]) for name in enabled]})
+        elif method == 'tools/call':
+            params = message.get('params', {})
+            _reply(message_id, _call_tool(params.get('name'), params.get('arguments') or {}))
+        else:
+            _reply(message_id, error={'code': -32601, 'message': f'Method not found: {method}'})
+
+
+if __name__ == '__main__':
+    main()
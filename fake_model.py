@@ -0,0 +1,170 @@
+"""
+Fake Strands model provider, for tests, benchmarks and load tests.
+
+Streams synthetic responses in the Bedrock ConverseStream event format without
+calling AWS, and counts its invocations so benchmarks can compare how many
+model round trips an execution mode needs. The app uses it for every agent when
+started with ``MODEL_PROVIDER=fake``, configured by the ``FAKE_MODEL_*``
+variables below. Tool-call patterns:
+
+- ``none``: always answer with text
+- ``each``: call every available tool once, in order, then answer; this is how
+  an orchestrator routes a message through a chain of agent tools
+- ``first``: call the first tool once, then answer
+
+Structured output is built from the defaults of the output model's fields.
+"""
+import asyncio
+import json
+import os
+import threading
+import uuid
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, List, Optional
+
+from strands.models.model import Model
+
+TOOL_CALL_PATTERNS = ('none', 'each', 'first')
+
+# Shape of the responses when the app runs with MODEL_PROVIDER=fake
+FAKE_MODEL_TOKENS = int(os.environ.get('FAKE_MODEL_TOKENS', '50'))
+FAKE_MODEL_FIRST_TOKEN_MS = float(os.environ.get('FAKE_MODEL_FIRST_TOKEN_MS', '300'))
+FAKE_MODEL_TOKEN_MS = float(os.environ.get('FAKE_MODEL_TOKEN_MS', '20'))
+# Tool-call pattern of agents, and of workflow orchestrators
+FAKE_MODEL_TOOL_CALLS = os.environ.get('FAKE_MODEL_TOOL_CALLS', 'none')
+FAKE_MODEL_ORCHESTRATOR_TOOL_CALLS = os.environ.get('FAKE_MODEL_ORCHESTRATOR_TOOL_CALLS', 'each')
+
+_invocations_lock = threading.Lock()
+
+
+class FakeModel(Model):
+    """Model answering with ``tokens`` synthetic tokens, optionally calling tools first."""
+
+    invocations = 0
+
+    def __init__(self, model_id: str = 'fake', tokens: int = 20, first_token_latency: float = 0.0,
+                 token_latency: float = 0.0, tool_calls: str = 'none'):
+        """
+        Args:
+            model_id: Name echoed at the start of every answer
+            tokens: Number of text deltas per answer
+            first_token_latency: Seconds before the first event of a response
+            token_latency: Seconds between text deltas
+            tool_calls: One of ``TOOL_CALL_PATTERNS``
+        """
+        if tool_calls not in TOOL_CALL_PATTERNS:
+            raise ValueError(f"Unknown tool call pattern: {tool_calls}")
+        self.config = {'model_id': model_id, 'tokens': tokens, 'first_token_latency': first_token_latency,
+                       'token_latency': token_latency, 'tool_calls': tool_calls}
+
+    @classmethod
+    def reset_invocations(cls) -> int:
+        """Return the invocation count of every FakeModel and set it back to zero."""
+        with _invocations_lock:
+            count, cls.invocations = cls.invocations, 0
+        return count
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs) -> AsyncGenerator:
+        """
+        Yield an ``output_model`` built from the defaults of its fields.
+
+        The fake model does not make up values, so every field needs a default.
+
+        Raises:
+            TypeError: ``output_model`` has fields without a default
+        """
+        missing = [name for name, field in output_model.model_fields.items() if field.is_required()]
+        if missing:
+            raise TypeError(f"FakeModel builds structured output from field defaults, "
+                            f"{output_model.__name__} has none for: {', '.join(missing)}")
+        with _invocations_lock:
+            FakeModel.invocations += 1
+        if self.config['first_token_latency']:
+            await asyncio.sleep(self.config['first_token_latency'])
+        yield {'output': output_model()}
+
+    async def stream(self, messages: List[Dict[str, Any]], tool_specs: Optional[List[Dict[str, Any]]] = None,
+                     system_prompt: Optional[str] = None, **kwargs: Any) -> AsyncIterable[Dict[str, Any]]:
+        with _invocations_lock:
+            FakeModel.invocations += 1
+        config = self.config
+        if config['first_token_latency']:
+            await asyncio.sleep(config['first_token_latency'])
+
+        yield {'messageStart': {'role': 'assistant'}}
+        tool = self._next_tool(messages, tool_specs or [])
+        if tool is not None:
+            tool_input = {self._input_name(tool): _last_text(messages)}
+            yield {'contentBlockStart': {'start': {'toolUse': {'toolUseId': f'tooluse_{uuid.uuid4().hex[:12]}',
+                                                               'name': tool['name']}}}}
+            yield {'contentBlockDelta': {'delta': {'toolUse': {'input': json.dumps(tool_input)}}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'tool_use'}}
+        else:
+            yield {'contentBlockDelta': {'delta': {'text': f"[{config['model_id']}]"}}}
+            for _ in range(config['tokens']):
+                if config['token_latency']:
+                    await asyncio.sleep(config['token_latency'])
+                yield {'contentBlockDelta': {'delta': {'text': ' token'}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'end_turn'}}
+        usage = {'inputTokens': 1, 'outputTokens': config['tokens'] + 1, 'totalTokens': config['tokens'] + 2}
+        yield {'metadata': {'usage': usage, 'metrics': {'latencyMs': 0}}}
+
+    def _next_tool(self, messages, tool_specs) -> Optional[Dict[str, Any]]:
+        pattern = self.config['tool_calls']
+        if pattern == 'none' or not tool_specs:
+            return None
+        called = _tools_called_this_turn(messages)
+        if pattern == 'first':
+            return tool_specs[0] if not called else None
+        return next((spec for spec in tool_specs if spec['name'] not in called), None)
+
+    @staticmethod
+    def _input_name(tool_spec) -> str:
+        schema = tool_spec.get('inputSchema', {}).get('json', {})
+        names = schema.get('required') or list(schema.get('properties', {})) or ['input']
+        return names[0]
+
+
+def fake_model_from_env(model_id: Optional[str] = None, orchestrator: bool = False) -> FakeModel:
+    """
+    Return a FakeModel configured by the ``FAKE_MODEL_*`` environment variables.
+
+    Args:
+        model_id: Model ID the agent was configured with, echoed in its answers
+        orchestrator: Whether the model drives a workflow orchestrator
+    """
+    return FakeModel(model_id or 'fake', tokens=FAKE_MODEL_TOKENS,
+                     first_token_latency=FAKE_MODEL_FIRST_TOKEN_MS / 1000,
+                     token_latency=FAKE_MODEL_TOKEN_MS / 1000,
+                     tool_calls=FAKE_MODEL_ORCHESTRATOR_TOOL_CALLS if orchestrator else FAKE_MODEL_TOOL_CALLS)
+
+
+def _tools_called_this_turn(messages) -> set:
+    """Names of the tools used since the last user text message."""
+    called = set()
+    for message in reversed(messages):
+        content = message.get('content', [])
+        if message.get('role') == 'user' and any('text' in block for block in content):
+            break
+        called.update(block['toolUse']['name'] for block in content if 'toolUse' in block)
+    return called
+
+
+def _last_text(messages) -> str:
+    """The latest text of the conversation: the user message or the last tool result."""
+    for message in reversed(messages):
+        for block in reversed(message.get('content', [])):
+            if 'text' in block:
+                return block['text']
+            if 'toolResult' in block:
+                texts = [c['text'] for c in block['toolResult'].get('content', []) if 'text' in c]
+                if texts:
+                    return '\n'.join(texts)
+    return ''
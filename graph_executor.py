@@ -0,0 +1,237 @@
+"""
+Deterministic execution of workflow graphs.
+
+By default a workflow graph is only described to an orchestrator LLM, which
+then calls the agents one tool call at a time. The other execution modes run
+the graph as is, without the orchestrator's model round trips:
+
+- ``dag``: nodes are scheduled in topological order, independent branches run
+  concurrently on a bounded thread pool, every node receives the outputs of its
+  predecessors, and the output node joins the results. The latency of a message
+  is set by the critical path of the graph, not by the sum of its agents.
+- ``pipeline``: for a chain from the input node through agents to the output
+  node. Each agent's answer is the next agent's message, and the last agent
+  streams its answer straight to the user.
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Agents of one message running at the same time in the dag execution mode
+WORKFLOW_DAG_MAX_PARALLEL = int(os.environ.get('WORKFLOW_DAG_MAX_PARALLEL', '4'))
+
+EXECUTION_MODES = ('orchestrator', 'dag', 'pipeline')
+DEFAULT_EXECUTION_MODE = 'orchestrator'
+
+
+class GraphError(ValueError):
+    """The workflow graph can not be executed without an orchestrator."""
+
+
+class WorkflowGraph:
+    """
+    The part of a workflow graph that lies on a path from an input node to an output node.
+
+    Built from the ``nodes`` and ``edges`` of a workflow context (see
+    ``WorkflowRunner.load_workflow``); nodes outside those paths are ignored.
+    """
+
+    def __init__(self, nodes: Dict[Hashable, Dict[str, Any]], edges: List[Dict[str, Any]]):
+        """
+        Args:
+            nodes: Node ID -> node data with at least ``type``
+            edges: Dicts with ``source`` and ``target`` node IDs
+
+        Raises:
+            GraphError: If the graph has no input-to-output path, has a cycle on
+                such a path, or routes messages through a tool node
+        """
+        self.nodes = nodes
+        successors: Dict[Hashable, List[Hashable]] = {node_id: [] for node_id in nodes}
+        predecessors: Dict[Hashable, List[Hashable]] = {node_id: [] for node_id in nodes}
+        for edge in edges:
+            source, target = edge['source'], edge['target']
+            if source in nodes and target in nodes and target not in successors[source]:
+                successors[source].append(target)
+                predecessors[target].append(source)
+
+        self.inputs = [node_id for node_id, node in nodes.items() if node['type'] == 'input']
+        self.outputs = [node_id for node_id, node in nodes.items() if node['type'] == 'output']
+        active = _reachable(self.inputs, successors) & _reachable(self.outputs, predecessors)
+        if not any(node_id in active for node_id in self.outputs):
+            raise GraphError("The workflow has no path from an input node to an output node")
+        for node_id in active:
+            if nodes[node_id]['type'] == 'tool':
+                raise GraphError("Tool nodes need an orchestrator to choose their arguments")
+
+        self.successors = {node_id: [n for n in successors[node_id] if n in active] for node_id in active}
+        self.predecessors = {node_id: [n for n in predecessors[node_id] if n in active] for node_id in active}
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[Hashable]:
+        remaining = {node_id: len(preds) for node_id, preds in self.predecessors.items()}
+        ready = [node_id for node_id, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for successor in self.successors[node_id]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    ready.append(successor)
+        if len(order) != len(remaining):
+            raise GraphError("The workflow graph has a cycle")
+        return order
+
+    def chain(self) -> List[Hashable]:
+        """
+        Return the nodes between the input and the output node of a linear graph.
+
+        Raises:
+            GraphError: If the graph branches or joins anywhere
+        """
+        if any(len(nodes) > 1 for nodes in self.successors.values()) or \
+                any(len(nodes) > 1 for nodes in self.predecessors.values()):
+            raise GraphError("The workflow graph is not a single chain from input to output")
+        return [node_id for node_id in self.order if self.nodes[node_id]['type'] not in ('input', 'output')]
+
+    def name(self, node_id: Hashable) -> str:
+        node = self.nodes[node_id]
+        if node['type'] == 'input':
+            return 'User request'
+        return (node.get('reference') or {}).get('name') or f"Node {node_id}"
+
+
+def _reachable(start: List[Hashable], neighbours: Dict[Hashable, List[Hashable]]) -> set:
+    seen = set(start)
+    stack = list(start)
+    while stack:
+        for neighbour in neighbours[stack.pop()]:
+            if neighbour not in seen:
+                seen.add(neighbour)
+                stack.append(neighbour)
+    return seen
+
+
+class DagExecutor:
+    """
+    Runs a message through a ``WorkflowGraph``.
+
+    Called like an agent: ``executor(message)`` returns the joined output. Like a
+    Strands agent, an optional ``callback_handler`` receives the answer as a
+    text ``delta`` once it is complete, and setting the optional ``cancel_signal``
+    stops scheduling nodes; the answer then joins the outputs of the latest
+    completed nodes, those no completed node follows.
+    """
+
+    def __init__(self, graph: WorkflowGraph, run_node: Callable[[Hashable, str], Any],
+                 max_parallel: int = WORKFLOW_DAG_MAX_PARALLEL):
+        """
+        Args:
+            graph: The graph to execute
+            run_node: Runs an agent node on its input text and returns its result
+            max_parallel: Nodes of one message running at the same time
+        """
+        self.graph = graph
+        self.run_node = run_node
+        self.max_parallel = max(1, max_parallel)
+        self.callback_handler: Optional[Callable[..., None]] = None
+
+    def __call__(self, message: str, cancel_signal: Optional[threading.Event] = None) -> str:
+        graph = self.graph
+        outputs: Dict[Hashable, str] = {}
+        remaining = {node_id: len(preds) for node_id, preds in graph.predecessors.items()}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='workflow-dag') as executor:
+            def complete(node_id, output):
+                outputs[node_id] = output
+                for successor in graph.successors[node_id]:
+                    remaining[successor] -= 1
+                    if remaining[successor] > 0:
+                        continue
+                    if graph.nodes[successor]['type'] == 'output':
+                        complete(successor, self._join(successor, outputs))
+                    elif cancel_signal is None or not cancel_signal.is_set():
+                        future = executor.submit(self.run_node, successor, self._join(successor, outputs))
+                        running[future] = successor
+
+            for node_id in graph.order:
+                if graph.nodes[node_id]['type'] == 'input':
+                    complete(node_id, message)
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    try:
+                        output = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    complete(node_id, str(output))
+
+        if cancel_signal is not None and cancel_signal.is_set():
+            answer = self._join_completed(outputs)
+        else:
+            answer = '\n\n'.join(outputs[node_id] for node_id in graph.outputs if node_id in outputs)
+        if self.callback_handler is not None:
+            self.callback_handler(delta={'text': answer})
+        return answer
+
+    def _join_completed(self, outputs: Dict[Hashable, str]) -> str:
+        """Answer of a cancelled run: the outputs of the completed nodes no completed node follows."""
+        latest = [node_id for node_id in self.graph.order
+                  if node_id in outputs and self.graph.nodes[node_id]['type'] != 'input'
+                  and not any(successor in outputs for successor in self.graph.successors[node_id])]
+        if len(latest) == 1:
+            return outputs[latest[0]]
+        return '\n\n'.join(outputs[node_id] if self.graph.nodes[node_id]['type'] == 'output'
+                           else f"## {self.graph.name(node_id)}\n{outputs[node_id]}" for node_id in latest)
+
+    def _join(self, node_id: Hashable, outputs: Dict[Hashable, str]) -> str:
+        """Build the input of a node from the outputs of its predecessors, in graph order."""
+        predecessors = [pred for pred in self.graph.order if pred in self.graph.predecessors[node_id]]
+        if len(predecessors) == 1:
+            return outputs[predecessors[0]]
+        return '\n\n'.join(f"## {self.graph.name(pred)}\n{outputs[pred]}" for pred in predecessors)
+
+
+class PipelineExecutor:
+    """
+    Runs a message through a chain of agents.
+
+    Called like an agent. Setting ``callback_handler`` sets it on the last agent,
+    so the answer streams to the user as it is generated. A ``cancel_signal``
+    is passed to every agent and ends the chain with the output so far.
+    """
+
+    def __init__(self, agents: List[Any]):
+        """
+        Args:
+            agents: Callable agents in chain order, at least one
+        """
+        if not agents:
+            raise GraphError("The workflow pipeline has no agents")
+        self.agents = agents
+
+    @property
+    def callback_handler(self) -> Optional[Callable[..., None]]:
+        return self.agents[-1].callback_handler
+
+    @callback_handler.setter
+    def callback_handler(self, handler: Optional[Callable[..., None]]):
+        self.agents[-1].callback_handler = handler
+
+    def __call__(self, message: str, cancel_signal: Optional[threading.Event] = None) -> str:
+        output = message
+        for agent in self.agents:
+            if cancel_signal is not None:
+                if cancel_signal.is_set():
+                    break
+                output = str(agent(output, cancel_signal=cancel_signal))
+            else:
+                output = str(agent(output))
+        return output
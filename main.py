@@ -1,9 +1,16 @@
+import os
 import subprocess
 
+# Sessions are routed through the shared session directory, so the web tier
+# can run one worker per core
+workers = os.environ.get('WEB_CONCURRENCY', str(os.cpu_count() or 1))
+# Each web worker's session pool takes its share of the node's session caps
+os.environ['WEB_CONCURRENCY'] = workers
+
 subprocess.run([
     "gunicorn", "app:app", 
     "--bind", "0.0.0.0:5000", 
-    "--workers", "1", 
+    "--workers", workers, 
     "--preload", 
     "-k", "uvicorn.workers.UvicornWorker"
 ])
\ No newline at end of file
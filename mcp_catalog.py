@@ -0,0 +1,142 @@
+"""
+Persistent catalog of MCP tool schemas.
+
+Listing the tools of an MCP server means starting it and waiting for a
+``list_tools`` round trip. The catalog stores each server's tool names and
+input schemas in the database, keyed by a hash of its normalized configuration,
+so the tool editor and session startup answer from it. Entries are refetched
+after ``MCP_CATALOG_TTL`` seconds or on explicit refresh.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from mcp.types import Tool as MCPTool
+from strands.tools.mcp import MCPAgentTool
+
+from mcp_manager import get_mcp_manager, server_key
+from models import MCPCatalogEntry
+
+MCP_CATALOG_TTL = float(os.environ.get('MCP_CATALOG_TTL', str(24 * 3600)))
+
+
+def config_hash(command: str, args: Optional[List[str]], env: Optional[Dict[str, str]]) -> str:
+    """Return the catalog key of a server definition from ``locate_config``."""
+    return hashlib.sha256(json.dumps(server_key(command, args, env)).encode('utf-8')).hexdigest()
+
+
+def fetch_tool_specs(command: str, args: Optional[List[str]], env: Optional[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """List the tools of a server through the shared MCP server manager."""
+    manager = get_mcp_manager()
+    client = manager.acquire(command, args, env)
+    try:
+        specs = []
+        # The catalog only fetches on a miss, expiry or refresh: always ask the server
+        for tool in manager.list_tools(client, refresh=True):
+            spec = tool.mcp_tool.model_dump(by_alias=True, exclude_none=True)
+            specs.append({key: spec[key] for key in ('name', 'description', 'inputSchema') if key in spec})
+        return specs
+    finally:
+        manager.release(client)
+
+
+def build_tools(specs: List[Dict[str, Any]], client) -> List[MCPAgentTool]:
+    """Create agent tools bound to ``client`` from catalog schemas, without asking the server."""
+    return [MCPAgentTool(MCPTool(**spec), client) for spec in specs]
+
+
+class MCPToolCatalog:
+    """Database-backed cache of MCP tool schemas with a TTL."""
+
+    def __init__(self, session_factory, ttl: float = MCP_CATALOG_TTL,
+                 fetcher: Callable[..., List[Dict[str, Any]]] = fetch_tool_specs):
+        """
+        Args:
+            session_factory: SQLAlchemy session factory, e.g. ``SessionLocal``
+            ttl: Seconds after which an entry is fetched again from the server
+            fetcher: Lists the tool specs of a server given (command, args, env)
+        """
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.fetcher = fetcher
+        # One fetch per server at a time, concurrent callers wait for it
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def get(self, command: str, args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None,
+            refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return the tool specs of a server.
+
+        Args:
+            command, args, env: Server definition from ``locate_config``
+            refresh: Fetch from the server even if the entry is fresh
+
+        Returns:
+            List of dicts with ``name``, ``description`` and ``inputSchema``
+        """
+        key = config_hash(command, args, env)
+        if not refresh:
+            specs = self.lookup(key)
+            if specs is not None:
+                return specs
+
+        with self._lock_for(key):
+            if not refresh:
+                # Another caller may have fetched it while we waited
+                specs = self.lookup(key)
+                if specs is not None:
+                    return specs
+            specs = self.fetcher(command, args, env)
+            self._store(key, command, specs)
+            return specs
+
+    def lookup(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the fresh specs stored under ``key``, or None."""
+        db = self.session_factory()
+        try:
+            entry = db.query(MCPCatalogEntry).get(key)
+            if entry is None or entry.fetched_at < datetime.utcnow() - timedelta(seconds=self.ttl):
+                return None
+            return json.loads(entry.tools)
+        finally:
+            db.close()
+
+    def invalidate(self, command: str, args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None):
+        db = self.session_factory()
+        try:
+            db.query(MCPCatalogEntry).filter_by(config_hash=config_hash(command, args, env)).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def _store(self, key: str, command: str, specs: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            db.merge(MCPCatalogEntry(config_hash=key, command=command, tools=json.dumps(specs),
+                                     fetched_at=datetime.utcnow()))
+            db.commit()
+        finally:
+            db.close()
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._fetch_locks.setdefault(key, threading.Lock())
+
+
+_catalog: Optional[MCPToolCatalog] = None
+
+
+def configure_mcp_catalog(session_factory, **kwargs) -> MCPToolCatalog:
+    """Create the process-wide catalog (in the web process and in each session worker)."""
+    global _catalog
+    _catalog = MCPToolCatalog(session_factory, **kwargs)
+    return _catalog
+
+
+def get_mcp_catalog() -> Optional[MCPToolCatalog]:
+    """Return the process-wide catalog, or None if the application did not configure one."""
+    return _catalog
@@ -0,0 +1,328 @@
+"""
+Shared MCP server processes.
+
+Every MCP tool of every agent in every session used to start its own stdio
+server (often an ``npx``/``uvx`` cold start) that was never stopped. The
+manager keeps one server per normalized ``(command, args, env)`` and hands the
+same client to every session that needs it; MCP multiplexes concurrent tool
+calls over one connection. Servers are reference counted by the sessions using
+them, stopped after ``MCP_SERVER_IDLE_TTL`` seconds without users, health
+checked, and restarted when they crash.
+"""
+import asyncio
+import atexit
+import contextvars
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mcp import StdioServerParameters, stdio_client
+from strands.tools.mcp import MCPClient
+
+MCP_SERVER_IDLE_TTL = float(os.environ.get('MCP_SERVER_IDLE_TTL', '300'))
+MCP_HEALTH_CHECK_INTERVAL = float(os.environ.get('MCP_HEALTH_CHECK_INTERVAL', '30'))
+
+# Clients acquired by the current session, released when its lease scope ends
+_session_leases: contextvars.ContextVar[Optional[List['SharedMCPClient']]] = \
+    contextvars.ContextVar('mcp_session_leases', default=None)
+
+
+def server_key(command: str, args: Optional[List[str]], env: Optional[Dict[str, str]]) -> Tuple:
+    """Normalize a server definition from ``locate_config`` into a hashable key."""
+    return (command, tuple(str(arg) for arg in (args or [])),
+            tuple(sorted((str(k), str(v)) for k, v in (env or {}).items())))
+
+
+def _is_connection_lost(result: Dict[str, Any]) -> bool:
+    if result.get('status') != 'error':
+        return False
+    return any('Connection closed' in block.get('text', '') for block in result.get('content', []))
+
+
+class SharedMCPClient(MCPClient):
+    """MCPClient shared by many sessions and restarted by its manager if the server dies."""
+
+    def __init__(self, transport_callable: Callable, key: Tuple, manager: 'MCPServerManager'):
+        super().__init__(transport_callable)
+        self.key = key
+        self.manager = manager
+        self.broken = False
+
+    def call_tool_sync(self, tool_use_id, name, arguments=None, *args, **kwargs):
+        self.manager.ensure_running(self)
+        result = super().call_tool_sync(tool_use_id, name, arguments, *args, **kwargs)
+        if _is_connection_lost(result):
+            # Not retried: the tool may have had side effects before the server died
+            self.broken = True
+        return result
+
+    async def call_tool_async(self, tool_use_id, name, arguments=None, *args, **kwargs):
+        self.manager.ensure_running(self)
+        result = await super().call_tool_async(tool_use_id, name, arguments, *args, **kwargs)
+        if _is_connection_lost(result):
+            self.broken = True
+        return result
+
+
+class LazyMCPConnection:
+    """
+    Stands in for a SharedMCPClient in MCPAgentTool until a tool is actually called.
+
+    The first call acquires (and if needed starts) the shared server; the
+    connection is then kept until the session's lease scope ends.
+    """
+
+    def __init__(self, manager: 'MCPServerManager', command: str, args: Optional[List[str]],
+                 env: Optional[Dict[str, str]], leases: Optional[list]):
+        self.manager = manager
+        self.command = command
+        self.args = args
+        self.env = env
+        # Captured at creation: tool calls run on the agent's threads, outside the session context
+        self._leases = leases
+        self._client: Optional[SharedMCPClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def client(self) -> SharedMCPClient:
+        with self._lock:
+            if self._client is None:
+                self._client = self.manager.acquire(self.command, self.args, self.env, leases=self._leases)
+            return self._client
+
+    def call_tool_sync(self, *args, **kwargs):
+        return self.client().call_tool_sync(*args, **kwargs)
+
+    async def call_tool_async(self, *args, **kwargs):
+        # Starting the server blocks, keep it off the agent's event loop
+        client = self._client or await asyncio.to_thread(self.client)
+        return await client.call_tool_async(*args, **kwargs)
+
+
+class _ServerEntry:
+    """Bookkeeping for one shared server."""
+
+    def __init__(self, client: SharedMCPClient):
+        self.client = client
+        self.refs = 0
+        self.running = False
+        self.tools = None
+        self.idle_since: Optional[float] = None
+        self.last_checked = 0.0
+        self.starts = 0
+        # Serializes start, restart and stop of this server
+        self.lock = threading.Lock()
+
+
+class MCPServerManager:
+    """Reference-counted pool of MCP servers keyed by their normalized configuration."""
+
+    def __init__(self, idle_ttl: float = MCP_SERVER_IDLE_TTL,
+                 health_check_interval: float = MCP_HEALTH_CHECK_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            idle_ttl: Seconds an unused server is kept running
+            health_check_interval: Seconds between liveness probes of a running server
+            clock: Monotonic time source
+        """
+        self.idle_ttl = idle_ttl
+        self.health_check_interval = health_check_interval
+        self._clock = clock
+        self._servers: Dict[Tuple, _ServerEntry] = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._stop = threading.Event()
+
+    def acquire(self, command: str, args: Optional[List[str]] = None,
+                env: Optional[Dict[str, str]] = None, leases: Optional[list] = None) -> SharedMCPClient:
+        """
+        Return a running client for the server, starting it if needed.
+
+        The reference is released by ``release``, or when the enclosing
+        ``lease_scope`` ends (``leases`` selects the scope explicitly).
+        """
+        key = server_key(command, args, env)
+        with self._lock:
+            entry = self._servers.get(key)
+            if entry is None:
+                params = StdioServerParameters(command=command, args=list(args or []), env=env)
+                entry = _ServerEntry(SharedMCPClient(lambda: stdio_client(params), key, self))
+                self._servers[key] = entry
+            entry.refs += 1
+            entry.idle_since = None
+        self._ensure_reaper()
+
+        try:
+            with entry.lock:
+                if not entry.running:
+                    self._start(entry)
+        except Exception:
+            self.release(entry.client)
+            raise
+
+        if leases is None:
+            leases = _session_leases.get()
+        if leases is not None:
+            leases.append(entry.client)
+        return entry.client
+
+    def lazy(self, command: str, args: Optional[List[str]] = None,
+             env: Optional[Dict[str, str]] = None) -> 'LazyMCPConnection':
+        """Return a connection that acquires the server on its first tool call, in the current lease scope."""
+        return LazyMCPConnection(self, command, args, env, _session_leases.get())
+
+    def release(self, client: SharedMCPClient):
+        """Drop one reference; the server stops once unused for ``idle_ttl``."""
+        with self._lock:
+            entry = self._entry(client)
+            if entry is None or entry.refs == 0:
+                return
+            entry.refs -= 1
+            if entry.refs == 0:
+                entry.idle_since = self._clock()
+
+    def list_tools(self, client: SharedMCPClient, refresh: bool = False) -> list:
+        """Return the tools of a server, listed once per server start unless ``refresh`` is set."""
+        entry = self._entry(client)
+        if entry is None:
+            raise RuntimeError(f"MCP server {client.key[0]} is not managed anymore")
+        self.ensure_running(client)
+        with entry.lock:
+            if entry.tools is None or refresh:
+                entry.tools = client.list_tools_sync()
+            return list(entry.tools)
+
+    def ensure_running(self, client: SharedMCPClient):
+        """Restart the server of a client if it was found dead."""
+        entry = self._entry(client)
+        if entry is None or not client.broken:
+            return
+        with entry.lock:
+            if client.broken:
+                print(f"Restarting crashed MCP server {client.key[0]} {' '.join(client.key[1])}")
+                self._stop_entry(entry)
+                self._start(entry)
+
+    @contextmanager
+    def lease_scope(self):
+        """Release every client acquired in this context (e.g. by one session) on exit."""
+        leases = []
+        token = _session_leases.set(leases)
+        try:
+            yield leases
+        finally:
+            _session_leases.reset(token)
+            for client in leases:
+                self.release(client)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return a snapshot of the managed servers."""
+        with self._lock:
+            return [{'command': key[0], 'args': list(key[1]), 'refs': entry.refs,
+                     'running': entry.running, 'starts': entry.starts}
+                    for key, entry in self._servers.items()]
+
+    def shutdown(self):
+        """Stop every server."""
+        self._stop.set()
+        with self._lock:
+            entries = list(self._servers.values())
+            self._servers.clear()
+        for entry in entries:
+            with entry.lock:
+                self._stop_entry(entry)
+
+    def _entry(self, client: SharedMCPClient) -> Optional[_ServerEntry]:
+        entry = self._servers.get(client.key)
+        return entry if entry is not None and entry.client is client else None
+
+    def _start(self, entry: _ServerEntry):
+        entry.client.start()
+        entry.client.broken = False
+        entry.running = True
+        entry.tools = None
+        entry.starts += 1
+        entry.last_checked = self._clock()
+
+    def _stop_entry(self, entry: _ServerEntry):
+        if not entry.running:
+            return
+        entry.running = False
+        entry.tools = None
+        try:
+            entry.client.stop(None, None, None)
+        except Exception:
+            # A crashed server surfaces its transport error on stop
+            pass
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='mcp-server-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(0.05, min(self.idle_ttl, self.health_check_interval) / 2)
+        while not self._stop.wait(interval):
+            try:
+                self.reap()
+            except Exception:
+                traceback.print_exc()
+
+    def reap(self):
+        """Stop servers idle past the TTL and probe the liveness of the others."""
+        now = self._clock()
+        with self._lock:
+            idle = [key for key, entry in self._servers.items()
+                    if entry.refs == 0 and entry.idle_since is not None and now - entry.idle_since >= self.idle_ttl]
+            expired = [self._servers.pop(key) for key in idle]
+            running = [entry for entry in self._servers.values()
+                       if entry.running and now - entry.last_checked >= self.health_check_interval]
+        for entry in expired:
+            with entry.lock:
+                self._stop_entry(entry)
+        for entry in running:
+            entry.last_checked = now
+            if not entry.client.broken:
+                try:
+                    entry.client.list_tools_sync()
+                except Exception:
+                    entry.client.broken = True
+            if entry.client.broken and entry.refs > 0:
+                self.ensure_running(entry.client)
+
+
+_manager: Optional[MCPServerManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_mcp_manager() -> MCPServerManager:
+    """Return the process-wide MCP server manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = MCPServerManager()
+            atexit.register(_manager.shutdown)
+        return _manager
+
+
+def _reset_after_fork():
+    # A forked child (e.g. a gunicorn web worker) inherits entries marked as running, but
+    # not the threads running their clients: it starts its own manager, and leaves
+    # the parent's servers to the parent
+    global _manager, _manager_lock
+    if _manager is not None:
+        atexit.unregister(_manager.shutdown)
+    _manager = None
+    _manager_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
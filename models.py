@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Float, func
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Float, Integer, Index, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, foreign
 from datetime import datetime
+import hashlib
 import uuid
 from passlib.context import CryptContext
 
@@ -12,6 +14,24 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Create base class for SQLAlchemy models
 Base = declarative_base()
 
+def add_missing_columns(engine):
+    """
+    Add the columns declared on the models but missing from existing tables.
+
+    ``create_all`` only creates missing tables. Columns added to a model later
+    must be nullable; they are added here so existing databases keep working.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
 # Helper function to hash passwords
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -95,6 +115,10 @@ class Workflow(Base):
     description = Column(Text)
     graph_icon = Column(Text)  # Base64 encoded image of the workflow graph
     model_id = Column(String(100), nullable=True)  # Bedrock model ID for the workflow
+    # How messages run through the graph: 'orchestrator' (an LLM routes them, the default),
+    # 'dag' (the graph is executed directly) or 'pipeline' (a chain of agents, each answering
+    # the next), see graph_executor
+    execution_mode = Column(String(20), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_edited = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -179,3 +203,116 @@ class User(Base):
         if not user:
             return 'user'  # Default profile for users not in the database
         return user.profile_type or 'user'  # Return 'user' if profile_type is None
+
+class ChatSession(Base):
+    """
+    Directory entry routing a conversation to the session worker hosting it.
+    Shared by all web workers and nodes so any of them can serve the conversation.
+    """
+    __tablename__ = 'chat_session'
+    
+    # Conversation ID handed to the browser
+    id = Column(String(64), primary_key=True)
+    # ID of the workflow or agent the session runs
+    workflow_id = Column(String(64), nullable=False, index=True)
+    # Channel address of the worker hosting the session
+    owner = Column(String(256), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SessionOwner(Base):
+    """
+    Liveness record of a session worker, refreshed by the pool that supervises it.
+    """
+    __tablename__ = 'session_owner'
+    
+    address = Column(String(256), primary_key=True)
+    last_seen = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class MCPCatalogEntry(Base):
+    """
+    Tool schemas advertised by an MCP server, keyed by a hash of its parsed configuration.
+    Lets tool discovery and session startup skip the list_tools round trip.
+    """
+    __tablename__ = 'mcp_catalog'
+    
+    # SHA-256 of the normalized (command, args, env)
+    config_hash = Column(String(64), primary_key=True)
+    command = Column(Text)
+    # JSON list of {name, description, inputSchema}
+    tools = Column(Text, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class Conversation(Base):
+    """
+    A chat conversation, kept after the session hosting it has ended.
+    Its messages are stored as ConversationTurn rows.
+    """
+    __tablename__ = 'conversation'
+    
+    # Conversation ID handed to the browser
+    id = Column(String(64), primary_key=True)
+    # ID of the workflow or agent the conversation runs, and which of the two it is
+    workflow_id = Column(String(64), nullable=False)
+    item_type = Column(String(20), nullable=False, default='workflow')
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ConversationTurn(Base):
+    """
+    One message of a conversation. Append-only, numbered from 1 per conversation.
+    """
+    __tablename__ = 'conversation_turn'
+    __table_args__ = (
+        # History pages are read by conversation in sequence order
+        Index('ix_conversation_turn_conversation_seq', 'conversation_id', 'seq', unique=True),
+    )
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    conversation_id = Column(String(64), nullable=False)
+    seq = Column(Integer, nullable=False)
+    # 'user' or 'assistant'
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class SchemaVersion(Base):
+    """
+    Fingerprint of the schema the database was last migrated to, in a single row.
+    Lets startup skip creating tables and inspecting columns when nothing changed.
+    """
+    __tablename__ = 'schema_version'
+    
+    id = Column(String(16), primary_key=True, default='current')
+    # SHA-256 of the declared tables and columns, see schema_fingerprint
+    fingerprint = Column(String(64), nullable=False)
+    migrated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+def schema_fingerprint():
+    """Return a SHA-256 of the tables and columns declared on the models."""
+    declared = [(table.name, [(column.name, repr(column.type), column.nullable) for column in table.columns])
+                for table in Base.metadata.sorted_tables]
+    return hashlib.sha256(repr(declared).encode()).hexdigest()
+
+def ensure_schema(engine):
+    """
+    Create the missing tables and columns, unless the database is at the current schema.
+
+    Returns:
+        True if the schema was migrated, False if it was already current
+    """
+    fingerprint = schema_fingerprint()
+    table = SchemaVersion.__table__
+    try:
+        with engine.connect() as conn:
+            stored = conn.execute(select(table.c.fingerprint).where(table.c.id == 'current')).scalar()
+    except DBAPIError:
+        # No schema_version table yet
+        stored = None
+    if stored == fingerprint:
+        return False
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        conn.execute(table.insert().values(id='current', fingerprint=fingerprint, migrated_at=datetime.utcnow()))
+    return True
@@ -0,0 +1,79 @@
+"""
+In-memory catalog of the workflows and agents listed in the chat navigation.
+
+Building the dropdown used to load every Workflow and Agent row, graph icons
+included, on every HTTP request. The catalog keeps only (id, name, type) from a
+column-only query and rebuilds it when its version changes: the workflow and
+agent create/update/delete endpoints call ``invalidate()``. Other web workers
+do not see that call, so the catalog also expires after ``NAV_CATALOG_TTL``
+seconds to bound how stale their copy can get.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from models import Agent, Workflow
+
+NAV_CATALOG_TTL = float(os.environ.get('NAV_CATALOG_TTL', '30'))
+
+
+class NavCatalog:
+    """Versioned cache of the navigation items."""
+
+    def __init__(self, session_factory, ttl: float = NAV_CATALOG_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            session_factory: SQLAlchemy session factory, e.g. ``SessionLocal``
+            ttl: Seconds after which the catalog is rebuilt even without invalidation
+            clock: Monotonic time source
+        """
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version = 0
+        self._built_version = -1
+        self._built_at = 0.0
+        self._items: List[Dict[str, Any]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """Mark the catalog stale after a workflow or agent was created, renamed or deleted."""
+        with self._lock:
+            self._version += 1
+
+    def items(self) -> List[Dict[str, Any]]:
+        """
+        Return the navigation items, workflows first.
+
+        Returns:
+            List of dicts with ``id``, ``name`` and ``type`` (``workflow`` or ``agent``)
+        """
+        with self._lock:
+            if self._built_version == self._version and self._clock() - self._built_at < self.ttl:
+                return self._items
+            version = self._version
+        items = self._load()
+        with self._lock:
+            # Keep the result only if nothing was invalidated while loading
+            if version == self._version:
+                self._items = items
+                self._built_version = version
+                self._built_at = self._clock()
+        return items
+
+    def _load(self) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            workflows = db.query(Workflow.id, Workflow.name).all()
+            agents = db.query(Agent.id, Agent.name).all()
+        finally:
+            db.close()
+        items = [{'id': row.id, 'name': row.name, 'type': 'workflow'} for row in workflows]
+        items.extend({'id': row.id, 'name': row.name, 'type': 'agent'} for row in agents)
+        return items
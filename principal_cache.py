@@ -0,0 +1,104 @@
+"""
+Short-lived cache of authenticated principals.
+
+Decoding the session JWT and loading its ``User`` row used to happen up to three
+times per request. The auth middleware now resolves the principal once per
+request, and this cache, keyed by a hash of the token, lets hot endpoints such
+as chat streaming skip the database entirely for ``PRINCIPAL_CACHE_TTL`` seconds.
+Each web worker has its own cache, so a changed profile (e.g. a demoted admin)
+takes up to that long to apply on the workers that did not make the change.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+
+
+class Principal:
+    """The authenticated user of a request, detached from any DB session."""
+
+    def __init__(self, id, username: str, profile_type: Optional[str], is_admin: bool = False):
+        self.id = id
+        self.username = username
+        self.profile_type = profile_type
+        self.is_admin = is_admin
+
+    @classmethod
+    def from_user(cls, user) -> 'Principal':
+        return cls(user.id, user.username, user.profile_type, bool(user.is_admin))
+
+    def __repr__(self):
+        return f"<Principal {self.username} ({self.profile_type})>"
+
+
+class PrincipalCache:
+    """LRU cache of token hash -> Principal with a per-entry expiry."""
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_SIZE,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            ttl: Seconds a principal is served without reloading the user
+            max_size: Number of tokens kept, least recently used are evicted
+            clock: Wall-clock time source, compared with the token ``exp`` claim
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None):
+        """
+        Cache a principal.
+
+        Args:
+            token: The session token the principal was resolved from
+            principal: The resolved principal
+            token_expires_at: The token ``exp`` claim; the entry never outlives it
+        """
+        expires_at = self._clock() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[self._key(token)] = (principal, expires_at)
+            self._entries.move_to_end(self._key(token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """
+        Drop every cached token of a user, e.g. after their profile changed.
+
+        Only this process's cache is cleared: other web workers keep serving the old
+        principal until their entry expires, at most ``ttl`` seconds later.
+        """
+        with self._lock:
+            for key in [k for k, (p, _) in self._entries.items() if str(p.id) == str(user_id)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,743 @@
+"""
+Low-overhead transport between the web process and session workers.
+
+Each session worker listens on its own Unix domain socket (or on a TCP port
+when ``SESSION_ADVERTISE_HOST`` is set, so web workers on other nodes can reach
+it). The web side opens a connection per request, attaches it to a
+conversation ID and exchanges length-prefixed UTF-8 frames with the session.
+Attaching answers a challenge of the worker with an HMAC keyed by
+``SESSION_CHANNEL_SECRET``, so only the web workers can reach a session. This replaces the
+``multiprocessing.Manager`` proxy queues, where every streamed delta cost a
+round trip through the Manager server process.
+
+Output produced by a session is written to the connection that sent the input
+the session is currently handling, so concurrent requests for the same session
+(e.g. a streamed answer and a reset) never read each other's frames.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import queue
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# Directory holding the per-worker sockets
+SOCKET_DIR = os.environ.get('SESSION_SOCKET_DIR', tempfile.gettempdir())
+# Host name or IP other nodes use to reach this node's workers; enables TCP listeners
+ADVERTISE_HOST = os.environ.get('SESSION_ADVERTISE_HOST', '')
+# Interface the TCP listeners bind to, the advertised one unless it is a NAT or proxy address
+BIND_HOST = os.environ.get('SESSION_BIND_HOST', ADVERTISE_HOST)
+# Key of the attach handshake, shared by every web worker and node; falls back to the JWT key
+CHANNEL_SECRET = (os.environ.get('SESSION_CHANNEL_SECRET') or os.environ.get('SECRET_KEY', '')).encode('utf-8')
+
+_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Output a session may queue for a slow reader, and what happens when it is full:
+# 'block' the session until the reader catches up, or 'drop' the output
+OUTPUT_BUFFER_BYTES = int(os.environ.get('SESSION_OUTPUT_BUFFER_BYTES', str(1024 * 1024)))
+OUTPUT_OVERFLOW = os.environ.get('SESSION_OUTPUT_OVERFLOW', 'block')
+OVERFLOW_POLICIES = ('block', 'drop')
+# Seconds a blocked session waits for a stalled reader before hanging up on it
+OUTPUT_BLOCK_TIMEOUT = float(os.environ.get('SESSION_OUTPUT_BLOCK_TIMEOUT', '30'))
+# Frames of the session protocol, as opposed to output for the browser
+CONTROL_PREFIX = b'_Q_E_E_'
+# Sent to the requesting connection when the session takes its message
+_RECEIVED = b'_Q_E_E_RECEIVED'
+# Seconds a cancel request waits for the session to stop answering
+CANCEL_TIMEOUT = float(os.environ.get('SESSION_CANCEL_TIMEOUT', '10'))
+
+
+class ChannelClosed(Exception):
+    """Raised when the other end of a session channel has gone away."""
+
+
+def worker_address(pool_id: str, worker_id: int) -> str:
+    """Return the socket path of a session worker."""
+    return os.path.join(SOCKET_DIR, f"strands-ui-{pool_id}-{worker_id}.sock")
+
+
+def bind_listener(pool_id: str, worker_id: int):
+    """
+    Create the listening socket of a session worker.
+
+    Addresses are plain socket paths for Unix sockets and ``tcp://host:port``
+    for TCP listeners.
+
+    Returns:
+        Tuple of the listening socket and its address
+    """
+    if ADVERTISE_HOST:
+        if not CHANNEL_SECRET:
+            raise RuntimeError("SESSION_CHANNEL_SECRET (or SECRET_KEY) must be set to serve sessions over TCP")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((BIND_HOST, 0))
+        address = f"tcp://{ADVERTISE_HOST}:{sock.getsockname()[1]}"
+    else:
+        address = worker_address(pool_id, worker_id)
+        if os.path.exists(address):
+            os.unlink(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(address)
+        # Only the user running the application may connect
+        os.chmod(address, 0o600)
+    sock.listen(128)
+    return sock, address
+
+
+def is_tcp_address(address: str) -> bool:
+    return address.startswith('tcp://')
+
+
+def _tcp_target(address: str):
+    host, port = address[len('tcp://'):].rsplit(':', 1)
+    return host, int(port)
+
+
+def remove_address(address: str):
+    """Remove the socket file behind a Unix socket address."""
+    if is_tcp_address(address):
+        return
+    try:
+        os.unlink(address)
+    except OSError:
+        pass
+
+
+def attach_frame(challenge: str, session_id: str) -> str:
+    """Answer the challenge of a worker: the frame attaching a connection to a session."""
+    mac = hmac.new(CHANNEL_SECRET, f"{challenge}\n{session_id}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"{session_id}\n{mac}"
+
+
+def _check_attach(challenge: str, payload: str) -> Optional[str]:
+    """Return the session ID of an attach frame, or None if it does not answer ``challenge``."""
+    session_id, _, mac = payload.partition('\n')
+    if not hmac.compare_digest(attach_frame(challenge, session_id), f"{session_id}\n{mac}"):
+        return None
+    return session_id
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    """Write one length-prefixed frame."""
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(reader) -> Optional[bytes]:
+    """
+    Read one length-prefixed frame from a buffered reader.
+
+    Returns:
+        The frame payload, or None if the connection was closed
+    """
+    header = reader.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ChannelClosed(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    payload = reader.read(length)
+    if len(payload) < length:
+        return None
+    return payload
+
+
+class SessionChannel:
+    """
+    Web-side end of a session: one connection attached to a conversation ID.
+
+    Channels are cheap to open and are meant to be used for a single request.
+    """
+
+    def __init__(self, address: str, session_id: str, connect_timeout: float = 10.0):
+        """
+        Args:
+            address: Socket path of the worker hosting the session
+            session_id: Conversation ID to attach to
+            connect_timeout: Seconds to wait for the worker socket to accept connections
+        """
+        self.address = address
+        self.session_id = session_id
+        # Whether the session took a message sent on this channel
+        self.received = False
+        self._sock = self._connect(address, connect_timeout)
+        self._reader = self._sock.makefile('rb')
+        self.put(attach_frame(self.get(), session_id))
+
+    @staticmethod
+    def _connect(address: str, timeout: float) -> socket.socket:
+        deadline = time.monotonic() + timeout
+        while True:
+            if is_tcp_address(address):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                target = _tcp_target(address)
+            else:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                target = address
+            try:
+                sock.connect(target)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                # The worker may still be starting up
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.01)
+
+    def put(self, message: str):
+        """Send a message to the session."""
+        try:
+            send_frame(self._sock, message.encode('utf-8'))
+        except OSError as e:
+            raise ChannelClosed(str(e)) from e
+
+    def get(self, timeout: Optional[float] = None) -> str:
+        """
+        Receive the next message from the session. The session's receipts of
+        the messages sent on this channel are not returned, they set ``received``.
+
+        Raises:
+            ChannelClosed: If the worker closed the connection
+            socket.timeout: If no message arrived within ``timeout`` seconds
+        """
+        self._sock.settimeout(timeout)
+        while True:
+            try:
+                payload = recv_frame(self._reader)
+            except (ConnectionResetError, BrokenPipeError) as e:
+                raise ChannelClosed(str(e)) from e
+            if payload is None:
+                raise ChannelClosed(f"Session {self.session_id} closed the channel")
+            if payload != _RECEIVED:
+                return payload.decode('utf-8')
+            self.received = True
+
+    def close(self):
+        try:
+            self._reader.close()
+        finally:
+            self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncSessionChannel:
+    """
+    Asyncio counterpart of ``SessionChannel`` for use inside request handlers.
+
+    Waiting for session output suspends the coroutine instead of holding a
+    threadpool thread, so one web worker can serve many concurrent streams.
+    """
+
+    def __init__(self, session_id: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 address: Optional[str] = None):
+        self.session_id = session_id
+        self.address = address
+        # Whether the session took a message sent on this channel
+        self.received = False
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open(cls, address: str, session_id: str, connect_timeout: float = 10.0):
+        """
+        Connect to the worker hosting a session and attach to it.
+
+        Args:
+            address: Socket path of the worker hosting the session
+            session_id: Conversation ID to attach to
+            connect_timeout: Seconds to wait for the worker socket to accept connections
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + connect_timeout
+        while True:
+            try:
+                if is_tcp_address(address):
+                    host, port = _tcp_target(address)
+                    reader, writer = await asyncio.open_connection(host, port)
+                    writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                else:
+                    reader, writer = await asyncio.open_unix_connection(address)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The worker may still be starting up
+                if loop.time() >= deadline:
+                    raise
+                await asyncio.sleep(0.01)
+        channel = cls(session_id, reader, writer, address)
+        await channel.put(attach_frame(await channel.get(), session_id))
+        return channel
+
+    async def put(self, message: str):
+        """Send a message to the session."""
+        payload = message.encode('utf-8')
+        try:
+            self._writer.write(_HEADER.pack(len(payload)) + payload)
+            await self._writer.drain()
+        except OSError as e:
+            raise ChannelClosed(str(e)) from e
+
+    async def get(self, timeout: Optional[float] = None) -> str:
+        """
+        Receive the next message from the session. The session's receipts of
+        the messages sent on this channel are not returned, they set ``received``.
+
+        Raises:
+            ChannelClosed: If the worker closed the connection
+            asyncio.TimeoutError: If no message arrived within ``timeout`` seconds
+        """
+        while True:
+            try:
+                header = await asyncio.wait_for(self._reader.readexactly(_HEADER.size), timeout)
+                (length,) = _HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    raise ChannelClosed(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+                payload = await self._reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError) as e:
+                raise ChannelClosed(f"Session {self.session_id} closed the channel") from e
+            if payload != _RECEIVED:
+                return payload.decode('utf-8')
+            self.received = True
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except OSError:
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class OutputBuffer:
+    """
+    Bounded queue of the frames a session has yet to write to its connections.
+
+    Every frame is queued for the connection whose request it answers, so output
+    never reaches a later request, and the frames of a connection are purged
+    when it goes away. Output frames queued behind an unsent output frame for the
+    same connection are coalesced into it: a reader that falls behind gets fewer,
+    larger frames. Control frames (``_Q_E_E_*``) are never coalesced or dropped.
+
+    When the queued output exceeds ``max_bytes``, ``put`` either blocks until
+    the writer catches up or drops the frame, as set by ``policy``.
+    """
+
+    def __init__(self, max_bytes: int = OUTPUT_BUFFER_BYTES, policy: str = OUTPUT_OVERFLOW,
+                 block_timeout: float = OUTPUT_BLOCK_TIMEOUT):
+        """
+        Args:
+            max_bytes: Bytes of output frames queued at most
+            policy: ``block`` or ``drop``, what ``put`` does when the buffer is full
+            block_timeout: Seconds ``put`` blocks before giving up on the reader
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown output overflow policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.block_timeout = block_timeout
+        # [connection, payload, is control frame]
+        self._frames = deque()
+        self._bytes = 0
+        self._sending = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put(self, conn, payload: bytes) -> bool:
+        """
+        Queue a frame for ``conn``.
+
+        Returns:
+            False if the frame was dropped, or if the buffer stayed full for
+            ``block_timeout`` seconds
+        """
+        control = payload.startswith(CONTROL_PREFIX)
+        with self._cond:
+            if not control:
+                def has_room():
+                    return self._closed or not self._bytes or self._bytes + len(payload) <= self.max_bytes
+                if not has_room():
+                    if self.policy == 'drop' or not self._cond.wait_for(has_room, self.block_timeout):
+                        self.dropped += 1
+                        return False
+                self._bytes += len(payload)
+                last = self._frames[-1] if self._frames else None
+                if last is not None and last[0] is conn and not last[2]:
+                    last[1] += payload
+                    self.coalesced += 1
+                    return True
+            self._frames.append([conn, bytearray(payload), control])
+            self._cond.notify_all()
+        return True
+
+    def take(self) -> Optional[List[list]]:
+        """
+        Wait for frames and remove every queued one; call ``sent`` once they are written.
+
+        Returns:
+            ``[connection, payload, is control]`` lists, or None once the buffer is closed and empty
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._frames or self._closed)
+            if not self._frames:
+                return None
+            frames = list(self._frames)
+            self._frames.clear()
+            self._bytes = 0
+            self._sending = True
+            self._cond.notify_all()
+            return frames
+
+    def sent(self):
+        with self._cond:
+            self._sending = False
+            self._cond.notify_all()
+
+    def purge(self, conn):
+        """Drop the frames queued for a connection that went away."""
+        with self._cond:
+            kept = deque(frame for frame in self._frames if frame[0] is not conn)
+            self._bytes = sum(len(frame[1]) for frame in kept if not frame[2])
+            self._frames = kept
+            self._cond.notify_all()
+
+    def flush(self, timeout: float) -> bool:
+        """Wait until every queued frame is written; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._frames and not self._sending, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def size(self) -> int:
+        """Bytes of output frames queued."""
+        return self._bytes
+
+
+class ServerSessionChannel:
+    """
+    Worker-side end of a session.
+
+    ``get`` returns messages from any attached connection and remembers which
+    connection sent it; ``put`` queues output for that connection in a bounded
+    ``OutputBuffer`` that a writer thread drains, so a slow reader never holds
+    up the session for longer than the overflow policy allows. If that
+    connection goes away while the session is handling its message,
+    ``cancel_signal`` is set so the session can stop generating.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.owned = False
+        # Which instance of the session owns the channel, a conversation can be resumed
+        self.generation = None
+        # Set once asked to terminate, the session no longer takes connections
+        self.terminated = False
+        self._inbound = queue.Queue()
+        self._lock = threading.Lock()
+        # Messages received so far, and how many of them a cancel request covered
+        self._received = 0
+        self._cancelled = 0
+        self._reply = None
+        self._pending = []
+        self._attached_once = False
+        self._connections = set()
+        self._output = OutputBuffer()
+        self._writer = None
+        # Set when the requester of the message being handled is gone, cleared by the next message
+        self.cancel_signal = threading.Event()
+        # Monotonic time of the last message or answer, and whether the session waits for input
+        self.last_active = time.monotonic()
+        self.waiting = False
+
+    def get(self, timeout: Optional[float] = None) -> str:
+        self.last_active = time.monotonic()
+        self.waiting = True
+        try:
+            conn, message, seq = self._inbound.get(timeout=timeout)
+        finally:
+            self.waiting = False
+            self.last_active = time.monotonic()
+        with self._lock:
+            # A message sent before a cancel request starts cancelled
+            if seq is not None and seq <= self._cancelled:
+                self.cancel_signal.set()
+            else:
+                self.cancel_signal.clear()
+            if conn is not None:
+                self._reply = conn
+        if conn is not None and not message.startswith('_Q_E_E_'):
+            # If the session ends from here on, the web side must not send the message again
+            self._queue_output(conn, _RECEIVED)
+        return message
+
+    def cancel(self):
+        """Cancel the answer in progress and the messages queued behind it."""
+        with self._lock:
+            self._cancelled = self._received
+            if not self.waiting:
+                self.cancel_signal.set()
+
+    def idle(self) -> bool:
+        """Whether the session waits for input with no message queued."""
+        return self.waiting and self._inbound.empty()
+
+    def idle_for(self) -> float:
+        """Seconds the session has been waiting for input, 0 while it handles a message."""
+        return time.monotonic() - self.last_active if self.waiting else 0.0
+
+    def put(self, message: str):
+        payload = message.encode('utf-8')
+        with self._lock:
+            conn = self._reply
+            if conn is None:
+                # Output produced before the web side attached, e.g. _Q_E_E_STARTED
+                if not self._attached_once:
+                    self._pending.append(payload)
+                return
+        self._queue_output(conn, payload)
+
+    def _queue_output(self, conn: socket.socket, payload: bytes):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name=f'session-output-{self.session_id}',
+                                                daemon=True)
+                self._writer.start()
+        if not self._output.put(conn, payload) and self._output.policy == 'block':
+            # The reader stalled: hang up, which purges its output and cancels the answer
+            print(f"Session {self.session_id}: reader stalled for {self._output.block_timeout}s, disconnecting")
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        """End the session: write the queued output, then hang up every connection attached to it."""
+        self._output.flush(OUTPUT_BLOCK_TIMEOUT)
+        self._output.close()
+        with self._lock:
+            connections, self._connections = self._connections, set()
+            self._reply = None
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def deliver(self, message: str):
+        """Queue a message for the session from inside the worker."""
+        self._inbound.put((None, message, None))
+
+    def _write_loop(self):
+        while True:
+            frames = self._output.take()
+            if frames is None:
+                return
+            # One write per run of frames for the same connection
+            start = 0
+            while start < len(frames):
+                conn = frames[start][0]
+                end = start
+                while end < len(frames) and frames[end][0] is conn:
+                    end += 1
+                data = b''.join(_HEADER.pack(len(frame[1])) + frame[1] for frame in frames[start:end])
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    # The requester went away; drop its output
+                    self._output.purge(conn)
+                    with self._lock:
+                        if self._reply is conn:
+                            self._reply = None
+                start = end
+            self._output.sent()
+
+    def _attach(self, conn: socket.socket):
+        with self._lock:
+            self._connections.add(conn)
+            # Only the first client receives what was put before anyone
+            # attached; later clients become the reply when their message is
+            # read, so they never see the tail of an answer they did not ask for
+            if not self._attached_once:
+                self._attached_once = True
+                self._reply = conn
+                try:
+                    for payload in self._pending:
+                        send_frame(conn, payload)
+                except OSError:
+                    self._reply = None
+                self._pending = []
+
+    def _receive(self, conn: socket.socket, message: str):
+        if message == "_Q_E_E_CANCEL":
+            # Handled right away rather than queued behind the answer it cancels. This
+            # runs on the requesting connection's reader thread, so waiting is harmless.
+            self.cancel()
+            deadline = time.monotonic() + CANCEL_TIMEOUT
+            while not self.idle() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self._queue_output(conn, b'_Q_E_E_CANCELLED' if self.idle() else b'_Q_E_E_BUSY')
+            return
+        if message == "_Q_E_E_EVICT":
+            # Unlike a terminate request, ends the session only if it waits for input
+            with self._lock:
+                evicted = self.idle()
+                if evicted:
+                    self.terminated = True
+                    self._inbound.put((None, "_Q_E_E_TERMINATE", None))
+            self._queue_output(conn, b'_Q_E_E_EVICTED' if evicted else b'_Q_E_E_BUSY')
+            return
+        if message == "_Q_E_E_TERMINATE":
+            # Stop the answer in progress so the session reads the request soon
+            self.terminated = True
+            self.cancel()
+        with self._lock:
+            self._received += 1
+            self._inbound.put((conn, message, self._received))
+
+    def _detach(self, conn: socket.socket):
+        self._output.purge(conn)
+        with self._lock:
+            self._connections.discard(conn)
+            if self._reply is conn:
+                self._reply = None
+                if not self.waiting:
+                    # The client of the answer in progress disconnected
+                    self.cancel_signal.set()
+
+
+class ChannelServer:
+    """Socket server multiplexing the sessions hosted by one worker."""
+
+    def __init__(self, sock: socket.socket, address: str):
+        """
+        Args:
+            sock: Listening socket, as returned by ``bind_listener``
+            address: Address the web side uses to reach ``sock``
+        """
+        self.address = address
+        self._sessions: Dict[str, ServerSessionChannel] = {}
+        self._ended = set()
+        self._lock = threading.Lock()
+        self._sock = sock
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept_loop, name='session-channel-server',
+                                        daemon=True)
+        self._thread.start()
+
+    def open(self, session_id: str, generation: Optional[int] = None) -> ServerSessionChannel:
+        """
+        Return the channel for a session hosted by this worker.
+
+        Args:
+            session_id: Conversation ID of the session
+            generation: Instance of the session; a conversation resumed while its
+                previous session is still ending gets a channel of its own
+        """
+        with self._lock:
+            # A conversation resumed on the worker that hosted it before
+            self._ended.discard(session_id)
+            channel = self._sessions.get(session_id)
+            if channel is not None and channel.owned and channel.generation != generation:
+                # The previous session keeps its channel; new connections reach this one
+                channel = None
+            if channel is None:
+                channel = self._sessions[session_id] = ServerSessionChannel(session_id)
+            channel.owned = True
+            channel.generation = generation
+            return channel
+
+    def sessions(self) -> List[ServerSessionChannel]:
+        """Return the channels of the sessions running on this worker."""
+        with self._lock:
+            return [channel for channel in self._sessions.values() if channel.owned]
+
+    def close_session(self, channel: ServerSessionChannel):
+        """Close the channel of an ended session, as returned by ``open``."""
+        with self._lock:
+            # Unless a resumed session of the conversation took over
+            if self._sessions.get(channel.session_id) is channel:
+                del self._sessions[channel.session_id]
+                self._ended.add(channel.session_id)
+        channel.close()
+
+    def close(self):
+        try:
+            self._sock.close()
+        finally:
+            remove_address(self.address)
+
+    def _get_or_create(self, session_id: str) -> ServerSessionChannel:
+        channel = self._sessions.get(session_id)
+        if channel is None:
+            channel = self._sessions[session_id] = ServerSessionChannel(session_id)
+        return channel
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn: socket.socket):
+        reader = conn.makefile('rb')
+        channel = None
+        try:
+            challenge = os.urandom(16).hex()
+            send_frame(conn, challenge.encode('utf-8'))
+            payload = recv_frame(reader)
+            if payload is None:
+                return
+            session_id = _check_attach(challenge, payload.decode('utf-8'))
+            if session_id is None:
+                # Not a web worker of this application
+                return
+            with self._lock:
+                ending = self._sessions.get(session_id)
+                if session_id in self._ended or (ending is not None and ending.terminated):
+                    # Hang up so the web side sees the session is gone
+                    return
+                # The web side may attach before the session task reaches the worker
+                channel = self._get_or_create(session_id)
+            channel._attach(conn)
+            while True:
+                payload = recv_frame(reader)
+                if payload is None:
+                    break
+                channel._receive(conn, payload.decode('utf-8'))
+        except (OSError, ChannelClosed):
+            pass
+        finally:
+            if channel is not None:
+                channel._detach(conn)
+                with self._lock:
+                    # Drop channels created by connections for sessions that never started here
+                    if not channel.owned and self._sessions.get(channel.session_id) is channel:
+                        self._sessions.pop(channel.session_id, None)
+            reader.close()
+            conn.close()
@@ -0,0 +1,192 @@
+"""
+Session routing: find the worker that owns a conversation.
+
+Sessions live in worker processes supervised by one web worker, but requests
+for a conversation can land on any web worker or node. The directory maps each
+conversation ID to the channel address of its owner and tracks owner liveness
+through heartbeats, so a conversation whose worker died is reported as gone
+instead of hanging the request.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from models import ChatSession, SessionOwner
+
+# Seconds without a heartbeat after which an owner is considered dead
+OWNER_TTL = float(os.environ.get('SESSION_OWNER_TTL', '30'))
+# Owner TTLs after which a dead owner and the routes to it are forgotten
+DEAD_OWNER_TTLS = 10
+
+
+class SessionDirectory(ABC):
+    """Interface of the conversation ID -> owner address directory."""
+
+    @abstractmethod
+    def register(self, conversation_id: str, workflow_id: Any, owner: str):
+        """Record that ``owner`` hosts the conversation."""
+
+    @abstractmethod
+    def lookup(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the owner of a conversation.
+
+        Returns:
+            Dict with ``workflow_id`` and ``owner``, or None if the conversation
+            is unknown or its owner stopped sending heartbeats. The route is
+            kept: an owner that is only late comes back with its next heartbeat.
+        """
+
+    @abstractmethod
+    def remove(self, conversation_id: str, owner: Optional[str] = None):
+        """
+        Forget the route of a conversation.
+
+        Args:
+            conversation_id: Conversation to forget
+            owner: Only forget the route if it still leads to this owner, so the
+                session of a conversation resumed elsewhere is kept
+        """
+
+    @abstractmethod
+    def sessions_for_workflow(self, workflow_id: Any) -> List[str]:
+        """Return the conversation IDs of the live sessions running a workflow."""
+
+    @abstractmethod
+    def heartbeat(self, owners: List[str]):
+        """Mark the given owner addresses as alive, and drop the routes of owners dead for long."""
+
+
+class LocalSessionDirectory(SessionDirectory):
+    """In-process directory, for a single web worker and for tests."""
+
+    def __init__(self, owner_ttl: float = OWNER_TTL, clock: Callable[[], float] = time.monotonic):
+        self.owner_ttl = owner_ttl
+        self._clock = clock
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._owners: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, conversation_id, workflow_id, owner):
+        with self._lock:
+            self._owners[owner] = self._clock()
+            self._sessions[conversation_id] = {'workflow_id': str(workflow_id), 'owner': owner}
+
+    def lookup(self, conversation_id):
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is None or not self._is_alive(session['owner']):
+                return None
+            return dict(session)
+
+    def remove(self, conversation_id, owner=None):
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is not None and owner in (None, session['owner']):
+                del self._sessions[conversation_id]
+
+    def sessions_for_workflow(self, workflow_id):
+        with self._lock:
+            return [conversation_id for conversation_id, session in self._sessions.items()
+                    if session['workflow_id'] == str(workflow_id) and self._is_alive(session['owner'])]
+
+    def heartbeat(self, owners):
+        with self._lock:
+            now = self._clock()
+            for owner in owners:
+                self._owners[owner] = now
+            dead = {owner for owner, last_seen in self._owners.items()
+                    if now - last_seen > self.owner_ttl * DEAD_OWNER_TTLS}
+            for owner in dead:
+                del self._owners[owner]
+            self._sessions = {conversation_id: session for conversation_id, session in self._sessions.items()
+                              if session['owner'] in self._owners}
+
+    def _is_alive(self, owner):
+        last_seen = self._owners.get(owner)
+        return last_seen is not None and self._clock() - last_seen <= self.owner_ttl
+
+
+class DatabaseSessionDirectory(SessionDirectory):
+    """
+    Directory stored in the application database.
+
+    Shared by every web worker using the same database: a SQLite file for
+    workers on one machine, DSQL for nodes behind AppRunner.
+    """
+
+    def __init__(self, session_factory, owner_ttl: float = OWNER_TTL):
+        """
+        Args:
+            session_factory: SQLAlchemy session factory, e.g. ``SessionLocal``
+            owner_ttl: Seconds without heartbeat after which an owner is dead
+        """
+        self.session_factory = session_factory
+        self.owner_ttl = owner_ttl
+
+    def register(self, conversation_id, workflow_id, owner):
+        db = self.session_factory()
+        try:
+            db.merge(SessionOwner(address=owner, last_seen=datetime.utcnow()))
+            db.merge(ChatSession(id=conversation_id, workflow_id=str(workflow_id), owner=owner))
+            db.commit()
+        finally:
+            db.close()
+
+    def lookup(self, conversation_id):
+        db = self.session_factory()
+        try:
+            row = db.query(ChatSession.workflow_id, ChatSession.owner, SessionOwner.last_seen) \
+                .outerjoin(SessionOwner, SessionOwner.address == ChatSession.owner) \
+                .filter(ChatSession.id == conversation_id).first()
+            if row is None or row.last_seen is None or row.last_seen < self._cutoff():
+                return None
+            return {'workflow_id': row.workflow_id, 'owner': row.owner}
+        finally:
+            db.close()
+
+    def remove(self, conversation_id, owner=None):
+        db = self.session_factory()
+        try:
+            query = db.query(ChatSession).filter_by(id=conversation_id)
+            if owner is not None:
+                query = query.filter_by(owner=owner)
+            query.delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def sessions_for_workflow(self, workflow_id):
+        db = self.session_factory()
+        try:
+            rows = db.query(ChatSession.id) \
+                .join(SessionOwner, SessionOwner.address == ChatSession.owner) \
+                .filter(ChatSession.workflow_id == str(workflow_id),
+                        SessionOwner.last_seen >= self._cutoff()).all()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def heartbeat(self, owners):
+        if not owners:
+            return
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for owner in owners:
+                db.merge(SessionOwner(address=owner, last_seen=now))
+            # Forget owners that have been dead for a long time, with their sessions
+            dead = SessionOwner.last_seen < now - timedelta(seconds=self.owner_ttl * DEAD_OWNER_TTLS)
+            db.query(ChatSession).filter(
+                ChatSession.owner.in_(db.query(SessionOwner.address).filter(dead).scalar_subquery())
+            ).delete(synchronize_session=False)
+            db.query(SessionOwner).filter(dead).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.owner_ttl)
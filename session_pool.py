@@ -0,0 +1,534 @@
+"""
+Supervised pool of pre-started session worker processes.
+
+Instead of spawning a new process per chat activation, sessions are handed to
+long-lived workers that already have the Strands stack imported. Each worker
+hosts many sessions (one thread per session) and is recycled once it has served
+a configured number of sessions or its resident memory grows past a ceiling.
+Workers talk to the web side through the sockets in ``session_channel``.
+
+Sessions only ended on an explicit reset or workflow edit, so abandoned chats
+kept their threads, agents and MCP leases forever. Workers now end sessions
+left idle for ``SESSION_IDLE_TTL`` seconds, and the pool caps the number of
+sessions and the memory of all its workers by evicting the least recently used
+idle sessions. Conversations are stored (see ``conversation_store``), so an
+ended session is resumed from its history when the user comes back.
+
+Workers are started from a fork server, not forked from the web process: a
+web process runs threads (the event loop's executor, token refreshers, the
+supervisor) whose locks a forked child could inherit held. The fork server is
+single-threaded and preloads the modules sessions use, so starting a worker
+stays cheap.
+"""
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from multiprocessing import Process, Queue
+from typing import Any, Callable, Dict, List, Optional
+
+from session_channel import ChannelClosed, ChannelServer, SessionChannel, bind_listener, remove_address
+
+# Web workers on this node, each running its own pool (set by main.py)
+WEB_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', '1')))
+
+
+def _node_share(total: int) -> int:
+    """This web worker's share of a node-wide setting, 0 staying 0 (no cap)."""
+    return -(-total // WEB_WORKERS)
+
+
+# Pool tuning, overridable from the environment. Warm workers and the caps are
+# set for the node and split evenly between its web workers.
+DEFAULT_POOL_SIZE = max(1, _node_share(int(os.environ.get('SESSION_POOL_SIZE', '2'))))
+DEFAULT_MAX_SESSIONS_PER_WORKER = int(os.environ.get('SESSION_WORKER_MAX_SESSIONS', '50'))
+DEFAULT_MAX_WORKER_RSS_MB = int(os.environ.get('SESSION_WORKER_MAX_RSS_MB', '2048'))
+# Seconds a session may wait for input before it is ended
+DEFAULT_IDLE_TTL = float(os.environ.get('SESSION_IDLE_TTL', '1800'))
+# Caps over all session workers of the node; 0 disables a cap
+DEFAULT_MAX_SESSIONS = _node_share(int(os.environ.get('SESSION_MAX_SESSIONS', '200')))
+DEFAULT_MAX_TOTAL_RSS_MB = _node_share(int(os.environ.get('SESSION_MAX_TOTAL_RSS_MB', '0')))
+
+# Modules the fork server imports once for all the workers of the app's session target
+WORKER_PRELOAD = ['database', 'workflow_runner', 'strands.models.bedrock']
+
+# Workers start from a fork server (see the module docstring)
+_context = multiprocessing.get_context('forkserver')
+
+# How often the supervisor checks worker liveness when no events arrive
+SUPERVISOR_INTERVAL = 1.0
+# How often the supervisor reports its live worker addresses
+HEARTBEAT_INTERVAL = float(os.environ.get('SESSION_HEARTBEAT_INTERVAL', '5'))
+# How often workers reap idle sessions and report session activity and memory
+ACTIVITY_INTERVAL = float(os.environ.get('SESSION_ACTIVITY_INTERVAL', '5'))
+
+
+class SessionCapacityError(RuntimeError):
+    """Every session slot is taken by a session handling a message."""
+
+
+def get_rss_mb() -> float:
+    """Return the resident set size of the current process in megabytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 if os.uname().sysname != 'Darwin' else rss / (1024 * 1024)
+
+
+def _warm_imports():
+    """Import the heavy modules a session needs, and load shared caches, so activation does not pay for them."""
+    import workflow_runner  # noqa: F401
+    import strands.models.bedrock  # noqa: F401
+    import bedrock_models
+    # Agents resolve inference profiles from the catalog snapshot the web side persisted
+    bedrock_models.get_model_catalog().restore()
+
+
+def _default_target():
+    """Return the app's session target, with the stores it uses pointed at the database."""
+    from database import configure_session_worker
+    from workflow_runner import _processing_thread
+    configure_session_worker()
+    return _processing_thread
+
+
+def _report_activity(server: ChannelServer, worker_id: int, event_queue: Queue, idle_ttl: float,
+                     interval: float):
+    """Worker thread: end sessions idle past ``idle_ttl`` and report activity to the supervisor."""
+    while True:
+        time.sleep(interval)
+        activity = {}
+        for channel in server.sessions():
+            if channel.idle_for() >= idle_ttl:
+                channel.deliver("_Q_E_E_TERMINATE")
+                event_queue.put(('reaped', worker_id, channel.session_id))
+            else:
+                activity[channel.session_id] = (channel.last_active, not channel.waiting)
+        event_queue.put(('activity', worker_id, activity, get_rss_mb()))
+
+
+def _worker_main(worker_id: int, listener, address: str, task_queue: Queue, event_queue: Queue,
+                 target: Optional[Callable] = None, idle_ttl: float = DEFAULT_IDLE_TTL,
+                 activity_interval: float = ACTIVITY_INTERVAL):
+    """
+    Main loop of a pool worker process.
+
+    Receives session tasks from ``task_queue`` and runs each one on its own thread,
+    passing it the session's channel as last argument. A ``None`` task asks the
+    worker to stop accepting sessions and exit once the sessions it hosts have finished.
+    Sessions waiting for input longer than ``idle_ttl`` seconds are sent ``_Q_E_E_TERMINATE``.
+    """
+    # Serve connections before warming up so the web side can attach right away
+    server = ChannelServer(listener, address)
+    server.start()
+    try:
+        _warm_imports()
+    except Exception:
+        traceback.print_exc()
+    if target is None:
+        target = _default_target()
+
+    event_queue.put(('ready', worker_id, os.getpid(), get_rss_mb()))
+    threading.Thread(target=_report_activity,
+                     args=(server, worker_id, event_queue, idle_ttl, activity_interval),
+                     name='session-activity', daemon=True).start()
+
+    sessions = {}
+    sessions_lock = threading.Lock()
+
+    def run_session(session_id, generation, args):
+        channel = server.open(session_id, generation)
+        try:
+            target(*args, channel)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            server.close_session(channel)
+            with sessions_lock:
+                sessions.pop((session_id, generation), None)
+            event_queue.put(('ended', worker_id, session_id, get_rss_mb(), generation))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        session_id, generation, args = task
+        thread = threading.Thread(target=run_session, args=(session_id, generation, args), daemon=True)
+        with sessions_lock:
+            sessions[(session_id, generation)] = thread
+        thread.start()
+
+    # Drain: wait for the hosted sessions to terminate before exiting
+    while True:
+        with sessions_lock:
+            remaining = list(sessions.values())
+        if not remaining:
+            break
+        for thread in remaining:
+            thread.join()
+    server.close()
+    event_queue.put(('exited', worker_id, os.getpid(), get_rss_mb()))
+
+
+class _WorkerHandle:
+    """Supervisor-side bookkeeping for one worker process."""
+
+    def __init__(self, worker_id: int, address: str, process: Process, task_queue: Queue):
+        self.worker_id = worker_id
+        self.address = address
+        self.process = process
+        self.task_queue = task_queue
+        # Session ID -> generation of the session instance hosted
+        self.sessions: Dict[str, int] = {}
+        self.served = 0
+        self.rss_mb = 0.0
+        self.ready = False
+        self.draining = False
+
+
+class SessionWorkerPool:
+    """
+    Pool of pre-started worker processes that host chat sessions.
+
+    Sessions are assigned to the least loaded worker. A supervisor thread keeps
+    ``size`` workers accepting sessions, replaces workers that die, and retires
+    workers that exceed ``max_sessions_per_worker`` or ``max_worker_rss_mb``.
+    Retired workers finish the sessions they host before exiting.
+
+    Past ``max_sessions`` sessions, or ``max_total_rss_mb`` for all workers
+    together, the least recently active idle sessions are evicted; a worker left
+    without sessions while memory is over the cap is recycled.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE,
+                 max_sessions_per_worker: int = DEFAULT_MAX_SESSIONS_PER_WORKER,
+                 max_worker_rss_mb: float = DEFAULT_MAX_WORKER_RSS_MB,
+                 target: Optional[Callable] = None,
+                 heartbeat: Optional[Callable[[List[str]], None]] = None,
+                 idle_ttl: float = DEFAULT_IDLE_TTL,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_total_rss_mb: float = DEFAULT_MAX_TOTAL_RSS_MB,
+                 on_session_end: Optional[Callable[[str, str], None]] = None,
+                 activity_interval: float = ACTIVITY_INTERVAL):
+        """
+        Args:
+            size: Number of workers accepting new sessions
+            max_sessions_per_worker: Sessions a worker serves before it is recycled
+            max_worker_rss_mb: Resident memory ceiling after which a worker is recycled
+            target: Callable run for each session, defaults to ``_processing_thread``
+            heartbeat: Called periodically with the addresses of the live workers
+            idle_ttl: Seconds a session may wait for input before it is ended
+            max_sessions: Sessions hosted by all workers together, 0 for no cap
+            max_total_rss_mb: Resident memory of all workers together, 0 for no cap
+            on_session_end: Called with the ID of every session that ended and the address
+                of the worker that hosted it
+            activity_interval: Seconds between the activity reports of a worker
+        """
+        self.size = max(1, size)
+        self.max_sessions_per_worker = max_sessions_per_worker
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self.target = target
+        self.heartbeat = heartbeat
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_total_rss_mb = max_total_rss_mb
+        self.on_session_end = on_session_end
+        self.activity_interval = activity_interval
+        # Session ID -> (monotonic time of last activity, handling a message)
+        self._activity: Dict[str, tuple] = {}
+        self.pool_id = uuid.uuid4().hex[:8]
+        self._workers: Dict[int, _WorkerHandle] = {}
+        self._next_worker_id = 0
+        self._next_generation = 0
+        self._event_queue = _context.Queue()
+        self._lock = threading.RLock()
+        self._supervisor = None
+        self._running = False
+        self.workers_started = 0
+        self.workers_recycled = 0
+        self.sessions_reaped = 0
+        self.sessions_evicted = 0
+
+    def start(self):
+        """Start the workers and the supervisor thread."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            if self.target is None:
+                # Only applies before the fork server is running, i.e. to the first pool
+                _context.set_forkserver_preload(WORKER_PRELOAD)
+            self._ensure_capacity()
+        self._supervisor = threading.Thread(target=self._supervise, name='session-pool-supervisor',
+                                            daemon=True)
+        self._supervisor.start()
+
+    def submit(self, session_id: str, *args) -> str:
+        """
+        Hand a session to a worker.
+
+        Args:
+            session_id: Identifier of the session
+            *args: Arguments passed to the session target in the worker
+
+        Returns:
+            The channel address of the worker hosting the session
+
+        Raises:
+            SessionCapacityError: If the pool is at ``max_sessions`` and no session is idle
+        """
+        if not self._running:
+            self.start()
+        with self._lock:
+            if self.max_sessions and self._session_count() >= self.max_sessions:
+                if not self._evict_lru():
+                    raise SessionCapacityError(f"All {self.max_sessions} sessions are busy")
+            handle = self._pick_worker()
+            # A resumed conversation can start before its previous session has ended:
+            # the generation tells the two instances apart
+            self._next_generation += 1
+            handle.sessions[session_id] = self._next_generation
+            self._activity[session_id] = (time.monotonic(), False)
+            handle.served += 1
+            handle.task_queue.put((session_id, self._next_generation, args))
+            if handle.served >= self.max_sessions_per_worker:
+                self._retire(handle)
+            return handle.address
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the pool state."""
+        with self._lock:
+            return {
+                'workers': [
+                    {
+                        'id': handle.worker_id,
+                        'pid': handle.process.pid,
+                        'address': handle.address,
+                        'sessions': len(handle.sessions),
+                        'served': handle.served,
+                        'rss_mb': round(handle.rss_mb, 1),
+                        'ready': handle.ready,
+                        'draining': handle.draining
+                    }
+                    for handle in self._workers.values()
+                ],
+                'sessions': self._session_count(),
+                'busy_sessions': sum(1 for _, busy in self._activity.values() if busy),
+                'rss_mb': round(sum(handle.rss_mb for handle in self._workers.values()), 1),
+                'max_sessions': self.max_sessions,
+                'max_total_rss_mb': self.max_total_rss_mb,
+                'workers_started': self.workers_started,
+                'workers_recycled': self.workers_recycled,
+                'sessions_reaped': self.sessions_reaped,
+                'sessions_evicted': self.sessions_evicted
+            }
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop all workers. Hosted sessions are terminated if they do not finish in time."""
+        with self._lock:
+            self._running = False
+            handles = list(self._workers.values())
+            for handle in handles:
+                if not handle.draining:
+                    handle.draining = True
+                    handle.task_queue.put(None)
+        for handle in handles:
+            handle.process.join(timeout)
+            if handle.process.is_alive():
+                handle.process.terminate()
+            remove_address(handle.address)
+        with self._lock:
+            self._workers.clear()
+
+    def _pick_worker(self) -> _WorkerHandle:
+        self._reap_dead_workers()
+        candidates = [h for h in self._workers.values() if not h.draining]
+        # Prefer workers that finished warming up, then the least loaded one
+        return min(candidates, key=lambda h: (not h.ready, len(h.sessions), h.served))
+
+    def _spawn_worker(self) -> _WorkerHandle:
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        # Bind here so the address is known before the worker starts and
+        # connections queue up while it warms up
+        listener, address = bind_listener(self.pool_id, worker_id)
+        task_queue = _context.Queue()
+        process = _context.Process(target=_worker_main,
+                                   args=(worker_id, listener, address, task_queue, self._event_queue,
+                                         self.target, self.idle_ttl, self.activity_interval),
+                                   name=f'session-worker-{worker_id}')
+        process.start()
+        # The worker received a duplicate of the socket; this process has no use for it
+        listener.close()
+        handle = _WorkerHandle(worker_id, address, process, task_queue)
+        self._workers[worker_id] = handle
+        self.workers_started += 1
+        return handle
+
+    def _retire(self, handle: _WorkerHandle):
+        """Stop assigning sessions to a worker and start a replacement."""
+        if handle.draining:
+            return
+        handle.draining = True
+        handle.task_queue.put(None)
+        self.workers_recycled += 1
+        if self._running:
+            self._ensure_capacity()
+
+    def _ensure_capacity(self):
+        accepting = [h for h in self._workers.values() if not h.draining]
+        for _ in range(self.size - len(accepting)):
+            self._spawn_worker()
+
+    def addresses(self) -> List[str]:
+        """Return the channel addresses of the live workers, including draining ones."""
+        with self._lock:
+            return [h.address for h in self._workers.values() if h.process.is_alive()]
+
+    def _supervise(self):
+        last_heartbeat = 0.0
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+            if self.heartbeat and time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+                last_heartbeat = time.monotonic()
+                try:
+                    self.heartbeat(self.addresses())
+                except Exception:
+                    traceback.print_exc()
+            try:
+                event = self._event_queue.get(timeout=SUPERVISOR_INTERVAL)
+            except queue.Empty:
+                event = None
+            with self._lock:
+                if event:
+                    self._handle_event(event)
+                self._reap_dead_workers()
+
+    def _handle_event(self, event):
+        kind, worker_id = event[0], event[1]
+        handle = self._workers.get(worker_id)
+        if handle is None:
+            return
+        if kind == 'ready':
+            handle.ready = True
+            handle.rss_mb = event[3]
+        elif kind == 'activity':
+            for session_id, activity in event[2].items():
+                if session_id in handle.sessions:
+                    self._activity[session_id] = activity
+            handle.rss_mb = event[3]
+            self._enforce_rss_cap()
+        elif kind == 'reaped':
+            self.sessions_reaped += 1
+        elif kind == 'ended':
+            self._end_session(handle, event[2], event[4])
+            handle.rss_mb = event[3]
+            if handle.rss_mb > self.max_worker_rss_mb:
+                print(f"Recycling session worker {worker_id}: RSS {handle.rss_mb:.0f}MB "
+                      f"over {self.max_worker_rss_mb}MB")
+                self._retire(handle)
+        elif kind == 'exited':
+            handle.process.join(1)
+            self._workers.pop(worker_id, None)
+
+    def _session_count(self) -> int:
+        return sum(len(handle.sessions) for handle in self._workers.values())
+
+    def _end_session(self, handle: _WorkerHandle, session_id: str, generation: Optional[int] = None):
+        """Forget a session of ``handle``; with ``generation``, only if that instance is still the one hosted."""
+        if session_id not in handle.sessions:
+            return
+        if generation is not None and handle.sessions[session_id] != generation:
+            # A previous instance of a conversation resumed on the same worker
+            return
+        del handle.sessions[session_id]
+        if not any(session_id in other.sessions for other in self._workers.values()):
+            self._activity.pop(session_id, None)
+        if self.on_session_end:
+            try:
+                self.on_session_end(session_id, handle.address)
+            except Exception:
+                traceback.print_exc()
+
+    def _evict_lru(self) -> bool:
+        """End the least recently active idle session; returns False if every session is busy."""
+        idle = sorted((last_active, session_id) for session_id, (last_active, busy) in self._activity.items()
+                      if not busy)
+        for last_active, session_id in idle:
+            handle = next((h for h in self._workers.values() if session_id in h.sessions), None)
+            if handle is None:
+                self._activity.pop(session_id, None)
+                return True
+            try:
+                with SessionChannel(handle.address, session_id, connect_timeout=1.0) as channel:
+                    channel.put("_Q_E_E_EVICT")
+                    if channel.get(timeout=5.0) == "_Q_E_E_BUSY":
+                        # Took a message since the last activity report: keep it, try the next one
+                        self._activity[session_id] = (last_active, True)
+                        continue
+            except (OSError, ChannelClosed):
+                # The worker is gone; its sessions are dropped with it
+                pass
+            self.sessions_evicted += 1
+            self._end_session(handle, session_id)
+            return True
+        return False
+
+    def _enforce_rss_cap(self):
+        if not self.max_total_rss_mb:
+            return
+        if sum(handle.rss_mb for handle in self._workers.values()) <= self.max_total_rss_mb:
+            return
+        # Ending sessions rarely shrinks a process: recycle a worker once it is empty
+        for handle in self._workers.values():
+            # A fresh replacement has not grown yet, recycling it would not help
+            if not handle.sessions and not handle.draining and handle.served:
+                print(f"Recycling session worker {handle.worker_id}: pool RSS over {self.max_total_rss_mb}MB")
+                self._retire(handle)
+                return
+        self._evict_lru()
+
+    def _reap_dead_workers(self):
+        for worker_id, handle in list(self._workers.items()):
+            if handle.process.is_alive():
+                continue
+            if not handle.draining:
+                print(f"Session worker {worker_id} died with exit code {handle.process.exitcode}, "
+                      f"lost {len(handle.sessions)} sessions")
+            remove_address(handle.address)
+            self._workers.pop(worker_id, None)
+            for session_id in list(handle.sessions):
+                self._end_session(handle, session_id)
+        if self._running:
+            self._ensure_capacity()
+
+
+_pool: Optional[SessionWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool(**kwargs) -> SessionWorkerPool:
+    """
+    Return the process-wide session worker pool, starting it on first use.
+
+    Args:
+        **kwargs: ``SessionWorkerPool`` arguments, only used when the pool is created
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionWorkerPool(**kwargs)
+            _pool.start()
+            atexit.register(_pool.shutdown)
+        return _pool
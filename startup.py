@@ -0,0 +1,119 @@
+"""
+Startup pipeline of the web app.
+
+Importing ``app`` used to check the AWS credentials with an STS call, create
+the schema and rotate the default admin's password (a bcrypt hash) one step
+after the other, on every boot of every instance. The pipeline runs such steps
+as named phases on threads: a phase starts as soon as the phases it depends on
+are done, so independent ones overlap. Phases skip their work when there is
+nothing to do and return the reason, and the pipeline prints the time of every
+phase once startup completes.
+
+Phases registered with ``wait=False`` run in the background: startup does not
+wait for them and their timing is printed when they finish.
+"""
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class StartupError(RuntimeError):
+    """A startup phase failed."""
+
+
+class PhaseResult:
+    """Outcome of one phase."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.detail: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+    def __str__(self):
+        detail = f" ({self.detail})" if self.detail else ''
+        if self.error is not None:
+            detail = f" (failed: {self.error})"
+        return f"{self.name} {self.seconds * 1000:.0f} ms{detail}"
+
+
+class StartupPipeline:
+    """Named startup phases with dependencies, run concurrently."""
+
+    def __init__(self, log: Callable[[str], None] = print):
+        """
+        Args:
+            log: Receives the timing report lines
+        """
+        self.log = log
+        self._phases: Dict[str, Tuple[Callable[[], Optional[str]], Tuple[str, ...], bool]] = {}
+        self.results: Dict[str, PhaseResult] = {}
+
+    def phase(self, name: str, step: Callable[[], Optional[str]], after: Tuple[str, ...] = (),
+              wait: bool = True) -> 'StartupPipeline':
+        """
+        Register a phase.
+
+        Args:
+            name: Name of the phase in the report
+            step: Does the work; may return a short note such as why it was skipped
+            after: Names of the phases that must complete first
+            wait: Whether startup waits for the phase; background phases may not
+                be depended on
+        """
+        for dependency in after:
+            if dependency not in self._phases:
+                raise ValueError(f"Startup phase {name} depends on unknown phase {dependency}")
+            if not self._phases[dependency][2]:
+                raise ValueError(f"Startup phase {name} depends on background phase {dependency}")
+        self._phases[name] = (step, tuple(after), wait)
+        return self
+
+    def run(self) -> List[PhaseResult]:
+        """
+        Run every phase and return the results of the ones startup waited for.
+
+        Raises:
+            StartupError: If a phase startup waits for failed; the phases depending
+                on it are not run
+        """
+        started = time.perf_counter()
+        self.results = {name: PhaseResult(name) for name in self._phases}
+        for name, (step, after, wait) in self._phases.items():
+            threading.Thread(target=self._run_phase, args=(name, step, after, wait),
+                             name=f'startup-{name}', daemon=not wait).start()
+
+        waited = [self.results[name] for name, (_, _, wait) in self._phases.items() if wait]
+        for result in waited:
+            result.done.wait()
+        total = time.perf_counter() - started
+        self.log(f"Startup: {', '.join(str(result) for result in waited)}; total {total * 1000:.0f} ms")
+
+        failed = next((result for result in waited if result.error is not None), None)
+        if failed is not None:
+            raise StartupError(f"Startup phase {failed.name} failed: {failed.error}") from failed.error
+        return waited
+
+    def _run_phase(self, name: str, step: Callable[[], Optional[str]], after: Tuple[str, ...], wait: bool):
+        result = self.results[name]
+        try:
+            for dependency in after:
+                self.results[dependency].done.wait()
+                if self.results[dependency].error is not None:
+                    result.error = StartupError(f"{dependency} failed")
+                    return
+            started = time.perf_counter()
+            try:
+                result.detail = step()
+            except BaseException as e:
+                # SystemExit included: a phase must not end the process from its thread
+                result.error = e
+                if not isinstance(e, (StartupError, SystemExit)):
+                    traceback.print_exc()
+            result.seconds = time.perf_counter() - started
+        finally:
+            result.done.set()
+            if not wait:
+                self.log(f"Startup (background): {result}")
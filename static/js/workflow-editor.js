@@ -517,6 +517,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const name = document.getElementById('workflow-name').value;
         const description = document.getElementById('workflow-description').value;
         const model_id = document.getElementById('workflow-model').value;
+        const execution_mode = document.getElementById('workflow-execution-mode').value;
         const saveIcon = document.getElementById('save-graph-icon').checked;
         
         // Prepare data for the API call
@@ -524,6 +525,7 @@ document.addEventListener('DOMContentLoaded', function() {
             name: name,
             description: description,
             model_id: model_id,
+            execution_mode: execution_mode,
             generate_icon: saveIcon
         };
         
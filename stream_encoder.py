@@ -0,0 +1,155 @@
+"""
+Batch streamed agent events into Server-Sent Events frames.
+
+Agents report one delta per model token. Encoding and sending each delta as
+its own frame costs a JSON encode, a socket write in the session worker and a
+chunk on the HTTP response per token. ``StreamEncoder`` merges consecutive
+deltas of the same kind for up to ``STREAM_WINDOW_MS`` milliseconds or
+``STREAM_MAX_BYTES`` bytes of text and sends them as a single ``data:`` event.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import rapidjson
+
+# How long a delta may wait for the next ones before it is sent, 0 to send every delta at once
+STREAM_WINDOW_MS = float(os.environ.get('SESSION_STREAM_WINDOW_MS', '20'))
+# Text batched into one event at most
+STREAM_MAX_BYTES = int(os.environ.get('SESSION_STREAM_MAX_BYTES', '4096'))
+# Seconds the flusher thread waits for a delta before it exits
+_FLUSHER_IDLE = 5.0
+
+
+def encode_event(event: Dict[str, Any]) -> str:
+    """Frame an event as a Server-Sent Event."""
+    return "data: " + rapidjson.dumps(event, default=str) + "\n\n"
+
+
+def _batch_key(event: Dict[str, Any], source: Hashable = None):
+    """
+    What a delta can be merged with: text with text, input with input for the same
+    tool, and only deltas from the same ``source``.
+    """
+    delta = event.get('delta')
+    if not isinstance(delta, dict) or len(delta) != 1:
+        return None
+    if isinstance(delta.get('text'), str):
+        return (source, 'text')
+    tool_use = delta.get('toolUse')
+    if isinstance(tool_use, dict) and set(tool_use) == {'input'} and isinstance(tool_use['input'], str):
+        current = event.get('current_tool_use') or {}
+        return (source, 'toolUse', current.get('toolUseId'), current.get('name'))
+    return None
+
+
+class StreamEncoder:
+    """
+    Merges the delta events of an answer and sends them with ``put``.
+
+    Text deltas are concatenated, as are the input deltas of one tool call
+    (keeping the latest ``current_tool_use``, which carries the input so far).
+    Any other event first sends what is batched, then goes out on its own, so
+    the order of events is kept. Batched deltas are sent when the window
+    expires, when they reach ``max_bytes``, or on ``flush``; call ``flush``
+    before signalling the end of an answer.
+    """
+
+    def __init__(self, put: Callable[[str], None], window_ms: float = STREAM_WINDOW_MS,
+                 max_bytes: int = STREAM_MAX_BYTES):
+        """
+        Args:
+            put: Sends one encoded frame, e.g. ``ServerSessionChannel.put``
+            window_ms: Milliseconds a delta waits for more before it is sent
+            max_bytes: Batched text sent at once when reached
+        """
+        self.put = put
+        self.window = window_ms / 1000.0
+        self.max_bytes = max_bytes
+        self._cond = threading.Condition()
+        self._key = None
+        self._event: Optional[Dict[str, Any]] = None
+        self._parts = []
+        self._bytes = 0
+        self._deadline = 0.0
+        self._flusher = None
+        self._closed = False
+        self.events = 0
+        self.frames = 0
+
+    def send(self, event: Dict[str, Any], source: Hashable = None):
+        """
+        Queue an event, merging it into the batched deltas when it can be.
+
+        Args:
+            event: Callback handler event with a ``delta``
+            source: Identity of the agent that emitted the event; deltas of agents
+                running at the same time are never merged
+        """
+        key = _batch_key(event, source) if self.window > 0 else None
+        with self._cond:
+            self.events += 1
+            if self._event is not None and (key is None or key != self._key):
+                self._flush()
+            if key is None:
+                self._emit(event)
+                return
+            text = event['delta']['text'] if key[1] == 'text' else event['delta']['toolUse']['input']
+            if self._event is None:
+                self._key = key
+                self._deadline = time.monotonic() + self.window
+                self._start_flusher()
+                self._cond.notify()
+            self._event = event
+            self._parts.append(text)
+            self._bytes += len(text)
+            if self._bytes >= self.max_bytes or time.monotonic() >= self._deadline:
+                self._flush()
+
+    def flush(self):
+        """Send the batched deltas now."""
+        with self._cond:
+            self._flush()
+
+    def close(self):
+        """Send the batched deltas and stop the flusher thread."""
+        with self._cond:
+            self._flush()
+            self._closed = True
+            self._cond.notify()
+
+    def _flush(self):
+        if self._event is None:
+            return
+        event, text = self._event, ''.join(self._parts)
+        self._event, self._key, self._parts, self._bytes = None, None, [], 0
+        if 'text' in event['delta']:
+            event = dict(event, delta={'text': text})
+        else:
+            event = dict(event, delta={'toolUse': {'input': text}})
+        self._emit(event)
+
+    def _emit(self, event: Dict[str, Any]):
+        self.frames += 1
+        self.put(encode_event(event))
+
+    def _start_flusher(self):
+        if self._flusher is None and not self._closed:
+            self._flusher = threading.Thread(target=self._flush_loop, name='stream-encoder', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        with self._cond:
+            while not self._closed:
+                if self._event is None:
+                    # Between answers the thread exits; the next delta starts another
+                    if not self._cond.wait(_FLUSHER_IDLE) and self._event is None:
+                        break
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._flush()
+            self._flusher = None
@@ -0,0 +1,70 @@
+import multiprocessing
+import threading
+
+from aws_clients import ClientRegistry
+
+
+class FakeSession:
+    instances = 0
+
+    def __init__(self):
+        FakeSession.instances += 1
+        self.built = []
+
+    def client(self, service, region_name=None):
+        self.built.append((service, region_name))
+        return object()
+
+
+def test_clients_are_built_once_per_service_and_region():
+    registry = ClientRegistry(FakeSession)
+
+    sts = registry.client('sts')
+    assert registry.client('sts') is sts
+    east = registry.client('cognito-idp', 'us-east-1')
+    assert registry.client('cognito-idp', 'us-east-1') is east
+    assert registry.client('cognito-idp', 'eu-west-1') is not east
+
+    assert registry.stats() == {
+        'constructed': {'sts/default': 1, 'cognito-idp/us-east-1': 1, 'cognito-idp/eu-west-1': 1},
+        'hits': 2}
+
+
+def test_concurrent_first_use_builds_one_client():
+    registry = ClientRegistry(FakeSession)
+    barrier = threading.Barrier(16)
+    clients = []
+
+    def use():
+        barrier.wait()
+        clients.append(registry.client('bedrock', 'us-west-2'))
+
+    threads = [threading.Thread(target=use) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(client is clients[0] for client in clients)
+    assert registry.constructions[('bedrock', 'us-west-2')] == 1
+
+
+def _child(registry, parent_client_id, results):
+    client = registry.client('sts')
+    results.put((id(client) != parent_client_id, registry.constructions[('sts', None)]))
+
+
+def test_forked_process_builds_its_own_clients():
+    registry = ClientRegistry(FakeSession)
+    parent_client = registry.client('sts')
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    process = context.Process(target=_child, args=(registry, id(parent_client), results))
+    process.start()
+    rebuilt, constructions = results.get(timeout=10)
+    process.join()
+
+    assert rebuilt
+    assert constructions == 2
+    assert registry.client('sts') is parent_client
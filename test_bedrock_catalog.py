@@ -0,0 +1,204 @@
+import threading
+import time
+
+from bedrock_models import ModelCatalog
+
+
+class FakeBedrockClient:
+    """Stands in for boto3.client('bedrock') with paginated list responses."""
+
+    def __init__(self, models=6, profiles=5, page_size=2, delay=0.0):
+        self.model_pages = self._pages([
+            {'modelId': f'vendor.model-{i}', 'modelName': f'Model {i}', 'providerName': 'Vendor',
+             'outputModalities': ['TEXT'], 'inferenceTypesSupported': ['ON_DEMAND']}
+            for i in range(models)], page_size)
+        self.profile_pages = self._pages([
+            {'inferenceProfileId': f'us.vendor.model-{i}',
+             'models': [{'modelArn': f'arn:aws:bedrock:us-east-1::foundation-model/vendor.model-{i}'}]}
+            for i in range(profiles)], page_size)
+        self.delay = delay
+        self.fail = False
+        self.calls = []
+
+    @staticmethod
+    def _pages(items, page_size):
+        return [items[i:i + page_size] for i in range(0, len(items), page_size)] or [[]]
+
+    def _page(self, pages, key, nextToken=None):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('throttled')
+        index = int(nextToken or 0)
+        response = {key: pages[index]}
+        if index + 1 < len(pages):
+            response['nextToken'] = str(index + 1)
+        return response
+
+    def list_foundation_models(self, **kwargs):
+        self.calls.append(('list_foundation_models', kwargs))
+        return self._page(self.model_pages, 'modelSummaries', **kwargs)
+
+    def list_inference_profiles(self, **kwargs):
+        self.calls.append(('list_inference_profiles', kwargs))
+        return self._page(self.profile_pages, 'inferenceProfileSummaries', **kwargs)
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_every_page_is_fetched():
+    client = FakeBedrockClient(models=5, profiles=5, page_size=2)
+    snapshot = ModelCatalog(lambda: client).snapshot()
+
+    assert [m['modelId'] for m in snapshot['models']] == [f'vendor.model-{i}' for i in range(5)]
+    assert snapshot['profiles'] == {f'vendor.model-{i}': f'us.vendor.model-{i}' for i in range(5)}
+    assert [kwargs.get('nextToken') for name, kwargs in client.calls
+            if name == 'list_inference_profiles'] == [None, '1', '2']
+
+
+def test_fresh_snapshot_is_served_from_memory(clock):
+    client = FakeBedrockClient()
+    catalog = ModelCatalog(lambda: client, ttl=60, stale_ttl=600, clock=clock)
+
+    first = catalog.snapshot()
+    clock.now = 59
+    for _ in range(100):
+        assert catalog.snapshot() is first
+    assert catalog.fetches == 1
+
+
+def test_stale_snapshot_is_served_while_refreshing(clock):
+    client = FakeBedrockClient(delay=0.1)
+    catalog = ModelCatalog(lambda: client, ttl=60, stale_ttl=600, clock=clock)
+    first = catalog.snapshot()
+
+    clock.now = 61
+    started = time.monotonic()
+    assert catalog.snapshot() is first
+    assert time.monotonic() - started < 0.1
+    assert _wait_for(lambda: catalog.snapshot() is not first)
+    assert catalog.fetches == 2
+
+
+def test_failed_refresh_keeps_serving_the_stale_snapshot(clock):
+    client = FakeBedrockClient()
+    catalog = ModelCatalog(lambda: client, ttl=60, stale_ttl=600, clock=clock)
+    first = catalog.snapshot()
+
+    client.fail = True
+    clock.now = 61
+    assert catalog.snapshot() is first
+    assert _wait_for(lambda: catalog._inflight is None)
+    # Past the stale window the fetch is synchronous, and its failure still falls back
+    clock.now = 1000
+    assert catalog.snapshot() is first
+
+
+def test_concurrent_cold_callers_share_one_fetch():
+    client = FakeBedrockClient(delay=0.05)
+    catalog = ModelCatalog(lambda: client)
+    barrier = threading.Barrier(16)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(catalog.snapshot())
+
+    threads = [threading.Thread(target=call) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert catalog.fetches == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_warm_fetches_in_the_background():
+    client = FakeBedrockClient()
+    catalog = ModelCatalog(lambda: client)
+
+    catalog.warm().result(timeout=5)
+    assert catalog.snapshot()['models']
+    assert catalog.fetches == 1
+
+
+def test_unavailable_catalog_is_empty():
+    client = FakeBedrockClient()
+    client.fail = True
+    catalog = ModelCatalog(lambda: client)
+
+    assert catalog.snapshot() == {'models': [], 'profiles': {}}
+
+
+def test_profiles_are_resolved_with_one_fetch_per_process():
+    client = FakeBedrockClient(models=10, profiles=5)
+    catalog = ModelCatalog(lambda: client)
+
+    resolved = [catalog.resolve_profile(f'vendor.model-{i}') for i in range(10)]
+
+    assert resolved[:5] == [f'us.vendor.model-{i}' for i in range(5)]
+    # Models without a cross-region profile keep their own ID
+    assert resolved[5:] == [f'vendor.model-{i}' for i in range(5, 10)]
+    assert catalog.fetches == 1
+
+
+def test_unavailable_profiles_fall_back_to_the_model_id():
+    client = FakeBedrockClient(delay=1.0)
+    catalog = ModelCatalog(lambda: client)
+
+    started = time.monotonic()
+    assert catalog.resolve_profile('vendor.model-0', timeout=0.1) == 'vendor.model-0'
+    assert time.monotonic() - started < 0.5
+
+    client.delay = 0
+    client.fail = True
+    catalog._inflight.exception(timeout=5)
+    assert catalog.resolve_profile('vendor.model-0') == 'vendor.model-0'
+
+
+def test_snapshot_file_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'models.json')
+    client = FakeBedrockClient()
+    ModelCatalog(lambda: client, snapshot_path=path).snapshot()
+
+    # Another process (or a restart) restores the catalog instead of fetching it
+    other_client = FakeBedrockClient()
+    other = ModelCatalog(lambda: other_client, snapshot_path=path)
+    assert other.resolve_profile('vendor.model-1') == 'us.vendor.model-1'
+    assert other.fetches == 0
+    assert other_client.calls == []
+
+
+def test_newer_snapshot_file_replaces_a_stale_catalog(tmp_path, clock):
+    path = str(tmp_path / 'models.json')
+    client = FakeBedrockClient(profiles=1)
+    catalog = ModelCatalog(lambda: client, ttl=60, snapshot_path=path, clock=clock)
+    assert catalog.resolve_profile('vendor.model-1') == 'vendor.model-1'
+
+    # Another process fetched a catalog that knows more profiles
+    ModelCatalog(lambda: FakeBedrockClient(profiles=2), snapshot_path=path).warm().result(timeout=5)
+    assert catalog.resolve_profile('vendor.model-1') == 'vendor.model-1'
+    clock.now = 61
+    assert catalog.resolve_profile('vendor.model-1') == 'us.vendor.model-1'
+    assert catalog.fetches == 1
+
+
+def test_forked_child_does_not_wait_for_the_parents_fetch(monkeypatch):
+    import os
+    from concurrent.futures import Future
+
+    import bedrock_models
+
+    catalog = ModelCatalog(lambda: FakeBedrockClient())
+    catalog._inflight = Future()
+    monkeypatch.setattr(bedrock_models, '_model_catalog', catalog)
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if catalog._inflight is None else 1)
+    assert os.waitpid(pid, 0)[1] == 0
+    assert catalog._inflight is not None
@@ -0,0 +1,57 @@
+import pytest
+
+from conversation_store import ConversationStore
+
+
+@pytest.fixture
+def store(session_factory):
+    return ConversationStore(session_factory)
+
+
+def test_conversations_are_recorded_with_what_they_run(store):
+    store.create('c1', 'wf-1', 'agent')
+
+    assert store.get('c1') == {'workflow_id': 'wf-1', 'item_type': 'agent'}
+    assert store.get('unknown') is None
+
+
+def test_messages_are_numbered_per_conversation(store):
+    assert [store.append('c1', 'user', 'hi'), store.append('c2', 'user', 'hey'),
+            store.append('c1', 'assistant', 'hello')] == [1, 1, 2]
+
+    page = store.history('c1')
+    assert [(turn['seq'], turn['role'], turn['content']) for turn in page['history']] == \
+        [(1, 'user', 'hi'), (2, 'assistant', 'hello')]
+    assert page['history'][0]['timestamp'].endswith('Z')
+    assert page['next_seq'] == 2 and page['has_more'] is False
+
+
+def test_history_is_read_in_pages_after_a_cursor(store):
+    for i in range(5):
+        store.append('c1', 'user', f'message {i}')
+
+    first = store.history('c1', limit=2)
+    assert [turn['seq'] for turn in first['history']] == [1, 2] and first['has_more']
+    second = store.history('c1', after_seq=first['next_seq'], limit=2)
+    assert [turn['seq'] for turn in second['history']] == [3, 4] and second['has_more']
+    last = store.history('c1', after_seq=second['next_seq'], limit=2)
+    assert [turn['seq'] for turn in last['history']] == [5] and not last['has_more']
+
+    empty = store.history('c1', after_seq=5)
+    assert empty == {'history': [], 'next_seq': 5, 'has_more': False}
+
+
+def test_resumed_session_starts_with_the_answered_turns(store):
+    from workflow_runner import _resume_conversation
+
+    for role, content in [('user', 'q1'), ('assistant', 'a1'), ('user', 'q2'), ('assistant', 'a2'),
+                          ('user', 'cut off')]:
+        store.append('c1', role, content)
+
+    class Orchestrator:
+        messages = []
+
+    orchestrator = Orchestrator()
+    _resume_conversation(orchestrator, store, 'c1')
+    assert [(m['role'], m['content'][0]['text']) for m in orchestrator.messages] == \
+        [('user', 'q1'), ('assistant', 'a1'), ('user', 'q2'), ('assistant', 'a2')]
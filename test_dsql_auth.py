@@ -0,0 +1,39 @@
+import time
+
+from dsql_auth import DsqlTokenCache
+
+
+class FakeTokenProvider:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f'token-{self.calls}'
+
+
+def test_token_is_signed_once_while_valid(clock):
+    provider = FakeTokenProvider()
+    cache = DsqlTokenCache(provider, lifetime=900, refresh_margin=180, clock=clock)
+
+    assert [cache.get() for _ in range(100)] == ['token-1'] * 100
+    clock.now = 899
+    assert cache.get() == 'token-1'
+    # Should the background refresh fail, an expired token is replaced synchronously
+    clock.now = 901
+    assert cache.get() == 'token-2'
+    cache.stop()
+
+
+def test_token_is_refreshed_in_the_background_before_expiry():
+    provider = FakeTokenProvider()
+    cache = DsqlTokenCache(provider, lifetime=0.4, refresh_margin=0.2)
+
+    assert cache.get() == 'token-1'
+    deadline = time.monotonic() + 5
+    while provider.calls < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    cache.stop()
+
+    assert provider.calls >= 3
+    assert cache.get() == f'token-{provider.calls}'
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+from strands import Agent, tool
+
+import workflow_runner
+from fake_model import FakeModel
+from workflow_runner import WorkflowRunner
+
+
+def quiet(**event):
+    pass
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return f'found {query}'
+
+
+def test_answer_streams_the_configured_tokens():
+    deltas = []
+    agent = Agent(model=FakeModel('m', tokens=3),
+                  callback_handler=lambda **event: deltas.append(event['data']) if 'data' in event else None)
+
+    assert str(agent('hi')).strip() == '[m] token token token'
+    assert len(deltas) == 4
+
+
+def test_tool_call_patterns():
+    FakeModel.reset_invocations()
+    agent = Agent(model=FakeModel('m', tokens=1, tool_calls='first'), tools=[lookup], callback_handler=quiet)
+    agent('hi')
+    # A tool call, then the answer after the tool result
+    assert FakeModel.reset_invocations() == 2
+    assert agent.messages[1]['content'][0]['toolUse']['input'] == {'query': 'hi'}
+
+    agent = Agent(model=FakeModel('m', tokens=1), tools=[lookup], callback_handler=quiet)
+    agent('hi')
+    assert FakeModel.reset_invocations() == 1
+
+
+def test_structured_output_is_built_from_field_defaults():
+    class Summary(BaseModel):
+        title: str = 'untitled'
+        score: int = 0
+
+    class Answer(BaseModel):
+        text: str
+
+    async def events(output_model):
+        prompt = [{'role': 'user', 'content': [{'text': 'hi'}]}]
+        return [event async for event in FakeModel('m').structured_output(output_model, prompt)]
+
+    assert asyncio.run(events(Summary)) == [{'output': Summary()}]
+    with pytest.raises(TypeError, match='text'):
+        asyncio.run(events(Answer))
+
+
+def test_fake_provider_is_selected_by_environment(monkeypatch):
+    monkeypatch.setattr(workflow_runner, 'MODEL_PROVIDER', 'fake')
+    model = WorkflowRunner._create_model('anthropic.claude', orchestrator=True)
+    assert isinstance(model, FakeModel)
+    assert model.get_config()['tool_calls'] == 'each'
+    assert WorkflowRunner._create_model(None).get_config()['tool_calls'] == 'none'
+
+    monkeypatch.setattr(workflow_runner, 'MODEL_PROVIDER', 'bedrock')
+    assert WorkflowRunner._create_model(None) is None
@@ -0,0 +1,168 @@
+import threading
+import time
+
+import pytest
+
+from graph_executor import DagExecutor, GraphError, PipelineExecutor, WorkflowGraph
+
+
+def graph(node_types, edges):
+    nodes = {node_id: {'type': node_type, 'reference': {'name': node_id.upper()}}
+             for node_id, node_type in node_types.items()}
+    return WorkflowGraph(nodes, [{'source': s, 'target': t} for s, t in edges])
+
+
+def fan_out(width):
+    node_types = {'in': 'input', 'out': 'output'}
+    node_types.update({f'a{i}': 'agent' for i in range(width)})
+    edges = [('in', f'a{i}') for i in range(width)] + [(f'a{i}', 'out') for i in range(width)]
+    return graph(node_types, edges)
+
+
+class SleepingAgents:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, node_id, task):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return f'{node_id}({task})'
+
+
+def test_outputs_flow_along_edges():
+    chain = graph({'in': 'input', 'a': 'agent', 'b': 'agent', 'out': 'output'},
+                  [('in', 'a'), ('a', 'b'), ('b', 'out')])
+    answers = []
+    executor = DagExecutor(chain, lambda node_id, task: f'{node_id}({task})')
+    executor.callback_handler = lambda **event: answers.append(event['delta']['text'])
+
+    assert executor('hi') == 'b(a(hi))'
+    assert answers == ['b(a(hi))']
+
+
+def test_independent_branches_run_concurrently_and_join():
+    agents = SleepingAgents(0.2)
+    executor = DagExecutor(fan_out(4), agents, max_parallel=4)
+
+    started = time.monotonic()
+    answer = executor('hi')
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.6
+    assert agents.max_active == 4
+    assert answer == '\n\n'.join(f'## A{i}\na{i}(hi)' for i in range(4))
+
+
+def test_parallelism_is_bounded():
+    agents = SleepingAgents(0.05)
+    DagExecutor(fan_out(6), agents, max_parallel=2)('hi')
+    assert agents.max_active == 2
+
+
+def test_cancelled_run_answers_with_the_latest_completed_outputs():
+    chain = graph({'in': 'input', 'a': 'agent', 'b': 'agent', 'out': 'output'},
+                  [('in', 'a'), ('a', 'b'), ('b', 'out')])
+    cancel_signal = threading.Event()
+
+    def run_node(node_id, task):
+        # Nodes scheduled together are all running by then
+        time.sleep(0.05)
+        cancel_signal.set()
+        return f'{node_id}({task})'
+
+    assert DagExecutor(chain, run_node)('hi', cancel_signal=cancel_signal) == 'a(hi)'
+
+    cancel_signal.clear()
+    diamond = graph({'in': 'input', 'a': 'agent', 'b': 'agent', 'c': 'agent', 'out': 'output'},
+                    [('in', 'a'), ('in', 'b'), ('a', 'c'), ('b', 'c'), ('c', 'out')])
+    assert DagExecutor(diamond, run_node, max_parallel=2)('x', cancel_signal=cancel_signal) == \
+        '## A\na(x)\n\n## B\nb(x)'
+
+
+def test_join_node_waits_for_all_predecessors():
+    diamond = graph({'in': 'input', 'a': 'agent', 'b': 'agent', 'c': 'agent', 'out': 'output'},
+                    [('in', 'a'), ('in', 'b'), ('a', 'c'), ('b', 'c'), ('c', 'out')])
+    assert DagExecutor(diamond, SleepingAgents(0.01))('x') == 'c(## A\na(x)\n\n## B\nb(x))'
+
+
+def test_nodes_off_the_input_output_paths_are_ignored():
+    partial = graph({'in': 'input', 'a': 'agent', 'lonely': 'agent', 't': 'tool', 'out': 'output'},
+                    [('in', 'a'), ('a', 'out')])
+    assert partial.order == ['in', 'a', 'out']
+
+
+def test_graphs_needing_an_orchestrator_are_rejected():
+    with pytest.raises(GraphError):
+        graph({'in': 'input', 'a': 'agent', 'b': 'agent', 'out': 'output'},
+              [('in', 'a'), ('a', 'b'), ('b', 'a'), ('b', 'out')])
+    with pytest.raises(GraphError):
+        graph({'in': 'input', 't': 'tool', 'out': 'output'}, [('in', 't'), ('t', 'out')])
+    with pytest.raises(GraphError):
+        graph({'in': 'input', 'a': 'agent', 'out': 'output'}, [('in', 'a')])
+
+
+def test_agent_failure_propagates():
+    def run_node(node_id, task):
+        if node_id == 'a1':
+            raise RuntimeError('model error')
+        return task
+
+    with pytest.raises(RuntimeError):
+        DagExecutor(fan_out(3), run_node)('hi')
+
+
+class RecordingAgent:
+    def __init__(self, name):
+        self.name = name
+        self.callback_handler = None
+
+    def __call__(self, message):
+        return f'{self.name}({message})'
+
+
+def test_pipeline_chains_agents_and_streams_the_last_one():
+    chain = graph({'in': 'input', 'a': 'agent', 'b': 'agent', 'out': 'output'},
+                  [('in', 'a'), ('a', 'b'), ('b', 'out')])
+    agents = {'a': RecordingAgent('a'), 'b': RecordingAgent('b')}
+    pipeline = PipelineExecutor([agents[node_id] for node_id in chain.chain()])
+    handler = object()
+    pipeline.callback_handler = handler
+
+    assert pipeline('hi') == 'b(a(hi))'
+    assert agents['b'].callback_handler is handler
+    assert agents['a'].callback_handler is None
+
+
+def test_only_chains_compile_to_a_pipeline():
+    with pytest.raises(GraphError):
+        fan_out(2).chain()
+
+
+def test_pipeline_mode_calls_each_agent_model_once():
+    import uuid
+
+    from fake_model import FakeModel
+    from workflow_runner import WorkflowRunner
+
+    ids = [uuid.uuid4() for _ in range(4)]
+    nodes = {ids[0]: {'type': 'input'}, ids[3]: {'type': 'output'}}
+    for i, node_id in enumerate(ids[1:3]):
+        nodes[node_id] = {'type': 'agent', 'reference': {'name': f'Agent {i}', 'prompt': 'p', 'tools': []}}
+    context = {'name': 'Chain', 'execution_mode': 'pipeline', 'nodes': nodes,
+               'edges': [{'source': s, 'target': t} for s, t in zip(ids, ids[1:])]}
+    for i, agent in enumerate(WorkflowRunner.create_nodes(context)):
+        agent.model = FakeModel(f'agent-{i}', tokens=2)
+    pipeline = WorkflowRunner._create_graph_executor(context)
+    pipeline.callback_handler = lambda **event: None
+
+    FakeModel.reset_invocations()
+    assert isinstance(pipeline, PipelineExecutor)
+    assert str(pipeline('hi')).strip() == '[agent-1] token token'
+    assert FakeModel.reset_invocations() == 2
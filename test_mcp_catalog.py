@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+from mcp_catalog import MCPToolCatalog, build_tools, config_hash, fetch_tool_specs
+from mcp_manager import get_mcp_manager
+from models import MCPCatalogEntry
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_mcp_server.py')
+
+
+class CountingFetcher:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, command, args, env):
+        self.calls += 1
+        return [{'name': f'tool{self.calls}', 'description': 'd', 'inputSchema': {'type': 'object'}}]
+
+
+def make_catalog(session_factory, **kwargs):
+    fetcher = CountingFetcher()
+    return MCPToolCatalog(session_factory, fetcher=fetcher, **kwargs), fetcher
+
+
+def test_catalog_answers_from_the_database_until_refreshed(session_factory):
+    catalog, fetcher = make_catalog(session_factory)
+
+    assert catalog.get('npx', ['-y', 'server'], {'KEY': 'v'})[0]['name'] == 'tool1'
+    # Same server, config written differently
+    assert catalog.get('npx', ('-y', 'server'), {'KEY': 'v'})[0]['name'] == 'tool1'
+    assert fetcher.calls == 1
+
+    assert catalog.get('npx', ['-y', 'server'], {'KEY': 'v'}, refresh=True)[0]['name'] == 'tool2'
+    assert catalog.get('npx', ['-y', 'server'], {'KEY': 'v'})[0]['name'] == 'tool2'
+    assert fetcher.calls == 2
+
+
+def test_catalog_entries_expire_after_ttl(session_factory):
+    catalog, fetcher = make_catalog(session_factory, ttl=60)
+    catalog.get('uvx', ['server'])
+
+    db = catalog.session_factory()
+    db.query(MCPCatalogEntry).filter_by(config_hash=config_hash('uvx', ['server'], None)) \
+        .update({'fetched_at': datetime.utcnow() - timedelta(seconds=61)})
+    db.commit()
+    db.close()
+
+    assert catalog.get('uvx', ['server'])[0]['name'] == 'tool2'
+
+
+def test_tools_built_from_catalog_specs_call_the_server():
+    specs = fetch_tool_specs(sys.executable, [FAKE_SERVER], None)
+    assert [spec['name'] for spec in specs] == ['echo', 'pid', 'crash']
+    assert specs[0]['inputSchema']['required'] == ['text']
+
+    manager = get_mcp_manager()
+    client = manager.acquire(sys.executable, [FAKE_SERVER], None)
+    try:
+        echo = build_tools(specs, client)[0]
+        assert echo.tool_spec['name'] == 'echo'
+        result = client.call_tool_sync('t', echo.mcp_tool.name, {'text': 'hi'})
+        assert result['content'][0]['text'] == 'hi'
+    finally:
+        manager.release(client)
+
+
+def test_lazy_tools_connect_when_the_agent_calls_them():
+    specs = [{'name': 'echo', 'description': 'Return the given text',
+              'inputSchema': {'type': 'object', 'properties': {'text': {'type': 'string'}}}}]
+    manager = get_mcp_manager()
+    with manager.lease_scope():
+        connection = manager.lazy(sys.executable, [FAKE_SERVER, '--tools', 'echo'], None)
+        echo = build_tools(specs, connection)[0]
+        assert not connection.connected
+
+        async def invoke():
+            events = [event async for event in echo.stream({'toolUseId': 't', 'name': 'echo',
+                                                            'input': {'text': 'lazy'}}, {})]
+            return events[-1]
+
+        result = asyncio.run(invoke())
+        assert connection.connected
+        assert 'lazy' in str(result)
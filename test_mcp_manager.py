@@ -0,0 +1,107 @@
+import os
+import sys
+
+from mcp_manager import MCPServerManager, server_key
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_mcp_server.py')
+
+
+def call(client, name, arguments=None):
+    result = client.call_tool_sync('test', name, arguments or {})
+    return result['status'], result['content'][0]['text']
+
+
+def test_server_key_normalizes_config():
+    assert server_key('npx', ['-y', 'pkg'], {'B': '2', 'A': '1'}) == \
+        server_key('npx', ('-y', 'pkg'), {'A': '1', 'B': '2'})
+    assert server_key('uvx', None, None) == server_key('uvx', [], {})
+    assert server_key('npx', ['a'], {}) != server_key('npx', ['b'], {})
+
+
+def test_sessions_share_one_server_until_idle(clock):
+    manager = MCPServerManager(idle_ttl=60, health_check_interval=3600, clock=clock)
+    try:
+        with manager.lease_scope():
+            first = manager.acquire(sys.executable, [FAKE_SERVER])
+            with manager.lease_scope():
+                second = manager.acquire(sys.executable, [FAKE_SERVER])
+                assert second is first
+                assert manager.stats()[0]['refs'] == 2
+                assert call(first, 'pid') == call(second, 'pid')
+                assert [t.tool_name for t in manager.list_tools(second)] == ['echo', 'pid', 'crash']
+            assert manager.stats()[0]['refs'] == 1
+
+        # Unused servers survive until the idle TTL expires
+        clock.now = 30
+        manager.reap()
+        assert manager.stats()[0]['running']
+        clock.now = 61
+        manager.reap()
+        assert manager.stats() == []
+    finally:
+        manager.shutdown()
+
+
+def test_crashed_server_is_restarted():
+    manager = MCPServerManager(idle_ttl=60, health_check_interval=3600)
+    try:
+        client = manager.acquire(sys.executable, [FAKE_SERVER])
+        status, pid = call(client, 'pid')
+        assert status == 'success'
+
+        status, _ = call(client, 'crash')
+        assert status == 'error'
+        assert client.broken
+
+        status, new_pid = call(client, 'pid')
+        assert status == 'success'
+        assert new_pid != pid
+        assert manager.stats()[0]['starts'] == 2
+    finally:
+        manager.shutdown()
+
+
+def test_health_check_restarts_servers_that_died_while_idle(clock):
+    manager = MCPServerManager(idle_ttl=600, health_check_interval=10, clock=clock)
+    try:
+        client = manager.acquire(sys.executable, [FAKE_SERVER])
+        _, pid = call(client, 'pid')
+        os.kill(int(pid), 9)
+
+        clock.now = 11
+        manager.reap()
+
+        assert manager.stats()[0]['starts'] == 2
+        assert call(client, 'echo', {'text': 'hi'}) == ('success', 'hi')
+    finally:
+        manager.shutdown()
+
+
+def test_lazy_connection_starts_the_server_on_first_call():
+    manager = MCPServerManager(idle_ttl=60, health_check_interval=3600)
+    try:
+        with manager.lease_scope():
+            connection = manager.lazy(sys.executable, [FAKE_SERVER])
+            assert manager.stats() == []
+
+            result = connection.call_tool_sync('t', 'echo', {'text': 'hi'})
+            assert result['content'][0]['text'] == 'hi'
+            connection.call_tool_sync('t', 'echo', {'text': 'again'})
+            assert manager.stats()[0]['refs'] == 1
+            assert manager.stats()[0]['starts'] == 1
+        # The connection is held for the session and released with it
+        assert manager.stats()[0]['refs'] == 0
+    finally:
+        manager.shutdown()
+
+
+def test_forked_child_starts_its_own_manager(monkeypatch):
+    import mcp_manager
+
+    inherited = MCPServerManager(idle_ttl=60, health_check_interval=3600)
+    monkeypatch.setattr(mcp_manager, '_manager', inherited)
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if mcp_manager.get_mcp_manager() is not inherited else 1)
+    assert os.waitpid(pid, 0)[1] == 0
+    assert mcp_manager.get_mcp_manager() is inherited
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models import Agent, Workflow
+from nav_catalog import NavCatalog
+
+
+def make_catalog(engine, **kwargs):
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(Workflow(name='Research', description='', graph_icon='data:image/png;base64,' + 'A' * 1000))
+    db.add(Agent(name='Writer', description='', prompt=''))
+    db.commit()
+    db.close()
+    statements.clear()
+    return NavCatalog(factory, **kwargs), factory, statements
+
+
+def test_catalog_lists_workflows_then_agents_without_icons(engine):
+    catalog, _, statements = make_catalog(engine)
+
+    items = catalog.items()
+
+    assert [(item['name'], item['type']) for item in items] == [('Research', 'workflow'), ('Writer', 'agent')]
+    assert not any('graph_icon' in statement for statement in statements)
+
+
+def test_catalog_is_cached_until_invalidated(engine):
+    catalog, factory, statements = make_catalog(engine)
+    catalog.items()
+
+    db = factory()
+    db.add(Workflow(name='Triage', description=''))
+    db.commit()
+    db.close()
+    statements.clear()
+
+    assert len(catalog.items()) == 2
+    assert statements == []
+
+    catalog.invalidate()
+    assert [item['name'] for item in catalog.items()] == ['Research', 'Triage', 'Writer']
+
+
+def test_catalog_expires_after_ttl(clock, engine):
+    catalog, factory, _ = make_catalog(engine, ttl=30, clock=clock)
+    catalog.items()
+
+    db = factory()
+    db.add(Agent(name='Reviewer', description='', prompt=''))
+    db.commit()
+    db.close()
+
+    clock.now = 10
+    assert len(catalog.items()) == 2
+    clock.now = 31
+    assert len(catalog.items()) == 3
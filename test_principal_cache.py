@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+
+from principal_cache import Principal, PrincipalCache
+
+
+@pytest.fixture
+def clock(clock):
+    clock.now = 1000.0
+    return clock
+
+
+def make_principal(profile_type='user'):
+    return Principal(uuid.uuid4(), 'someone@example.com', profile_type)
+
+
+def test_cached_principal_expires_after_ttl(clock):
+    cache = PrincipalCache(ttl=60, clock=clock)
+    principal = make_principal()
+    cache.put('token-a', principal)
+
+    clock.now += 59
+    assert cache.get('token-a') is principal
+    assert cache.get('token-b') is None
+    clock.now += 2
+    assert cache.get('token-a') is None
+
+
+def test_cached_principal_never_outlives_its_token(clock):
+    cache = PrincipalCache(ttl=60, clock=clock)
+    cache.put('token-a', make_principal(), token_expires_at=clock.now + 5)
+
+    clock.now += 6
+    assert cache.get('token-a') is None
+
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = PrincipalCache()
+    principal = make_principal('admin')
+    other = make_principal()
+    cache.put('token-a', principal)
+    cache.put('token-b', principal)
+    cache.put('token-c', other)
+
+    cache.invalidate_user(str(principal.id))
+
+    assert cache.get('token-a') is None
+    assert cache.get('token-b') is None
+    assert cache.get('token-c') is other
+
+
+def test_least_recently_used_tokens_are_evicted():
+    cache = PrincipalCache(max_size=2)
+    cache.put('token-a', make_principal())
+    cache.put('token-b', make_principal())
+    cache.get('token-a')
+    cache.put('token-c', make_principal())
+
+    assert cache.get('token-b') is None
+    assert cache.get('token-a') is not None
+    assert cache.get('token-c') is not None
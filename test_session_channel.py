@@ -0,0 +1,169 @@
+import socket
+import threading
+import time
+
+from session_channel import (ChannelServer, OutputBuffer, ServerSessionChannel, SessionChannel,
+                             bind_listener, recv_frame, send_frame)
+
+
+def test_output_for_a_reader_that_fell_behind_is_coalesced():
+    first, second = object(), object()
+    buffer = OutputBuffer(max_bytes=1024)
+    for payload in (b'data: 1\n\n', b'data: 2\n\n', b'_Q_E_E_ANSWERED', b'data: 3\n\n'):
+        assert buffer.put(first, payload)
+    buffer.put(second, b'data: other\n\n')
+
+    frames = buffer.take()
+    assert [(conn, bytes(payload)) for conn, payload, _ in frames] == [
+        (first, b'data: 1\n\ndata: 2\n\n'),
+        (first, b'_Q_E_E_ANSWERED'),
+        (first, b'data: 3\n\n'),
+        (second, b'data: other\n\n'),
+    ]
+    assert buffer.coalesced == 1
+
+
+def test_full_buffer_drops_or_blocks_output_but_not_control_frames():
+    conn = object()
+    dropping = OutputBuffer(max_bytes=10, policy='drop')
+    assert dropping.put(conn, b'data: 1234')
+    assert not dropping.put(conn, b'data: 5')
+    assert dropping.put(conn, b'_Q_E_E_ANSWERED')
+    assert dropping.dropped == 1
+
+    blocking = OutputBuffer(max_bytes=10, policy='block', block_timeout=0.1)
+    assert blocking.put(conn, b'data: 1234')
+    started = time.monotonic()
+    assert not blocking.put(conn, b'data: 5')
+    assert time.monotonic() - started >= 0.1
+
+    # Purging the frames of a disconnected reader makes room again
+    threading.Timer(0.02, blocking.purge, args=(conn,)).start()
+    blocking.block_timeout = 5
+    assert blocking.put(conn, b'data: 5')
+    assert blocking.size == len(b'data: 5')
+
+
+def test_disconnect_during_an_answer_sets_the_cancel_signal():
+    worker_end, web_end = socket.socketpair()
+    channel = ServerSessionChannel('session')
+    channel._attach(worker_end)
+    channel._receive(worker_end, 'question')
+    assert channel.get() == 'question'
+    assert not channel.cancel_signal.is_set()
+
+    channel.put('data: token\n\n')
+    reader = web_end.makefile('rb')
+    # The receipt tells the web side not to send the question again
+    assert recv_frame(reader) == b'_Q_E_E_RECEIVED'
+    assert recv_frame(reader) == b'data: token\n\n'
+
+    web_end.close()
+    channel._detach(worker_end)
+    assert channel.cancel_signal.is_set()
+    # Output for the departed client is discarded
+    channel.put('data: late\n\n')
+    assert channel._output.size == 0
+
+    # The next message starts uncancelled
+    channel.deliver('next')
+    assert channel.get() == 'next'
+    assert not channel.cancel_signal.is_set()
+    channel.close()
+    worker_end.close()
+
+
+def test_next_client_does_not_receive_the_end_of_a_cancelled_answer():
+    first_worker, first_web = socket.socketpair()
+    channel = ServerSessionChannel('session')
+    channel._attach(first_worker)
+    channel._receive(first_worker, 'long question')
+    assert channel.get() == 'long question'
+    first_web.close()
+    channel._detach(first_worker)
+
+    second_worker, second_web = socket.socketpair()
+    channel._attach(second_worker)
+    channel._receive(second_worker, 'next')
+    # The cancelled answer finishes after the next client attached
+    channel.put('_Q_E_E_ANSWERED')
+    assert channel.get() == 'next'
+    channel.put('data: reply\n\n')
+
+    reader = second_web.makefile('rb')
+    assert recv_frame(reader) == b'_Q_E_E_RECEIVED'
+    assert recv_frame(reader) == b'data: reply\n\n'
+    channel.close()
+    first_worker.close()
+    second_worker.close()
+
+
+def test_cancel_stops_the_answer_and_replies_once_the_session_is_idle():
+    worker_end, web_end = socket.socketpair()
+    cancel_worker, cancel_web = socket.socketpair()
+    channel = ServerSessionChannel('session')
+    channel._attach(worker_end)
+    channel._attach(cancel_worker)
+    channel._receive(worker_end, 'question')
+    channel._receive(worker_end, 'queued')
+    assert channel.get() == 'question'
+
+    def answer():
+        assert channel.cancel_signal.wait(5)
+        channel.put('_Q_E_E_ANSWERED')
+        # Sent before the cancel request, so it starts cancelled
+        assert channel.get() == 'queued' and channel.cancel_signal.is_set()
+        channel.put('_Q_E_E_ANSWERED')
+        channel.get()
+
+    session = threading.Thread(target=answer, daemon=True)
+    session.start()
+    channel._receive(cancel_worker, '_Q_E_E_CANCEL')
+    assert recv_frame(cancel_web.makefile('rb')) == b'_Q_E_E_CANCELLED'
+    assert channel.idle()
+
+    channel.deliver('_Q_E_E_TERMINATE')
+    session.join(5)
+    channel.close()
+    for sock in (worker_end, web_end, cancel_worker, cancel_web):
+        sock.close()
+
+
+def test_terminate_cancels_the_answer_in_progress():
+    worker_end, web_end = socket.socketpair()
+    channel = ServerSessionChannel('session')
+    channel._attach(worker_end)
+    channel._receive(worker_end, 'question')
+    assert channel.get() == 'question'
+
+    channel._receive(worker_end, '_Q_E_E_TERMINATE')
+    assert channel.cancel_signal.is_set()
+    channel.close()
+    worker_end.close()
+    web_end.close()
+
+
+def test_connections_that_fail_the_challenge_are_refused():
+    listener, address = bind_listener('test-auth', 0)
+    server = ChannelServer(listener, address)
+    server.start()
+    channel = server.open('session')
+    try:
+        intruder = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        intruder.connect(address)
+        reader = intruder.makefile('rb')
+        assert recv_frame(reader)
+        send_frame(intruder, b'session')
+        send_frame(intruder, b'_Q_E_E_TERMINATE')
+        assert recv_frame(reader) is None
+        intruder.close()
+
+        # The TERMINATE never reached the session
+
+        with SessionChannel(address, 'session') as web:
+            web.put('hello')
+            assert channel.get() == 'hello'
+            channel.put('hi')
+            assert web.get(timeout=5) == 'hi'
+    finally:
+        server.close()
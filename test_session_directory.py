@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from models import ChatSession, SessionOwner
+from session_directory import DatabaseSessionDirectory, LocalSessionDirectory
+
+
+def test_local_directory_routes_sessions():
+    directory = LocalSessionDirectory()
+    directory.register('conv-1', 7, '/tmp/worker-0.sock')
+    directory.register('conv-2', 7, '/tmp/worker-1.sock')
+    directory.register('conv-3', 8, '/tmp/worker-1.sock')
+
+    assert directory.lookup('conv-1') == {'workflow_id': '7', 'owner': '/tmp/worker-0.sock'}
+    assert sorted(directory.sessions_for_workflow(7)) == ['conv-1', 'conv-2']
+
+    directory.remove('conv-1')
+    assert directory.lookup('conv-1') is None
+    assert directory.sessions_for_workflow(7) == ['conv-2']
+
+
+def test_local_directory_expires_silent_owners(clock):
+    directory = LocalSessionDirectory(owner_ttl=10, clock=clock)
+    directory.register('conv-1', 1, 'alive')
+    directory.register('conv-2', 1, 'dead')
+
+    clock.now = 8
+    directory.heartbeat(['alive'])
+    clock.now = 15
+
+    assert directory.lookup('conv-1')['owner'] == 'alive'
+    assert directory.lookup('conv-2') is None
+    assert directory.sessions_for_workflow(1) == ['conv-1']
+
+
+def test_database_directory_routes_sessions(session_factory):
+    directory = DatabaseSessionDirectory(session_factory)
+    directory.register('conv-1', 7, 'tcp://10.0.0.1:4000')
+    directory.register('conv-2', 7, 'tcp://10.0.0.2:4000')
+
+    # A second directory on the same database sees the same routes
+    other = DatabaseSessionDirectory(directory.session_factory)
+    assert other.lookup('conv-2') == {'workflow_id': '7', 'owner': 'tcp://10.0.0.2:4000'}
+    assert sorted(other.sessions_for_workflow(7)) == ['conv-1', 'conv-2']
+
+    other.remove('conv-2')
+    assert directory.lookup('conv-2') is None
+
+    # Resumed by another owner: the previous owner's end does not drop the new route
+    directory.register('conv-1', 7, 'tcp://10.0.0.2:4000')
+    other.remove('conv-1', owner='tcp://10.0.0.1:4000')
+    assert directory.lookup('conv-1')['owner'] == 'tcp://10.0.0.2:4000'
+    other.remove('conv-1', owner='tcp://10.0.0.2:4000')
+    assert directory.lookup('conv-1') is None
+
+
+def test_database_directory_expires_silent_owners(session_factory):
+    directory = DatabaseSessionDirectory(session_factory, owner_ttl=10)
+    directory.register('conv-1', 1, 'alive')
+    directory.register('conv-2', 1, 'dead')
+
+    # Age the dead owner past the TTL, the alive one keeps heartbeating
+    db = directory.session_factory()
+    db.query(SessionOwner).filter_by(address='dead') \
+        .update({'last_seen': datetime.utcnow() - timedelta(seconds=20)})
+    db.commit()
+    db.close()
+    directory.heartbeat(['alive'])
+
+    assert directory.sessions_for_workflow(1) == ['conv-1']
+    assert directory.lookup('conv-2') is None
+    assert directory.lookup('conv-1')['owner'] == 'alive'
+
+
+def test_late_owner_keeps_its_routes_until_dead_for_long(session_factory):
+    directory = DatabaseSessionDirectory(session_factory, owner_ttl=10)
+    directory.register('conv-1', 1, 'late')
+    directory.register('conv-2', 1, 'gone')
+
+    def age(owner, seconds):
+        db = session_factory()
+        db.query(SessionOwner).filter_by(address=owner) \
+            .update({'last_seen': datetime.utcnow() - timedelta(seconds=seconds)})
+        db.commit()
+        db.close()
+
+    age('late', 20)
+    assert directory.lookup('conv-1') is None
+    # The owner was only delayed: its next heartbeat makes the session reachable again
+    directory.heartbeat(['late'])
+    assert directory.lookup('conv-1')['owner'] == 'late'
+
+    age('gone', 1000)
+    directory.heartbeat(['late'])
+    db = session_factory()
+    assert [row.id for row in db.query(ChatSession.id)] == ['conv-1']
+    db.close()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+from session_channel import ChannelClosed, SessionChannel
+from session_pool import SessionWorkerPool
+
+
+def echo_session(channel):
+    """Minimal session target: echo messages until terminated."""
+    import os
+    channel.put(f"_Q_E_E_STARTED{os.getpid()}")
+    while True:
+        message = channel.get()
+        if message == "_Q_E_E_TERMINATE":
+            break
+        if message.startswith("slow "):
+            time.sleep(1.0)
+        channel.put(message)
+
+
+def lingering_session(linger, channel):
+    """Echo session that takes ``linger`` seconds to end once terminated."""
+    echo_session(channel)
+    time.sleep(linger)
+
+
+# Held by a thread of the test process while workers start
+_held_lock = threading.Lock()
+
+
+def lock_session(channel):
+    """Session that reports whether it can take ``_held_lock``, then echoes."""
+    acquired = _held_lock.acquire(timeout=1)
+    channel.put(f"_Q_E_E_STARTED{acquired}")
+    echo_session(channel)
+
+
+def _start(pool, session_id, *args):
+    address = pool.submit(session_id, *args)
+    with SessionChannel(address, session_id) as channel:
+        started = channel.get(timeout=10)
+    assert started.startswith("_Q_E_E_STARTED")
+    return address, int(started[len("_Q_E_E_STARTED"):])
+
+
+def _terminate(address, session_id):
+    with SessionChannel(address, session_id) as channel:
+        channel.put("_Q_E_E_TERMINATE")
+
+
+def _hangs_up(address, session_id):
+    try:
+        with SessionChannel(address, session_id) as channel:
+            channel.get(timeout=0.1)
+    except ChannelClosed:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_sessions_share_warm_workers():
+    pool = SessionWorkerPool(size=1, max_sessions_per_worker=10, target=echo_session)
+    pool.start()
+    try:
+        sessions = {f"session-{i}": _start(pool, f"session-{i}") for i in range(3)}
+
+        # All sessions are hosted by the single pre-started worker
+        assert len({pid for _, pid in sessions.values()}) == 1
+        assert pool.stats()['sessions'] == 3
+
+        for session_id, (address, _) in sessions.items():
+            with SessionChannel(address, session_id) as channel:
+                channel.put(f"hello {session_id}")
+                assert channel.get(timeout=5) == f"hello {session_id}"
+                assert channel.received
+
+        for session_id, (address, _) in sessions.items():
+            _terminate(address, session_id)
+        assert _wait_for(lambda: pool.stats()['sessions'] == 0)
+    finally:
+        pool.shutdown()
+
+
+def test_worker_recycled_after_max_sessions():
+    pool = SessionWorkerPool(size=1, max_sessions_per_worker=2, target=echo_session)
+    pool.start()
+    try:
+        pids = []
+        for i in range(3):
+            address, pid = _start(pool, f"session-{i}")
+            pids.append(pid)
+            _terminate(address, f"session-{i}")
+
+        # The third session lands on the replacement worker
+        assert pids[0] == pids[1]
+        assert pids[2] != pids[0]
+        assert pool.stats()['workers_recycled'] == 1
+        assert _wait_for(lambda: len(pool.stats()['workers']) == 1)
+    finally:
+        pool.shutdown()
+
+
+def test_workers_do_not_inherit_locks_held_by_other_threads():
+    release = threading.Event()
+
+    def hold():
+        with _held_lock:
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    pool = SessionWorkerPool(size=1, target=lock_session)
+    pool.start()
+    try:
+        address = pool.submit("session")
+        with SessionChannel(address, "session") as channel:
+            assert channel.get(timeout=10) == "_Q_E_E_STARTEDTrue"
+        _terminate(address, "session")
+    finally:
+        release.set()
+        holder.join()
+        pool.shutdown()
+
+
+def test_replies_go_to_the_requesting_connection():
+    pool = SessionWorkerPool(size=1, target=echo_session)
+    pool.start()
+    try:
+        address, _ = _start(pool, "session")
+        with SessionChannel(address, "session") as first, SessionChannel(address, "session") as second:
+            first.put("one")
+            assert first.get(timeout=5) == "one"
+            second.put("two")
+            assert second.get(timeout=5) == "two"
+        _terminate(address, "session")
+    finally:
+        pool.shutdown()
+
+
+def test_async_channel_streams_session_output():
+    import asyncio
+    from session_channel import AsyncSessionChannel
+
+    pool = SessionWorkerPool(size=1, target=echo_session)
+    pool.start()
+    try:
+        address, _ = _start(pool, "session")
+
+        async def chat():
+            channels = [await AsyncSessionChannel.open(address, "session") for _ in range(20)]
+            for i, channel in enumerate(channels):
+                await channel.put(f"message {i}")
+                assert await channel.get(timeout=5) == f"message {i}"
+            for channel in channels:
+                await channel.close()
+
+        asyncio.run(chat())
+        _terminate(address, "session")
+    finally:
+        pool.shutdown()
+
+
+def test_idle_sessions_are_reaped():
+    ended = []
+    pool = SessionWorkerPool(size=1, target=echo_session, idle_ttl=0.3, activity_interval=0.1,
+                             on_session_end=lambda session_id, address: ended.append(session_id))
+    pool.start()
+    try:
+        _start(pool, "idle")
+        address, _ = _start(pool, "active")
+        deadline = time.time() + 1.0
+        while time.time() < deadline:
+            with SessionChannel(address, "active") as channel:
+                channel.put("ping")
+                assert channel.get(timeout=5) == "ping"
+            time.sleep(0.05)
+
+        assert _wait_for(lambda: ended == ["idle"], timeout=2)
+        assert pool.stats()['sessions_reaped'] >= 1
+        assert _wait_for(lambda: pool.stats()['sessions'] == 0)
+    finally:
+        pool.shutdown()
+
+
+def test_least_recently_used_session_is_evicted_at_the_cap():
+    ended = []
+    pool = SessionWorkerPool(size=1, target=echo_session, max_sessions=2, activity_interval=0.1,
+                             on_session_end=lambda session_id, address: ended.append(session_id))
+    pool.start()
+    try:
+        first, _ = _start(pool, "first")
+        second, _ = _start(pool, "second")
+        time.sleep(0.05)
+        # Using "first" makes "second" the least recently used one
+        with SessionChannel(first, "first") as channel:
+            channel.put("ping")
+            assert channel.get(timeout=5) == "ping"
+        assert _wait_for(lambda: pool._activity["first"][0] > pool._activity["second"][0])
+
+        _start(pool, "third")
+        assert ended == ["second"]
+        stats = pool.stats()
+        assert stats['sessions'] == 2 and stats['sessions_evicted'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_late_end_of_a_previous_session_keeps_the_resumed_one():
+    ended = []
+    pool = SessionWorkerPool(size=1, target=lingering_session,
+                             on_session_end=lambda session_id, address: ended.append(session_id))
+    pool.start()
+    try:
+        address, _ = _start(pool, "conv", 1.0)
+        _terminate(address, "conv")
+        assert _wait_for(lambda: _hangs_up(address, "conv"))
+        # Resumed while the terminated session is still ending: it hangs up until the new one runs
+        pool.submit("conv", 0)
+        deadline = time.time() + 10
+        while True:
+            try:
+                with SessionChannel(address, "conv") as channel:
+                    assert channel.get(timeout=5).startswith("_Q_E_E_STARTED")
+                break
+            except ChannelClosed:
+                assert time.time() < deadline
+                time.sleep(0.05)
+
+        time.sleep(1.5)
+        assert ended == []
+        assert pool.stats()['sessions'] == 1
+        with SessionChannel(address, "conv") as channel:
+            channel.put("still here")
+            assert channel.get(timeout=5) == "still here"
+
+        _terminate(address, "conv")
+        assert _wait_for(lambda: ended == ["conv"])
+    finally:
+        pool.shutdown()
+
+
+def test_eviction_skips_a_session_that_started_answering():
+    ended = []
+    # Activity reports are too rare to show the answer in progress
+    pool = SessionWorkerPool(size=1, target=echo_session, max_sessions=2, activity_interval=60,
+                             on_session_end=lambda session_id, address: ended.append(session_id))
+    pool.start()
+    try:
+        oldest, _ = _start(pool, "oldest")
+        _start(pool, "newer")
+        answers = []
+
+        def ask():
+            with SessionChannel(oldest, "oldest") as channel:
+                channel.put("slow question")
+                answers.append(channel.get(timeout=5))
+
+        asker = threading.Thread(target=ask)
+        asker.start()
+        time.sleep(0.2)
+        _start(pool, "third")
+        asker.join()
+
+        assert ended == ["newer"]
+        assert answers == ["slow question"]
+    finally:
+        pool.shutdown()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+from startup import StartupError, StartupPipeline
+
+
+def test_independent_phases_overlap_and_dependencies_wait():
+    events = []
+    lines = []
+    pipeline = StartupPipeline(log=lines.append)
+    pipeline.phase('slow', lambda: time.sleep(0.2) or events.append('slow'))
+    pipeline.phase('first', lambda: events.append('first'))
+    pipeline.phase('second', lambda: events.append('second') or 'skipped: nothing to do', after=('first',))
+
+    started = time.perf_counter()
+    results = pipeline.run()
+
+    assert time.perf_counter() - started < 0.35
+    assert events.index('first') < events.index('second') < events.index('slow')
+    assert [result.name for result in results] == ['slow', 'first', 'second']
+    assert 'second 0 ms (skipped: nothing to do)' in lines[0]
+
+
+def test_failed_phase_stops_its_dependents():
+    ran = []
+    pipeline = StartupPipeline(log=lambda line: None)
+    pipeline.phase('schema', lambda: (_ for _ in ()).throw(StartupError('database unreachable')))
+    pipeline.phase('admin', lambda: ran.append('admin'), after=('schema',))
+
+    with pytest.raises(StartupError, match='schema failed: database unreachable'):
+        pipeline.run()
+    assert ran == []
+    assert pipeline.results['admin'].error is not None
+
+
+def test_background_phase_does_not_delay_startup():
+    release = threading.Event()
+    lines = []
+    pipeline = StartupPipeline(log=lines.append)
+    pipeline.phase('credentials', release.wait, wait=False)
+    pipeline.phase('schema', lambda: None)
+
+    assert [result.name for result in pipeline.run()] == ['schema']
+    release.set()
+    assert pipeline.results['credentials'].done.wait(5)
+    assert lines[-1].startswith('Startup (background): credentials')
+
+    with pytest.raises(ValueError):
+        pipeline.phase('admin', lambda: None, after=('credentials',))
+
+
+def test_schema_is_only_migrated_when_the_models_changed():
+    from models import Base, SchemaVersion, ensure_schema
+
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    assert ensure_schema(engine) is True
+    assert set(inspect(engine).get_table_names()) == set(Base.metadata.tables)
+    assert ensure_schema(engine) is False
+
+    with engine.begin() as conn:
+        conn.execute(SchemaVersion.__table__.update().values(fingerprint='older'))
+    assert ensure_schema(engine) is True
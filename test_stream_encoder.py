@@ -0,0 +1,68 @@
+import json
+import time
+
+from stream_encoder import StreamEncoder, encode_event
+
+
+def decode(frames):
+    assert all(frame.startswith('data: ') and frame.endswith('\n\n') for frame in frames)
+    return [json.loads(frame[len('data: '):]) for frame in frames]
+
+
+def tool_delta(text, tool_id='t1'):
+    return {'delta': {'toolUse': {'input': text}}, 'current_tool_use': {'toolUseId': tool_id, 'name': 'search'}}
+
+
+def test_deltas_of_the_same_kind_are_sent_as_one_event_in_order():
+    frames = []
+    encoder = StreamEncoder(frames.append, window_ms=10000)
+    for event in ({'delta': {'text': 'Hel'}}, {'delta': {'text': 'lo'}}, tool_delta('{"q"'), tool_delta(': 1}'),
+                  tool_delta('{}', tool_id='t2'), {'delta': {'reasoningContent': {'text': 'hm'}}},
+                  {'delta': {'text': '!'}}):
+        encoder.send(event)
+    encoder.flush()
+
+    assert decode(frames) == [
+        {'delta': {'text': 'Hello'}},
+        tool_delta('{"q": 1}'),
+        tool_delta('{}', tool_id='t2'),
+        {'delta': {'reasoningContent': {'text': 'hm'}}},
+        {'delta': {'text': '!'}},
+    ]
+    assert (encoder.events, encoder.frames) == (7, 5)
+    encoder.close()
+
+
+def test_batched_deltas_are_sent_when_the_window_or_size_limit_is_reached():
+    frames = []
+    encoder = StreamEncoder(frames.append, window_ms=20, max_bytes=8)
+    encoder.send({'delta': {'text': 'abc'}})
+    assert frames == []
+    deadline = time.monotonic() + 2
+    while not frames and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert decode(frames) == [{'delta': {'text': 'abc'}}]
+
+    encoder.send({'delta': {'text': '1234'}})
+    encoder.send({'delta': {'text': '5678'}})
+    assert decode(frames[1:]) == [{'delta': {'text': '12345678'}}]
+    encoder.close()
+
+
+def test_zero_window_sends_every_delta():
+    frames = []
+    encoder = StreamEncoder(frames.append, window_ms=0)
+    encoder.send({'delta': {'text': 'a'}})
+    encoder.send({'delta': {'text': 'b'}})
+    assert frames == [encode_event({'delta': {'text': 'a'}}), encode_event({'delta': {'text': 'b'}})]
+
+
+def test_interleaved_deltas_of_concurrent_agents_are_not_merged():
+    frames = []
+    encoder = StreamEncoder(frames.append, window_ms=10000)
+    for source, text in (('a', 'The '), ('b', 'Le '), ('a', 'cat'), ('b', 'chat'), ('b', '!')):
+        encoder.send(tool_delta(text, tool_id='agent'), source=source)
+    encoder.flush()
+
+    assert [event['delta']['toolUse']['input'] for event in decode(frames)] == ['The ', 'Le ', 'cat', 'chat!']
+    encoder.close()
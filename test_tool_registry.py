@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+from tool_registry import BuiltinToolRegistry
+
+
+def test_tools_are_imported_on_first_use():
+    imported = []
+
+    def loader():
+        imported.append('calculator')
+        return object()
+
+    registry = BuiltinToolRegistry({})
+    registry.register('calculator', loader)
+    assert registry.loaded() == []
+
+    tool = registry.get('calculator')
+    assert registry.get('calculator') is tool
+    assert imported == ['calculator']
+    assert registry.loaded() == ['calculator']
+
+
+def test_unknown_or_broken_tools_are_skipped():
+    registry = BuiltinToolRegistry({'slack': 'strands_tools_missing.slack', 'json': 'json'})
+
+    assert registry.get('nope') is None
+    assert registry.get('slack') is None
+    assert registry.get('json') is sys.modules['json']
+
+
+def test_workflow_runner_imports_no_tool_modules():
+    code = ("import sys, workflow_runner; "
+            "print(sorted(m for m in sys.modules if m.startswith('strands_tools.')))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == '[]'
@@ -0,0 +1,157 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Agent, AgentTool, Base, Tool, Workflow, WorkflowEdge, WorkflowNode
+from workflow_runner import WorkflowRunner
+
+
+def make_db(engine):
+    selects = []
+
+    def count_selects(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count_selects)
+    return sessionmaker(bind=engine)(), selects
+
+
+def build_workflow(db, agent_count):
+    """Chain of agent nodes, each with two tools, plus one standalone tool node."""
+    workflow = Workflow(name=f'Flow {agent_count}', description='test')
+    db.add(workflow)
+    db.flush()
+    previous = None
+    for i in range(agent_count):
+        agent = Agent(name=f'agent{i}', description='d', prompt='p', model_id='m')
+        db.add(agent)
+        db.flush()
+        for j in range(2):
+            tool = Tool(name=f'tool{i}_{j}', tool_type='builtin', config='{}')
+            db.add(tool)
+            db.flush()
+            db.add(AgentTool(agent_id=agent.id, tool_id=tool.id))
+        node = WorkflowNode(workflow_id=workflow.id, node_type='agent', reference_id=agent.id,
+                            position_x=i, position_y=0)
+        db.add(node)
+        db.flush()
+        if previous:
+            db.add(WorkflowEdge(workflow_id=workflow.id, source_node_id=previous.id, target_node_id=node.id))
+        previous = node
+    tool = Tool(name='standalone', tool_type='mcp', config='{}')
+    db.add(tool)
+    db.flush()
+    db.add(WorkflowNode(workflow_id=workflow.id, node_type='tool', reference_id=tool.id,
+                        position_x=0, position_y=1))
+    db.commit()
+    return workflow.id
+
+
+def test_load_workflow_query_count_does_not_depend_on_graph_size(engine):
+    db, selects = make_db(engine)
+    small = build_workflow(db, 2)
+    large = build_workflow(db, 30)
+
+    counts = []
+    for workflow_id in (small, large):
+        db.expire_all()
+        selects.clear()
+        WorkflowRunner.load_workflow(workflow_id, db)
+        counts.append(len(selects))
+
+    assert counts[0] == counts[1]
+    assert counts[1] <= 6
+
+
+def test_load_workflow_resolves_references(engine):
+    db, _ = make_db(engine)
+    workflow_id = build_workflow(db, 2)
+
+    context = WorkflowRunner.load_workflow(workflow_id, db)
+
+    agent_nodes = [n for n in context['nodes'].values() if n['type'] == 'agent']
+    tool_nodes = [n for n in context['nodes'].values() if n['type'] == 'tool']
+    assert context['name'] == 'Flow 2'
+    assert len(context['edges']) == 1
+    assert sorted(n['reference']['name'] for n in agent_nodes) == ['agent0', 'agent1']
+    first = next(n for n in agent_nodes if n['reference']['name'] == 'agent0')
+    assert [t['name'] for t in first['reference']['tools']] == ['tool0_0', 'tool0_1']
+    assert set(first['reference']['tools'][0]) == {'id', 'name', 'tool_type', 'config', 'agent_id'}
+    assert tool_nodes[0]['reference']['name'] == 'standalone'
+
+
+def test_load_agent_includes_its_tools(engine):
+    db, selects = make_db(engine)
+    workflow_id = build_workflow(db, 1)
+    agent = db.query(Agent).filter_by(name='agent0').one()
+    selects.clear()
+
+    context = WorkflowRunner.load_agent(agent.id, db)
+
+    node = context['nodes'][str(agent.id)]
+    assert [t['name'] for t in node['reference']['tools']] == ['tool0_0', 'tool0_1']
+    assert node['reference']['model_id'] == 'm'
+    assert len(selects) <= 3
+
+
+def test_compiled_plan_is_reused_until_the_workflow_is_edited(engine):
+    db, selects = make_db(engine)
+    workflow_id = build_workflow(db, 3)
+    WorkflowRunner._plan_cache.invalidate()
+
+    plan = WorkflowRunner.compile_workflow(workflow_id, db)
+    assert plan['system_prompt'].startswith('# Workflow: Flow 3')
+    plan['conversation_history'].append({'role': 'user', 'content': 'hi'})
+
+    selects.clear()
+    again = WorkflowRunner.compile_workflow(workflow_id, db)
+    assert len(selects) == 1  # only the version lookup
+    assert again['conversation_history'] == []
+    assert again['system_prompt'] == plan['system_prompt']
+
+    # Renaming an agent used by the workflow recompiles the plan
+    agent = db.query(Agent).filter_by(name='agent1').one()
+    agent.name = 'renamed'
+    assert WorkflowRunner.mark_workflows_edited(db, agent_id=agent.id) == [workflow_id]
+    db.commit()
+    recompiled = WorkflowRunner.compile_workflow(workflow_id, db)
+    assert 'renamed' in recompiled['system_prompt']
+
+
+def test_tool_edits_mark_workflows_using_it_through_agents(engine):
+    db, _ = make_db(engine)
+    workflow_id = build_workflow(db, 1)
+    build_workflow(db, 1)
+    tool = db.query(Tool).filter_by(name='tool0_0').first()
+    users = db.query(AgentTool.agent_id).filter_by(tool_id=tool.id).all()
+    assert len(users) == 1
+
+    marked = WorkflowRunner.mark_workflows_edited(db, tool_id=tool.id)
+
+    assert marked == [workflow_id]
+
+
+def test_execution_mode_defaults_to_orchestrator_and_is_loaded(engine):
+    db, _ = make_db(engine)
+    workflow_id = build_workflow(db, 2)
+    assert WorkflowRunner.load_workflow(workflow_id, db)['execution_mode'] == 'orchestrator'
+
+    db.query(Workflow).get(workflow_id).execution_mode = 'dag'
+    db.commit()
+    assert WorkflowRunner.load_workflow(workflow_id, db)['execution_mode'] == 'dag'
+
+
+def test_missing_columns_are_added_to_existing_tables():
+    from sqlalchemy import inspect, text
+    from models import add_missing_columns
+
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE workflow (id CHAR(32) PRIMARY KEY, name VARCHAR(100) NOT NULL)'))
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    add_missing_columns(engine)
+
+    columns = {column['name'] for column in inspect(engine).get_columns('workflow')}
+    assert {'execution_mode', 'model_id', 'last_edited'} <= columns
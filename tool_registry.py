@@ -0,0 +1,78 @@
+"""
+Lazy registry of the builtin Strands tools.
+
+``workflow_runner`` used to import every ``strands_tools`` module up front, so
+each web worker and session worker paid the import time and memory of tools
+(sympy, image generation, Slack, ...) that no agent referenced. Tools are now
+registered by module path and imported the first time an agent uses them.
+"""
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Builtin tool name -> module implementing it
+BUILTIN_TOOL_MODULES = {
+    name: f'strands_tools.{name}' for name in (
+        'file_read', 'file_write', 'editor', 'shell', 'http_request', 'python_repl',
+        'calculator', 'use_aws', 'retrieve', 'nova_reels', 'memory', 'environment',
+        'generate_image', 'image_reader', 'journal', 'think', 'load_tool', 'swarm',
+        'current_time', 'sleep', 'agent_graph', 'cron', 'slack', 'speak', 'stop',
+        'workflow', 'batch',
+    )
+}
+# use_llm is deliberately not exposed (see use_llm_tool in workflow_runner)
+
+
+class BuiltinToolRegistry:
+    """Builtin tools by name, imported on first use."""
+
+    def __init__(self, modules: Dict[str, str]):
+        """
+        Args:
+            modules: Tool name -> importable module path
+        """
+        self._loaders: Dict[str, Callable[[], Any]] = {
+            name: (lambda path=path: importlib.import_module(path)) for name, path in modules.items()}
+        self._tools: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Register (or replace) a tool, ``loader`` returns it when first needed."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._tools.pop(name, None)
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Return a builtin tool, importing it if needed.
+
+        Returns:
+            The tool, or None if it is unknown or can not be imported
+        """
+        tool = self._tools.get(name)
+        if tool is not None:
+            return tool
+        loader = self._loaders.get(name)
+        if loader is None:
+            print(f"Unknown builtin tool: {name}")
+            return None
+        with self._lock:
+            tool = self._tools.get(name)
+            if tool is None:
+                try:
+                    tool = self._tools[name] = loader()
+                except Exception as e:
+                    # e.g. an optional dependency of that one tool is missing
+                    print(f"Could not load builtin tool {name}: {str(e)}")
+                    return None
+            return tool
+
+    def names(self) -> List[str]:
+        return sorted(self._loaders)
+
+    def loaded(self) -> List[str]:
+        """Return the tools imported so far."""
+        return sorted(self._tools)
+
+
+builtin_tool_registry = BuiltinToolRegistry(BUILTIN_TOOL_MODULES)
@@ -0,0 +1,65 @@
+"""
+Cache of compiled workflow plans.
+
+A plan is the picklable workflow context produced by
+``WorkflowRunner.load_workflow`` (resolved nodes, edges and tool specs) plus the
+orchestrator system prompt. Plans are keyed by ``(workflow_id, last_edited)``:
+every edit that changes what a workflow runs bumps ``Workflow.last_edited``, so
+a stale plan is simply never looked up again and ages out of the LRU.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+WORKFLOW_PLAN_CACHE_SIZE = int(os.environ.get('WORKFLOW_PLAN_CACHE_SIZE', '256'))
+
+
+class WorkflowPlanCache:
+    """LRU of compiled workflow plans keyed by workflow version."""
+
+    def __init__(self, max_size: int = WORKFLOW_PLAN_CACHE_SIZE):
+        self.max_size = max_size
+        self._plans: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, workflow_id, last_edited) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the plan compiled for this workflow version, or None.
+
+        The copy can be mutated by the caller (conversation history, agents)
+        without affecting later activations.
+        """
+        key = (str(workflow_id), last_edited)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(plan)
+
+    def put(self, workflow_id, last_edited, plan: Dict[str, Any]):
+        key = (str(workflow_id), last_edited)
+        plan = copy.deepcopy(plan)
+        with self._lock:
+            # Older versions of the same workflow can not be requested anymore
+            for stale in [k for k in self._plans if k[0] == key[0] and k != key]:
+                del self._plans[stale]
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, workflow_id=None):
+        """Drop the plans of one workflow, or all plans."""
+        with self._lock:
+            if workflow_id is None:
+                self._plans.clear()
+                return
+            for key in [k for k in self._plans if k[0] == str(workflow_id)]:
+                del self._plans[key]
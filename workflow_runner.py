@@ -1,5 +1,6 @@
 # Store active workflows in memory (in a real-world application, this should be in a database or Redis)
 import datetime
+import functools
 from typing import Dict, Any, Optional
 import uuid
 from models import Workflow, WorkflowNode, WorkflowEdge, Agent, Tool, AgentTool
@@ -10,45 +11,25 @@ from typing import Dict, Any, Optional, List
 import boto3
 import rapidjson
 # Import Strands classes or create mock implementations
-from multiprocessing import Manager, Process, Queue
 from strands import Agent as StrandsAgent, tool
-from strands.tools.mcp import MCPClient
-from mcp import stdio_client, StdioServerParameters
 import re
 import os
+import traceback
 from strands.types.tools import ToolResult, ToolUse
+from session_pool import get_session_pool
+from workflow_plans import WorkflowPlanCache
+from mcp_manager import get_mcp_manager
+from mcp_catalog import build_tools, get_mcp_catalog
+from conversation_store import get_conversation_store
+from stream_encoder import StreamEncoder, encode_event
 
-# Import all tools from strands_tools
-from strands_tools import (
-    file_read,
-    file_write,
-    editor,
-    shell,
-    http_request,
-    python_repl,
-    calculator,
-    use_aws,
-    retrieve,
-    nova_reels,
-    memory,
-    environment,
-    generate_image,
-    image_reader,
-    journal,
-    think,
-    load_tool,
-    swarm,
-    current_time,
-    sleep,
-    agent_graph,
-    cron,
-    slack,
-    speak,
-    stop,
-    use_llm,
-    workflow,
-    batch
-)
+from tool_registry import builtin_tool_registry
+from graph_executor import DagExecutor, GraphError, PipelineExecutor, WorkflowGraph, DEFAULT_EXECUTION_MODE
+
+# Model provider of every agent: 'bedrock', or 'fake' for offline tests and load tests (see fake_model)
+MODEL_PROVIDER = os.environ.get('MODEL_PROVIDER', 'bedrock')
+# Stored messages a resumed conversation starts with
+SESSION_RESUME_MAX_MESSAGES = int(os.environ.get('SESSION_RESUME_MAX_MESSAGES', '50'))
 
 
 @tool
@@ -111,13 +92,17 @@ def think_tool(thought: str, cycle_count: int, system_prompt: str, agent: Any) -
         - The tool is designed to avoid recursive self-calls that could cause infinite loops
         - Each cycle has visibility into previous cycle outputs to enable building upon insights
     """
+    from strands_tools import think
     try:
         return think.think(thought, cycle_count, system_prompt+". Be very concise. You MUST not provide an answer, only self reflection." , agent=None)
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise(e)
-    
+
+# The agent-facing "think" wraps strands_tools.think with a concise prompt
+builtin_tool_registry.register('think', lambda: think_tool)
+
 @tool
 def use_llm_tool(tool: ToolUse, **kwargs: Any) -> ToolResult:
     """
@@ -171,18 +156,27 @@ def use_llm_tool(tool: ToolUse, **kwargs: Any) -> ToolResult:
         - The agent(prompt) call is synchronous and will block until completion
         - Performance metrics include token usage and processing latency information
     """
+    from strands_tools import use_llm
     return use_llm.use_llm(tool, kwargs)
 
 
-def _processing_thread(workflow_context, input_queue: Queue, output_queue: Queue):
+def _processing_thread(workflow_context, channel):
+    # MCP servers acquired while building the session's tools are released when it ends
+    with get_mcp_manager().lease_scope():
+        _run_session(workflow_context, channel)
+
+def _run_session(workflow_context, channel):
+    # Deltas are merged into fewer, larger Server-Sent Events (see stream_encoder)
+    encoder = StreamEncoder(channel.put)
+
     def top_level_callback_handler(**event):
         if "delta" in event:
             #remove properties that arent data or delta
             event = {k: v for k, v in event.items() if k in ["delta", 'current_tool_use']}
             
 
-            output_queue.put("data: " + json.dumps(event, default=str) + "\nend")
-    def agent_level_callback_handler(**event):
+            encoder.send(event)
+    def agent_level_callback_handler(source, **event):
 
         if "delta" in event:
             event = {k: v for k, v in event.items() if k in ["delta",'current_tool_use']}
@@ -191,18 +185,26 @@ def _processing_thread(workflow_context, input_queue: Queue, output_queue: Queue
                 event['delta'] = {'toolUse':{'input':event['delta']['text']}}
                 event['current_tool_use'] = {'toolUseId':'agent', 'name': 'aws_documentation_retriever'}
             
-            output_queue.put("data: " + json.dumps(event, default=str) + "\nend")
+            # Agents may run at the same time (graph nodes, parallel tool calls): only
+            # deltas of the same agent are merged
+            encoder.send(event, source=source)
 
 
+    # Agents called as tools or graph nodes stop with the answer that called them
+    workflow_context['cancel_signal'] = channel.cancel_signal
     agents = WorkflowRunner.create_nodes(workflow_context)
     workflow_context['agents'] = agents
     if len(agents) > 1:
         # Create an orchestrator agent that manages the workflow
         
         for agent in agents:
-            agent.callback_handler = agent_level_callback_handler
+            agent.callback_handler = functools.partial(agent_level_callback_handler, id(agent))
         
-        orchestrator = WorkflowRunner._create_orchestrator(workflow_context)
+        orchestrator = None
+        if workflow_context.get('execution_mode', DEFAULT_EXECUTION_MODE) != DEFAULT_EXECUTION_MODE:
+            orchestrator = WorkflowRunner._create_graph_executor(workflow_context)
+        if orchestrator is None:
+            orchestrator = WorkflowRunner._create_orchestrator(workflow_context)
         orchestrator.callback_handler = top_level_callback_handler
         workflow_context['orchestrator'] = orchestrator
     else:
@@ -211,38 +213,63 @@ def _processing_thread(workflow_context, input_queue: Queue, output_queue: Queue
         workflow_context['orchestrator'] = orchestrator
         
     
-    output_queue.put("_Q_E_E_STARTED")
-    #loop input queue gets until receive a _Q_E_E_TERMINATE message
+    store = get_conversation_store()
+    if store is not None:
+        _resume_conversation(orchestrator, store, channel.session_id)
+    channel.put("_Q_E_E_STARTED")
+    #loop channel gets until receive a _Q_E_E_TERMINATE message
     while True:
-        message = input_queue.get()
+        message = channel.get()
         if message == "_Q_E_E_TERMINATE":
+            encoder.close()
             break
-        elif message == "_Q_E_E_RETRIEVE":
-            # Retrieve and send conversation history
-            history = workflow_context.get('conversation_history', [])
-            history_json = json.dumps(history, default=str)
-            output_queue.put("_Q_E_E_HISTORY" + history_json)
-        else:
-            # Add message to conversation history
-            if 'conversation_history' not in workflow_context:
-                workflow_context['conversation_history'] = []
-            workflow_context['conversation_history'].append({
-                'role': 'user',
-                'content': message,
-                'timestamp': json.dumps(datetime.datetime.now(datetime.timezone.utc), default=str)
-            })
-            
-            answer = orchestrator(message)
-            
-            # Add response to conversation history
-            workflow_context['conversation_history'].append({
-                'role': 'assistant', 
-                'content': str(answer),
-                'timestamp': json.dumps(datetime.datetime.now(datetime.timezone.utc), default=str)
-            })
+        # History is persisted as turns complete; /api/chat/history reads it from the store
+        _record_turn(store, channel.session_id, 'user', message)
+        # Set by the channel if the client disconnects or the answer is cancelled: it stops at the next
+        # model event or tool boundary, and pending MCP calls are aborted
+        try:
+            answer = orchestrator(message, cancel_signal=channel.cancel_signal)
+        except Exception as e:
+            # E.g. model throttling: report it and keep the session for the next message
+            traceback.print_exc()
+            encoder.send({'error': f"The answer failed: {e}"})
+            channel.put("_Q_E_E_ANSWERED")
+            continue
+        encoder.flush()
+        _record_turn(store, channel.session_id, 'assistant', str(answer))
+        channel.put("_Q_E_E_ANSWERED")
 
-            output_queue.put("_Q_E_E_ANSWERED")
-    pass
+def _resume_conversation(orchestrator, store, conversation_id):
+    """Give a session restarted for an existing conversation (e.g. after idle reaping) its stored history."""
+    if not hasattr(orchestrator, 'messages'):
+        # Graph executors keep no conversation of their own
+        return
+    try:
+        turns = store.recent(conversation_id, SESSION_RESUME_MAX_MESSAGES)
+    except Exception:
+        traceback.print_exc()
+        return
+    messages = []
+    question = None
+    # Only answered questions: a user message without an answer was cut off by the end of the session
+    for turn in turns:
+        if turn['role'] == 'user':
+            question = turn
+        elif turn['role'] == 'assistant' and question is not None:
+            messages.append({'role': 'user', 'content': [{'text': question['content']}]})
+            messages.append({'role': 'assistant', 'content': [{'text': turn['content']}]})
+            question = None
+    if messages:
+        orchestrator.messages = messages
+
+def _record_turn(store, conversation_id, role, content):
+    if store is None:
+        return
+    try:
+        store.append(conversation_id, role, content)
+    except Exception:
+        # A history write failure must not break the conversation
+        traceback.print_exc()
 
 class WorkflowRunner:
     """
@@ -255,30 +282,39 @@ class WorkflowRunner:
     _workflow_contexts = {}
     # Dictionary to track workflow edit timestamps
     _workflow_edit_timestamps = {}
+    # Compiled workflow plans by (workflow_id, last_edited)
+    _plan_cache = WorkflowPlanCache()
 
 
  
     @classmethod
-    def create_threaded_workflow(cls, workflow_id: uuid.UUID, db_session, input_queue, output_queue):
-        workflow = cls.load_workflow(workflow_id, db_session)
-        if not workflow:
-            raise ValueError(f"Workflow with ID {workflow_id} not found")
-                    
+    def create_threaded_workflow(cls, workflow_id: uuid.UUID, db_session, session_id: str):
+        """
+        Start a workflow session on the session worker pool.
 
+        Returns:
+            Tuple of the workflow name and the channel address of the hosting worker
+        """
+        workflow = cls.compile_workflow(workflow_id, db_session)
 
-        process = Process(target=_processing_thread, args=(workflow, input_queue, output_queue))
-        process.start()
-        return workflow['name']
+        # Hand the session to a pre-started worker instead of spawning a process
+        address = get_session_pool().submit(session_id, workflow)
+        return workflow['name'], address
 
     @classmethod
-    def create_threaded_agent(cls, agent_id: uuid.UUID, db_session, input_queue, output_queue):
+    def create_threaded_agent(cls, agent_id: uuid.UUID, db_session, session_id: str):
+        """
+        Start a single-agent session on the session worker pool.
+
+        Returns:
+            Tuple of the agent name and the channel address of the hosting worker
+        """
         agent_context = cls.load_agent(agent_id, db_session)
         if not agent_context:
             raise ValueError(f"Agent with ID {agent_id} not found")
 
-        process = Process(target=_processing_thread, args=(agent_context, input_queue, output_queue))
-        process.start()
-        return agent_context['name']
+        address = get_session_pool().submit(session_id, agent_context)
+        return agent_context['name'], address
 
 
     @classmethod
@@ -318,6 +354,14 @@ class WorkflowRunner:
         nodes = db_session.query(WorkflowNode).filter_by(workflow_id=workflow_id).all()
         edges = db_session.query(WorkflowEdge).filter_by(workflow_id=workflow_id).all()
         
+        # Fetch everything the nodes reference with one query per table, whatever the graph size
+        agent_ids = {node.reference_id for node in nodes if node.node_type == 'agent' and node.reference_id}
+        tool_ids = {node.reference_id for node in nodes if node.node_type == 'tool' and node.reference_id}
+        agents = {}
+        if agent_ids:
+            agents = {agent.id: agent for agent in db_session.query(Agent).filter(Agent.id.in_(agent_ids))}
+        agent_tools, tools = cls._load_agent_tools(agents.keys(), db_session, extra_tool_ids=tool_ids)
+        
         # Prepare node data with all database references resolved
         prepared_nodes = {}
         for node in nodes:
@@ -329,40 +373,13 @@ class WorkflowRunner:
             
             # Add reference data based on node type
             if node.node_type == 'agent' and node.reference_id:
-                agent = db_session.query(Agent).get(node.reference_id)
+                agent = agents.get(node.reference_id)
                 if agent:
-                    # Get all tools associated with this agent
-                    agent_tool_associations = db_session.query(AgentTool).filter_by(agent_id=agent.id).all()
-                    agent_tools = []
-                    for assoc in agent_tool_associations:
-                        tool = db_session.query(Tool).get(assoc.tool_id)
-                        if tool:
-                            agent_tools.append({
-                                'id': tool.id,
-                                'name': tool.name,
-                                'tool_type': tool.tool_type,
-                                'config': tool.config,
-                                'agent_id': tool.agent_id
-                            })
-                    
-                    node_data['reference'] = {
-                        'id': agent.id,
-                        'name': agent.name,
-                        'prompt': agent.prompt,
-                        'model_id': agent.model_id,
-                        'description': agent.description,
-                        'tools': agent_tools
-                    }
+                    node_data['reference'] = cls._agent_data(agent, agent_tools.get(agent.id, []))
             elif node.node_type == 'tool' and node.reference_id:
-                tool = db_session.query(Tool).get(node.reference_id)
+                tool = tools.get(node.reference_id)
                 if tool:
-                    node_data['reference'] = {
-                        'id': tool.id,
-                        'name': tool.name,
-                        'tool_type': tool.tool_type,
-                        'config': tool.config,
-                        'agent_id': tool.agent_id
-                    }
+                    node_data['reference'] = cls._tool_data(tool)
             
             prepared_nodes[node.id] = node_data
         
@@ -372,6 +389,7 @@ class WorkflowRunner:
             'name': workflow.name,
             'description': workflow.description,
             'model_id': workflow.model_id,
+            'execution_mode': workflow.execution_mode or DEFAULT_EXECUTION_MODE,
             'nodes': prepared_nodes,
             'edges': [{'source': edge.source_node_id, 'target': edge.target_node_id} for edge in edges],
             'conversation_history': [],
@@ -380,6 +398,63 @@ class WorkflowRunner:
         
         return workflow_data
     
+    @classmethod
+    def compile_workflow(cls, workflow_id: uuid.UUID, db_session) -> Dict[str, Any]:
+        """
+        Return the compiled plan of a workflow: its loaded context plus the orchestrator prompt.
+        
+        Plans are cached by workflow version, so activating an unchanged workflow
+        costs a single ``last_edited`` lookup.
+        
+        Args:
+            workflow_id: ID of the workflow to compile
+            db_session: SQLAlchemy database session
+            
+        Returns:
+            Dict in the ``load_workflow`` format with an additional ``system_prompt``
+        """
+        row = db_session.query(Workflow.last_edited).filter(Workflow.id == workflow_id).first()
+        if row is None:
+            raise ValueError(f"Workflow with ID {workflow_id} not found")
+        
+        if row.last_edited is not None:
+            plan = cls._plan_cache.get(workflow_id, row.last_edited)
+            if plan is not None:
+                return plan
+        
+        plan = cls.load_workflow(workflow_id, db_session)
+        plan['system_prompt'] = cls._generate_workflow_prompt(plan)
+        if plan['last_edited'] is not None:
+            cls._plan_cache.put(workflow_id, plan['last_edited'], plan)
+        return plan
+    
+    @classmethod
+    def mark_workflows_edited(cls, db_session, workflow_ids=(), agent_id=None, tool_id=None) -> List[Any]:
+        """
+        Bump ``last_edited`` of workflows so their compiled plans are rebuilt.
+        
+        Besides the given workflows, this covers every workflow with a node referencing
+        ``agent_id`` or ``tool_id``, or an agent using ``tool_id``. The caller commits.
+        
+        Returns:
+            IDs of the workflows marked as edited
+        """
+        reference_ids = {ref for ref in (agent_id, tool_id) if ref}
+        if tool_id:
+            reference_ids |= {row.agent_id for row in
+                              db_session.query(AgentTool.agent_id).filter_by(tool_id=tool_id)}
+        workflow_ids = set(workflow_ids)
+        if reference_ids:
+            workflow_ids |= {row.workflow_id for row in
+                             db_session.query(WorkflowNode.workflow_id)
+                             .filter(WorkflowNode.reference_id.in_(reference_ids)).distinct()}
+        if workflow_ids:
+            db_session.query(Workflow).filter(Workflow.id.in_(workflow_ids)) \
+                .update({'last_edited': datetime.datetime.utcnow()}, synchronize_session=False)
+        for workflow_id in workflow_ids:
+            cls._plan_cache.invalidate(workflow_id)
+        return list(workflow_ids)
+    
     @classmethod
     def load_agent(cls, agent_id: uuid.UUID, db_session) -> Dict[str, Any]:
         """
@@ -398,31 +473,13 @@ class WorkflowRunner:
             raise ValueError(f"Agent with ID {agent_id} not found")
         
         # Get all tools associated with this agent
-        agent_tool_associations = db_session.query(AgentTool).filter_by(agent_id=agent_db.id).all()
-        agent_tools = []
-        for assoc in agent_tool_associations:
-            tool = db_session.query(Tool).get(assoc.tool_id)
-            if tool:
-                agent_tools.append({
-                    'id': tool.id,
-                    'name': tool.name,
-                    'tool_type': tool.tool_type,
-                    'config': tool.config,
-                    'agent_id': tool.agent_id
-                })
+        agent_tools = cls._load_agent_tools([agent_db.id], db_session)[0].get(agent_db.id, [])
         
         # Create a single node representing this agent with its tools
         agent_node = {
             'id': agent_id,
             'type': 'agent',
-            'reference': {
-                'id': agent_db.id,
-                'name': agent_db.name,
-                'prompt': agent_db.prompt,
-                'model_id': agent_db.model_id,
-                'description': agent_db.description,
-                'tools': agent_tools
-            }
+            'reference': cls._agent_data(agent_db, agent_tools)
         }
         
         # Initialize workflow context with the agent as a single node
@@ -439,6 +496,57 @@ class WorkflowRunner:
         
         return workflow_context
     
+    @classmethod
+    def _load_agent_tools(cls, agent_ids, db_session, extra_tool_ids=()):
+        """
+        Load the tools associated with a set of agents in two queries.
+        
+        Args:
+            agent_ids: IDs of the agents
+            db_session: SQLAlchemy database session
+            extra_tool_ids: IDs of other tools to fetch in the same query
+            
+        Returns:
+            Tuple of a dict mapping each agent ID to its tool dicts, in association
+            order, and a dict mapping every fetched tool ID to its Tool row
+        """
+        agent_ids = list(agent_ids)
+        associations = []
+        if agent_ids:
+            associations = db_session.query(AgentTool).filter(AgentTool.agent_id.in_(agent_ids)).all()
+        tool_ids = {assoc.tool_id for assoc in associations} | set(extra_tool_ids)
+        tools = {}
+        if tool_ids:
+            tools = {tool.id: tool for tool in db_session.query(Tool).filter(Tool.id.in_(tool_ids))}
+        
+        agent_tools = {}
+        for assoc in associations:
+            tool = tools.get(assoc.tool_id)
+            if tool:
+                agent_tools.setdefault(assoc.agent_id, []).append(cls._tool_data(tool))
+        return agent_tools, tools
+    
+    @staticmethod
+    def _tool_data(tool: Tool) -> Dict[str, Any]:
+        return {
+            'id': tool.id,
+            'name': tool.name,
+            'tool_type': tool.tool_type,
+            'config': tool.config,
+            'agent_id': tool.agent_id
+        }
+    
+    @staticmethod
+    def _agent_data(agent: Agent, tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            'id': agent.id,
+            'name': agent.name,
+            'prompt': agent.prompt,
+            'model_id': agent.model_id,
+            'description': agent.description,
+            'tools': tools
+        }
+    
     @classmethod
     def set_active_workflow(cls, workflow_id: uuid.UUID, db_session) -> Dict[str, Any]:
         """
@@ -523,16 +631,19 @@ class WorkflowRunner:
     def create_nodes(cls, workflow_context):
         agents = []
         tools = []
+        node_agents = {}
         for node_id, node_data in workflow_context['nodes'].items():
             if node_data['type'] == 'agent':
                 agent = cls.create_agent(node_data)
                 if agent:
                     agents.append(agent)
+                    node_agents[node_id] = agent
             elif node_data['type'] == 'tool':
                 tool_instance = cls.create_tool(node_data)
                 if tool_instance:
                     tools.append(tool_instance)
         workflow_context['tools'] = tools
+        workflow_context['node_agents'] = node_agents
         return agents
 
     @classmethod
@@ -579,13 +690,7 @@ class WorkflowRunner:
                 agent_tools += tool_instance
         
         # Create a Strands agent instance
-        model_arg = agent_ref.get('model_id')
-        
-        # Use cross-region profile if available
-        if model_arg:
-            from bedrock_models import get_model_with_cross_region_profile
-            model_arg = get_model_with_cross_region_profile(model_arg)
-            
+        model_arg = cls._create_model(agent_ref.get('model_id'))
         
         strands_agent = StrandsAgent(
             model=model_arg,
@@ -614,40 +719,10 @@ class WorkflowRunner:
                 
         # Create the appropriate tool instance based on type
         if tool_data['tool_type'] == 'builtin':
-            # Map tool name to the appropriate strands_tools module
-            tool_mapping = {
-                'file_read': file_read,
-                'file_write': file_write,
-                'editor': editor,
-                'shell': shell,
-                'http_request': http_request,
-                'python_repl': python_repl,
-                'calculator': calculator,
-                'use_aws': use_aws,
-                'retrieve': retrieve,
-                'nova_reels': nova_reels,
-                'memory': memory,
-                'environment': environment,
-                'generate_image': generate_image,
-                'image_reader': image_reader,
-                'journal': journal,
-                'think': think_tool,
-                'load_tool': load_tool,
-                'swarm': swarm,
-                'current_time': current_time,
-                'sleep': sleep,
-                'agent_graph': agent_graph,
-                'cron': cron,
-                'slack': slack,
-                'speak': speak,
-                'stop': stop,
-                #'use_llm': use_llm_tool,
-                'workflow': workflow,
-                'batch': batch
-            }
-            
-            # Get the tool from the mapping
-            tool_module = tool_mapping.get(tool_data['name'].lower())
+            # Builtin tools are imported on first use
+            tool_module = builtin_tool_registry.get(tool_data['name'].lower())
+            if tool_module is None:
+                return None
             return [tool_module]
             
         elif tool_data['tool_type'] == 'mcp':
@@ -662,18 +737,16 @@ class WorkflowRunner:
             print("DIS", disabled_tools)
 
             
-            # Create MCP client using stdio transport
-            mcp_client = MCPClient(lambda: stdio_client(
-                StdioServerParameters(
-                    command=command,
-                    args=args,
-                    env=env
-                )
-            ))
-            
-            # Get tools from the MCP server
-            mcp_client.start()
-            all_tools = mcp_client.list_tools_sync()
+            # Share one server per configuration across sessions instead of starting one per tool
+            manager = get_mcp_manager()
+            catalog = get_mcp_catalog()
+            if catalog is not None:
+                # Expose the catalog schemas right away; the server is only started
+                # when the conversation first calls one of its tools
+                all_tools = build_tools(catalog.get(command, args, env), manager.lazy(command, args, env))
+            else:
+                mcp_client = manager.acquire(command, args, env)
+                all_tools = manager.list_tools(mcp_client)
 
             # Filter out disabled tools
             if disabled_tools and all_tools:
@@ -746,6 +819,7 @@ class WorkflowRunner:
         
         # Update edit timestamp
         cls._workflow_edit_timestamps[workflow_id] = 0
+        cls._plan_cache.invalidate(workflow_id)
     
     @classmethod
     async def deliver_message(cls, message: str, session_id: str = None, db_session = None):
@@ -803,7 +877,7 @@ class WorkflowRunner:
             if "data" in event:
                 response_content += event["data"]
             
-            yield "data: " + json.dumps(event, default=str) + "\n"
+            yield encode_event(event)
             
 
         response = {
@@ -834,11 +908,12 @@ class WorkflowRunner:
         all_tools = []
         
         # Add agent tools
+        cancel_signal = workflow_context.get('cancel_signal')
         for agent in workflow_context['agents']:
             #instantiate StrandsAgent class loading the right agent spec
             def capture(__captured = agent):
                 def f(task: str):
-                    return __captured(task)
+                    return __captured(task, cancel_signal=cancel_signal)
                 return f
             agent_wrapper = capture()
             #name must be [a-zA-Z0-9_-]+ replace anything else with _ using a regex
@@ -857,17 +932,12 @@ class WorkflowRunner:
                         # Add each tool to the orchestrator's tools
                         all_tools.append(tool_instance)
         
-        # Generate a system prompt describing the workflow graph
-        system_prompt = cls._generate_workflow_prompt(workflow_context)
+        # Generate a system prompt describing the workflow graph, unless it was compiled with the plan
+        system_prompt = workflow_context.get('system_prompt') or cls._generate_workflow_prompt(workflow_context)
        
         
         # Create the orchestrator agent with the workflow's model if specified
-        model_id = workflow_context.get('model_id')
-        
-        # Use cross-region profile if available
-        if model_id:
-            from bedrock_models import get_model_with_cross_region_profile
-            model_id = get_model_with_cross_region_profile(model_id)
+        model_id = cls._create_model(workflow_context.get('model_id'), orchestrator=True)
             
         orchestrator = StrandsAgent(
             model=model_id,
@@ -877,6 +947,60 @@ class WorkflowRunner:
         
         return orchestrator
         
+    @classmethod
+    def _create_model(cls, model_id: Optional[str], orchestrator: bool = False):
+        """
+        Return the ``model`` argument of a Strands agent for the configured provider.
+        
+        Args:
+            model_id: Bedrock model ID of the agent or workflow, None for the default model
+            orchestrator: Whether the model drives a workflow orchestrator
+            
+        Returns:
+            A model ID (or None) for Bedrock, or a FakeModel instance
+        """
+        if MODEL_PROVIDER == 'fake':
+            from fake_model import fake_model_from_env
+            return fake_model_from_env(model_id, orchestrator=orchestrator)
+        
+        # Use cross-region profile if available
+        if model_id:
+            from bedrock_models import get_model_with_cross_region_profile
+            model_id = get_model_with_cross_region_profile(model_id)
+        return model_id
+    
+    @classmethod
+    def _create_graph_executor(cls, workflow_context):
+        """
+        Create an executor running the workflow graph directly, without an orchestrator.
+        
+        Args:
+            workflow_context: Dictionary containing workflow data, with its agents created
+            
+        Returns:
+            DagExecutor or PipelineExecutor for the workflow's execution mode,
+            or None if the graph needs an orchestrator
+        """
+        node_agents = workflow_context.get('node_agents', {})
+        try:
+            graph = WorkflowGraph(workflow_context['nodes'], workflow_context['edges'])
+            if workflow_context.get('execution_mode') == 'pipeline':
+                # Nodes whose agent was deleted are skipped
+                return PipelineExecutor([node_agents[node_id] for node_id in graph.chain()
+                                         if node_id in node_agents])
+        except GraphError as e:
+            print(f"Workflow {workflow_context.get('name')} runs with an orchestrator: {str(e)}")
+            return None
+        
+        cancel_signal = workflow_context.get('cancel_signal')
+
+        def run_node(node_id, task):
+            agent = node_agents.get(node_id)
+            # A node whose agent was deleted passes its input through
+            return agent(task, cancel_signal=cancel_signal) if agent is not None else task
+        
+        return DagExecutor(graph, run_node)
+    
     @classmethod
     def _recover_json(cls, malformed_json: str) -> Dict[str, Any]:
         """